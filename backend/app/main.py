@@ -1,4 +1,5 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from mangum import Mangum
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,6 +8,8 @@ from app.routers.auth import router as auth_router
 from app.routers.files import router as files_router
 from app.routers.jobs import router as jobs_router
 from app.database import engine, Base
+from app.scripts.metrics import MetricsMiddleware, render_metrics
+from app.scripts.serialization import CompressionMiddleware
 
 Base.metadata.create_all(bind=engine)
 
@@ -29,8 +32,18 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Inside the metrics layer, so response byte counts reflect what actually goes over the wire.
+app.add_middleware(CompressionMiddleware)
+
+# Added last so it wraps every other layer and sees the true end-to-end latency.
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def read_root():
     return "Server is running."
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 handler = Mangum(app)
\ No newline at end of file
@@ -1,40 +1,118 @@
-from pydantic import BaseModel, PositiveFloat, StrictStr, validator
-from typing import Literal, Optional, Dict, List
+from pydantic import BaseModel, PositiveFloat, StrictStr, confloat, conint, root_validator, validator
+from typing import Literal, Optional, Dict, List, Tuple
+from app.scripts.validation import DEFAULT_ALPHABET, NucleotideAlphabet, normalize_nucleotides
 
-def nucleotide_check(dna_entry: StrictStr) -> str:
-    dna_entry = dna_entry.upper()
-    if not all(base in "ATCGN" for base in dna_entry):
-        raise ValueError("DNA must only contain nucleotides A, T, C, or G (N allowed also).")
-    return dna_entry
+def nucleotide_check(dna_entry: StrictStr, alphabet: str = "strict", record_id: Optional[str] = None) -> str:
+    # Uppercased (and U -> T) on success; raises with the first offending position otherwise.
+    return normalize_nucleotides(dna_entry, alphabet, record_id)
 
 class FrameEntry(BaseModel):
     aa_seq: StrictStr
-    orf_set: List[StrictStr]
+    orf_set: Optional[List[StrictStr]] = None
+    orf_spans: Optional[List[Tuple[conint(ge=0), conint(ge=0)]]] = None # Compact (start, end) offsets.
+
+    @root_validator(skip_on_failure=True)
+    @classmethod
+    def check_orfs(cls, values):
+        if values.get('orf_set') is None and values.get('orf_spans') is None:
+            raise ValueError("Frame entries need either 'orf_set' or 'orf_spans'.")
+        for start, end in values.get('orf_spans') or []:
+            if start > end or end > len(values['aa_seq']):
+                raise ValueError(f"ORF span ({start}, {end}) falls outside of aa_seq.")
+        return values
+
+    def orfs(self) -> List[str]:
+        if self.orf_set is not None:
+            return self.orf_set
+        return [self.aa_seq[start:end] for start, end in self.orf_spans]
 
 # Can accomodate one-time requests (i.e. one-item list) as well as multi-seq records.
 class FrameRequestSingle(BaseModel):
     sequence: StrictStr
     direction: Literal["FWD", "REV", "BOTH"] = "BOTH"
+    compact: bool = False
+    alphabet: NucleotideAlphabet = DEFAULT_ALPHABET
 
-    @validator('sequence', pre=False, always=True)
+    @root_validator(skip_on_failure=True)
     @classmethod
-    def check_sequence(cls, v): return nucleotide_check(v)
+    def check_sequence(cls, values):
+        values['sequence'] = nucleotide_check(values['sequence'], values['alphabet'])
+        return values
 
 class FrameRequestMulti(BaseModel):
     sequences: Dict[str, StrictStr]
     direction: Literal["FWD", "REV", "BOTH"] = "BOTH"
+    compact: bool = False
+    alphabet: NucleotideAlphabet = DEFAULT_ALPHABET
 
-    @validator('sequences', pre=False, always=True)
+    @root_validator(skip_on_failure=True)
     @classmethod
-    def check_sequences(cls, v: Dict[str, str]): return {k: nucleotide_check(val) for k, val in v.items()}
+    def check_sequences(cls, values):
+        values['sequences'] = {k: nucleotide_check(val, values['alphabet'], k) for k, val in values['sequences'].items()}
+        return values
 
 class AlignmentRequestSingle(BaseModel):
     query_frames: Dict[str, FrameEntry]
     target: StrictStr
     threshold: Optional[PositiveFloat] = 0.98
+    top_k: conint(ge=1, le=100) = 5 # Hits kept per target (bounds mirror build_alignment.MAX_TOP_K).
+
+class AlignmentEncoding(BaseModel):
+    coordinates: List[List[conint(ge=0)]] # Two rows (target, query), as produced by encode_alignment().
+    cigar: Optional[StrictStr] = None
+
+    @validator('coordinates')
+    @classmethod
+    def check_coordinates(cls, v):
+        if len(v) != 2 or len(v[0]) != len(v[1]) or len(v[0]) < 2:
+            raise ValueError("Coordinates need two equal-length rows with at least two columns.")
+        return v
+
+class AlignmentRenderRequest(BaseModel):
+    target: StrictStr
+    query: StrictStr
+    alignment: AlignmentEncoding
 
 class AlignmentRequestMulti(BaseModel):
     query_frames: Dict[str, Dict[str, FrameEntry]]
     targets: Dict[str, StrictStr]
     threshold: Optional[PositiveFloat] = 0.98
- 
\ No newline at end of file
+    top_k: conint(ge=1, le=100) = 5
+    output_format: Literal["csv", "parquet", "both"] = "csv" # Format(s) of the saved result tables.
+    page_size: Optional[conint(ge=1, le=5000)] = None # Return one page of results plus a cursor instead of all.
+    collapse_targets: bool = False # Align redundant targets through cluster representatives.
+ 
+class RethresholdRequest(BaseModel):
+    threshold: confloat(gt=0, le=1)
+    top_k: Optional[conint(ge=1, le=100)] = None # Defaults to the job's original K.
+    page_size: Optional[conint(ge=1, le=5000)] = None # Inline jobs: return one page of results plus a cursor.
+
+class UploadFileSpec(BaseModel):
+    filename: StrictStr
+    size: conint(gt=0) # Bytes; decides between a single presigned PUT and a multipart upload.
+
+class UploadInitRequest(BaseModel):
+    input: Optional[UploadFileSpec] = None
+    target: Optional[UploadFileSpec] = None # Either side may instead be a stored file, given at finalize.
+
+    @root_validator(skip_on_failure=True)
+    @classmethod
+    def check_files(cls, values):
+        if values.get('input') is None and values.get('target') is None:
+            raise ValueError("Request an upload for at least one of 'input' or 'target'.")
+        return values
+
+class UploadedPart(BaseModel):
+    part_number: conint(ge=1, le=10000)
+    etag: StrictStr
+
+class UploadFinalizeRequest(BaseModel):
+    direction: Literal["FWD", "REV", "BOTH"] = "BOTH"
+    align_threshold: PositiveFloat = 0.98
+    top_k: conint(ge=1, le=100) = 5
+    output_format: Literal["csv", "parquet", "both"] = "csv"
+    alphabet: NucleotideAlphabet = DEFAULT_ALPHABET # Checked against the sampled prefix of the input.
+    collapse_targets: bool = False
+    input_file_id: Optional[int] = None
+    target_file_id: Optional[int] = None
+    parts: Dict[Literal["input", "target"], List[UploadedPart]] = {} # Only for multipart uploads.
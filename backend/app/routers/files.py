@@ -6,11 +6,18 @@ from sqlalchemy.orm import Session
 from app.routers.auth import get_active_user
 from app.database import get_db
 from app.scripts.aws_tools import *
+from app.scripts.compression import decode_fasta_bytes, gzip_fasta_text
+from app.scripts.utils import parse_fasta
+from app.scripts.validation import DEFAULT_ALPHABET, NucleotideAlphabet, validate_records
+from io import StringIO
 from app import models
 import uuid
 
 router = APIRouter(prefix="/files")
 
+FASTA_EXTENSIONS = ('.fasta', '.fa', '.fna', '.faa')
+FASTA_EXTENSIONS += tuple(f"{ext}.gz" for ext in FASTA_EXTENSIONS) # gzip/BGZF, stored exactly as uploaded.
+
 def retrieval_by_id(file_id: int, db: Session = Depends(get_db), 
                     current_user: models.User = Depends(get_active_user)):
     db_file = db.query(models.FastaFile).filter(models.FastaFile.id == file_id).first()
@@ -26,17 +33,32 @@ def retrieval_by_id(file_id: int, db: Session = Depends(get_db),
     
     return db_file
 
+def check_input_fasta(text: str, alphabet: str):
+    # Input files are nucleotide FASTA; bad symbols are rejected up front rather than when a job runs.
+    try:
+        validate_records(parse_fasta(StringIO(text)), alphabet)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 # CREATE
 
 @router.post("/upload")
 def create_upload_file(file: UploadFile = File(..., description="User's FASTA Query"),
                        type: models.FileType = Form(...),
+                       alphabet: NucleotideAlphabet = Form(DEFAULT_ALPHABET),
                        db: Session = Depends(get_db),
                        current_user: models.User = Depends(get_active_user)):
-    if not file.filename.lower().endswith(('.fasta', '.fa', '.fna', '.faa')):
+    if not file.filename.lower().endswith(FASTA_EXTENSIONS):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Invalid file extension -- only FASTA formats allowed.")
 
+    if type == models.FileType.input:
+        try:
+            check_input_fasta(decode_fasta_bytes(file.file.read()), alphabet)
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        file.file.seek(0)
+
     unique_id = uuid.uuid4()
     s3_key = f"users/{current_user.id}/{type.value}/{unique_id}_{file.filename}"
     
@@ -66,7 +88,7 @@ def read_file_contents(file_id: int, db: Session = Depends(get_db),
     
     try:
         s3_object = s3_client.get_object(Bucket=fasta_bucket_name, Key=db_file.s3_key)
-        content = s3_object["Body"].read().decode('utf-8')
+        content = decode_fasta_bytes(s3_object["Body"].read())
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on storage.")
@@ -97,14 +119,18 @@ def read_download_file(file_id: int, db: Session = Depends(get_db),
 
 @router.put("/{file_id}/edit")
 def update_file_contents(file_id: int, new_contents: models.FastaUpdate, db: Session = Depends(get_db), 
-                         current_user: models.User = Depends(get_active_user)):
+                         current_user: models.User = Depends(get_active_user),
+                         alphabet: NucleotideAlphabet = DEFAULT_ALPHABET):
     db_file = retrieval_by_id(file_id, db, current_user)
+    if db_file.type == models.FileType.input.value:
+        check_input_fasta(new_contents.content, alphabet)
     
     try:
         s3_client.put_object(
             Bucket=fasta_bucket_name, 
             Key=db_file.s3_key, 
-            Body=new_contents.content.encode('utf-8'))
+            Body=gzip_fasta_text(new_contents.content) if db_file.s3_key.endswith(".gz")
+                 else new_contents.content.encode('utf-8'))
     except ClientError as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to update file in storage: {e}.")
     
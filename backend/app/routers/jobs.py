@@ -1,35 +1,357 @@
-from fastapi import APIRouter, UploadFile, Depends, File, Form, Query
+from fastapi import APIRouter, UploadFile, Depends, File, Form, Query, HTTPException, status
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from botocore.exceptions import ClientError
 from app.routers.auth import get_optional_user
+from app.routers.files import FASTA_EXTENSIONS, retrieval_by_id
+from app.routers.sequence import build_multi_alignment_response
 from app.models.auth_tools import User
+from app.models.seq_input import UploadInitRequest, UploadFinalizeRequest
+from app.database import get_db
 from app.scripts.aws_tools import *
-from typing import Optional
+from app.scripts.build_alignment import DEFAULT_TOP_K, MAX_TOP_K, render_result_alignment
+from app.scripts.compression import decode_fasta_bytes, decompress_prefix, is_gzipped
+from app.scripts.cost_model import estimate_alignment_cost, estimate_alignment_cost_from_prefix
+from app.scripts.packed_seq import PackedRecords
+from app.scripts.scheduling import schedule_job, get_queue_position
+from app.scripts.serialization import FastJSONResponse, loads_json
+from app.scripts.target_library import content_hash, library_key
+from app.scripts.validation import DEFAULT_ALPHABET, NucleotideAlphabet, validate_records, validate_target_panel
+from app.scripts.utils import iter_fasta_records, parse_fasta, process_fasta_upload
+from app.scripts.warm_cache import cached_target_set
+from io import StringIO
+from typing import Literal, Optional
 import uuid
 
 router = APIRouter(prefix="/jobs")
 
+# Requests estimated above this run on the worker instead; kept well under API Gateway's 29 s ceiling.
+INLINE_BUDGET_SECONDS = float(os.environ.get("INLINE_BUDGET_SECONDS", "15"))
+
+# How much of a directly-uploaded input the API reads to validate it and estimate the job's cost.
+ESTIMATE_PREFIX_BYTES = int(os.environ.get("ESTIMATE_PREFIX_KB", "1024")) * 1024
+
+# Job row fields /jobs/status returns; everything else in the row stays server-side.
+STATUS_FIELDS = ("status", "size_class", "estimated_seconds", "alignment_key", "top_hits_key", "frames_key",
+                 "match_vectors_key", "result_index_key", "timings_key", "profile_key", "direction",
+                 "align_threshold", "top_k", "collapse_targets", "available_targets", "download_links",
+                 "stage_timings", "rethreshold_of")
+
+async def _resolve_fasta(upload: Optional[UploadFile], file_id: Optional[int], label: str, db: Session,
+                         current_user: Optional[User], alphabet: Optional[str] = None) -> tuple:
+    """
+    Returns (sequences, raw_bytes, s3_key) for one side of a submission. Fresh uploads come back with
+    their bytes (copied under tmp/{job_id}/ when queued); stored FastaFiles come back with their existing
+    key, which goes to the worker as-is so nothing is re-uploaded or copied. With an 'alphabet', the
+    sequences are validated (and normalized) as nucleotides. Inputs are held as PackedRecords (2 bits per
+    base), since they stay alive through the estimate and any inline run.
+    """
+    if (upload is None) == (file_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Provide exactly one of '{label}_fasta' or '{label}_file_id'.")
+
+    if upload is not None:
+        raw_bytes = await upload.read()
+        try:
+            handle = StringIO(decode_fasta_bytes(raw_bytes))
+            if label == "input":
+                return PackedRecords.from_records(iter_fasta_records(handle), alphabet), raw_bytes, None
+            sequences = validate_target_panel(await process_fasta_upload(handle))
+            return (validate_records(sequences, alphabet) if alphabet else sequences), raw_bytes, None
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if current_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Log in to submit jobs against stored files.")
+    db_file = retrieval_by_id(file_id, db, current_user)
+
+    try:
+        # Reference panels go through the warm cache (keyed by S3 key + ETag), since the same stored panel
+        # tends to be submitted over and over; inputs are read once for the cost estimate.
+        if label == "target":
+            sequences = validate_target_panel(
+                await asyncio.to_thread(cached_target_set, db_file.s3_key, s3_client, fasta_bucket_name))
+        else:
+            handle = await asyncio.to_thread(download_from_s3, db_file.s3_key)
+            sequences = PackedRecords.from_records(iter_fasta_records(handle), alphabet)
+    except ClientError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on storage.")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return sequences, None, db_file.s3_key
+
+async def _queue_job(input_bytes: Optional[bytes], target_bytes: Optional[bytes], direction: str,
+                     align_threshold: float, current_user: Optional[User], estimate: dict,
+                     top_k: int = DEFAULT_TOP_K, target_sequences: Optional[dict] = None,
+                     input_key: Optional[str] = None, target_key: Optional[str] = None,
+                     job_id: Optional[str] = None, output_format: str = "csv",
+                     alphabet: str = DEFAULT_ALPHABET, collapse_targets: bool = False,
+                     expected_status: Optional[str] = None) -> dict:
+    job_id = job_id or str(uuid.uuid4())
+    user_id = current_user.id if current_user else None
+
+    # Stored files are referenced by their existing keys; only fresh uploads get copied into tmp/.
+    # Compressed uploads are stored as-is; every reader downstream inflates them on the fly.
+    uploads = []
+    if input_key is None:
+        input_key = f"tmp/{job_id}/input.fasta" + (".gz" if is_gzipped(input_bytes) else "")
+        uploads.append(upload_to_s3(input_bytes, input_key))
+    if target_key is None:
+        target_key = f"tmp/{job_id}/target.fasta" + (".gz" if is_gzipped(target_bytes) else "")
+        uploads.append(upload_to_s3(target_bytes, target_key))
+    await asyncio.gather(*uploads)
+
+    # The raw FASTA stays the source of truth; the compiled library just lets the worker skip parsing it.
+    # Only its content-addressed key is worked out here: the worker builds it on the first miss.
+    target_library_key = None
+    if target_sequences:
+        target_library_key = library_key(await asyncio.to_thread(content_hash, target_sequences))
+
+    placement = schedule_job(job_id, input_key, target_key, direction, user_id,
+                             align_threshold=align_threshold, estimate=estimate, top_k=top_k,
+                             target_library_key=target_library_key, output_format=output_format, alphabet=alphabet,
+                             collapse_targets=collapse_targets, expected_status=expected_status)
+
+    return {'job_id': job_id, 'status': 'PENDING', 'size_class': placement['size_class']}
+
 @router.post("/submit")
-async def submit_alignment_job(input_fasta: UploadFile = File(...), target_fasta: UploadFile = File(...), 
-                               direction: str = Form("BOTH"), current_user: Optional[User] = Depends(get_optional_user)):
+async def submit_alignment_job(input_fasta: Optional[UploadFile] = File(None),
+                               target_fasta: Optional[UploadFile] = File(None),
+                               input_file_id: Optional[int] = Form(None), target_file_id: Optional[int] = Form(None),
+                               direction: str = Form("BOTH"), align_threshold: float = Form(0.98),
+                               top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),
+                               output_format: Literal["csv", "parquet", "both"] = Form("csv"),
+                               alphabet: NucleotideAlphabet = Form(DEFAULT_ALPHABET),
+                               collapse_targets: bool = Form(False),
+                               db: Session = Depends(get_db),
+                               current_user: Optional[User] = Depends(get_optional_user)):
+    """
+    Each side is either an uploaded FASTA or the id of one of the user's stored files (see /files).
+    """
+    input_sequences, input_bytes, input_key = await _resolve_fasta(input_fasta, input_file_id, "input",
+                                                                   db, current_user, alphabet)
+    target_sequences, target_bytes, target_key = await _resolve_fasta(target_fasta, target_file_id, "target",
+                                                                      db, current_user)
+
+    # The estimate only decides the job's size-class lane; queued jobs always run on the worker.
+    estimate = estimate_alignment_cost(input_sequences, target_sequences, direction)
+
+    return await _queue_job(input_bytes, target_bytes, direction, align_threshold, current_user, estimate, top_k,
+                            target_sequences, input_key=input_key, target_key=target_key,
+                            output_format=output_format, alphabet=alphabet, collapse_targets=collapse_targets)
+
+@router.post("/run")
+async def run_alignment_request(input_fasta: Optional[UploadFile] = File(None),
+                                target_fasta: Optional[UploadFile] = File(None),
+                                input_file_id: Optional[int] = Form(None),
+                                target_file_id: Optional[int] = Form(None),
+                                direction: str = Form("BOTH"), align_threshold: float = Form(0.98),
+                                top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),
+                                output_format: Literal["csv", "parquet", "both"] = Form("csv"),
+                                alphabet: NucleotideAlphabet = Form(DEFAULT_ALPHABET),
+                                collapse_targets: bool = Form(False),
+                                db: Session = Depends(get_db),
+                                current_user: Optional[User] = Depends(get_optional_user)):
+    """
+    Single submission endpoint: estimates the alignment cost up front, answers small requests inline
+    (same payload as /process/multi) and transparently queues large ones (same payload as /jobs/submit).
+    The 'mode' field tells the client which of the two shapes it received.
+    """
+    input_sequences, input_bytes, input_key = await _resolve_fasta(input_fasta, input_file_id, "input",
+                                                                   db, current_user, alphabet)
+    target_sequences, target_bytes, target_key = await _resolve_fasta(target_fasta, target_file_id, "target",
+                                                                      db, current_user)
+    estimate = estimate_alignment_cost(input_sequences, target_sequences, direction)
+
+    if estimate['estimated_seconds'] <= INLINE_BUDGET_SECONDS:
+        response = await run_in_threadpool(build_multi_alignment_response, input_sequences, target_sequences,
+                                           direction, align_threshold, db, current_user, top_k, output_format,
+                                           None, collapse_targets)
+        return FastJSONResponse({'mode': 'inline', 'estimate': estimate, **response})
+
+    queued = await _queue_job(input_bytes, target_bytes, direction, align_threshold, current_user, estimate,
+                              top_k, target_sequences, input_key=input_key, target_key=target_key,
+                              output_format=output_format, alphabet=alphabet, collapse_targets=collapse_targets)
+    return {'mode': 'queued', **queued, 'estimate': estimate}
+
+@router.post("/uploads")
+async def create_direct_upload(request: UploadInitRequest,
+                               current_user: Optional[User] = Depends(get_optional_user)):
+    """
+    First half of a direct-to-S3 submission: reserves a job id and returns presigned URLs the client
+    uploads to (one PUT, or one PUT per part for multipart), so the FASTA bytes never pass through the
+    API. The client then calls /jobs/{job_id}/finalize to validate the uploads and queue the job.
+    """
     job_id = str(uuid.uuid4())
-    user_id = current_user.id if current_user else None
-    input_key = f"tmp/{job_id}/input.fasta"
-    target_key = f"tmp/{job_id}/target.fasta"
+    uploads, multipart_ids = {}, {}
 
-    await upload_to_s3(input_fasta, input_key)
-    await upload_to_s3(target_fasta, target_key)
+    for label, spec in (("input", request.input), ("target", request.target)):
+        if spec is None:
+            continue
+        if not spec.filename.lower().endswith(FASTA_EXTENSIONS):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Invalid {label} file extension -- only FASTA formats allowed.")
+        if spec.size > MAX_DIRECT_UPLOAD_BYTES:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"The {label} file exceeds the {MAX_DIRECT_UPLOAD_BYTES} byte upload limit.")
 
-    enqueue_job(job_id, input_key, target_key, direction, user_id)
+        key = f"tmp/{job_id}/{label}.fasta" + (".gz" if spec.filename.lower().endswith(".gz") else "")
+        uploads[label] = await asyncio.to_thread(generate_presigned_upload, key, spec.size)
+        if 'upload_id' in uploads[label]:
+            multipart_ids[label] = uploads[label]['upload_id']
 
-    return {'job_id': job_id, 'status': 'PENDING'}
+    # Upload keys and multipart ids stay server-side; finalize never trusts the client for either.
+    pending = {"job_id": job_id, "status": "AWAITING_UPLOAD",
+               "upload_keys": json.dumps({label: upload['key'] for label, upload in uploads.items()}),
+               "multipart_ids": json.dumps(multipart_ids)}
+    if current_user:
+        pending["owner_id"] = current_user.id
+    jobs_table.put_item(Item=pending)
+
+    return {'job_id': job_id, 'uploads': uploads}
+
+def _read_input_prefix(input_key: str, total_bytes: int, alphabet: str = DEFAULT_ALPHABET) -> tuple:
+    """
+    Parses (and validates) the complete records in the first ESTIMATE_PREFIX_BYTES of the input (the last
+    one is dropped when it may have been cut off). Also returns how many bytes of the stored object those
+    records span, which for gzip/BGZF objects is the kept share of the decompressed text mapped back onto
+    the raw range.
+    """
+    raw = read_s3_prefix(input_key, ESTIMATE_PREFIX_BYTES)
+    text = decompress_prefix(raw).decode("utf-8", errors="ignore")
+    decoded_length = len(text)
+    if len(raw) < total_bytes and text.rfind("\n>") > 0:
+        text = text[:text.rfind("\n>") + 1]
+    if not text.lstrip().startswith(">"):
+        raise ValueError("Input file is not in FASTA format.")
+    sequences = validate_records(parse_fasta(StringIO(text)), alphabet)
+    return sequences, int(len(raw) * len(text) / max(1, decoded_length))
+
+def _set_upload_status(job_id: str, expected: str, new_status: str) -> bool:
+    # Conditional status flip, so two racing finalize calls can't both enqueue the same job.
+    try:
+        jobs_table.update_item(Key={"job_id": job_id}, UpdateExpression="SET #status = :new",
+                               ConditionExpression="#status = :expected",
+                               ExpressionAttributeNames={"#status": "status"},
+                               ExpressionAttributeValues={":new": new_status, ":expected": expected})
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        raise
+
+@router.post("/{job_id}/finalize")
+async def finalize_direct_upload(job_id: str, request: UploadFinalizeRequest, db: Session = Depends(get_db),
+                                 current_user: Optional[User] = Depends(get_optional_user)):
+    job_data = get_job_status(job_id)
+    if job_data.get("owner_id") is not None and (current_user is None or current_user.id != int(job_data["owner_id"])):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied -- not your upload!")
+    if not _set_upload_status(job_id, "AWAITING_UPLOAD", "FINALIZING"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Job {job_id} isn't awaiting uploads (status: {job_data.get('status')}).")
+
+    try:
+        return await _finalize_upload(job_id, job_data, request, db, current_user)
+    except Exception:
+        _set_upload_status(job_id, "FINALIZING", "AWAITING_UPLOAD") # Let the client fix the request and retry.
+        raise
+
+async def _finalize_upload(job_id: str, job_data: dict, request: UploadFinalizeRequest, db: Session,
+                           current_user: Optional[User]) -> dict:
+    upload_keys = json.loads(job_data.get("upload_keys", "{}"))
+    multipart_ids = json.loads(job_data.get("multipart_ids", "{}"))
+    file_ids = {"input": request.input_file_id, "target": request.target_file_id}
+    keys, sizes = {}, {}
+
+    for label in ("input", "target"):
+        if (label in upload_keys) == (file_ids[label] is not None):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"Provide exactly one of an uploaded {label} or '{label}_file_id'.")
+
+        if label in upload_keys:
+            keys[label] = upload_keys[label]
+            # A retried finalize may find the multipart upload already completed by the previous attempt.
+            if label in multipart_ids and await asyncio.to_thread(head_from_s3, keys[label]) is None:
+                parts = [(part.part_number, part.etag) for part in request.parts.get(label, [])]
+                if not parts:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail=f"The {label} file is a multipart upload; list its parts.")
+                try:
+                    await asyncio.to_thread(complete_multipart_upload, keys[label], multipart_ids[label], parts)
+                except ClientError as e:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                        detail=f"Couldn't complete the {label} upload: {e}.")
+        else:
+            if current_user is None:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                    detail="Log in to submit jobs against stored files.")
+            keys[label] = retrieval_by_id(file_ids[label], db, current_user).s3_key
+
+        metadata = await asyncio.to_thread(head_from_s3, keys[label])
+        if metadata is None or metadata["ContentLength"] == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail=f"The {label} file was never uploaded (or is empty).")
+        sizes[label] = metadata["ContentLength"]
+
+    # Target panels are needed in full (cost estimate and compiled library); inputs are only sampled.
+    try:
+        target_sequences, (prefix_sequences, prefix_bytes) = await asyncio.gather(
+            asyncio.to_thread(cached_target_set, keys["target"], s3_client, fasta_bucket_name),
+            asyncio.to_thread(_read_input_prefix, keys["input"], sizes["input"], request.alphabet))
+        validate_target_panel(target_sequences)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    estimate = estimate_alignment_cost_from_prefix(prefix_sequences, prefix_bytes, sizes["input"],
+                                                   target_sequences, request.direction)
+    queued = await _queue_job(None, None, request.direction, request.align_threshold, current_user, estimate,
+                              request.top_k, target_sequences, input_key=keys["input"],
+                              target_key=keys["target"], job_id=job_id, output_format=request.output_format,
+                              alphabet=request.alphabet, collapse_targets=request.collapse_targets,
+                              expected_status="FINALIZING")
+    return {**queued, 'estimate': estimate}
 
 @router.get("/status/{job_id}")
 def poll_alignment_status(job_id: str):
     job_data = get_job_status(job_id)
     if not job_data:
         return {'status': 'UNKNOWN'}
+
+    # Only client-facing fields go out: job rows also carry upload keys, multipart ids and the owner.
+    response = {'job_id': job_id, **{field: job_data[field] for field in STATUS_FIELDS if field in job_data}}
+    if job_data.get('status') == 'PENDING':
+        try:
+            response['queue_position'] = get_queue_position(job_data)
+        except Exception as e:
+            print(f"Couldn't compute queue position for job {job_id}: {e}")
     
-    return {'job_id': job_id, **job_data}
+    return response
+
+@router.get("/{job_id}/alignment/{input_name}")
+async def render_job_alignment(job_id: str, input_name: str):
+    """
+    Worker artifacts only store the compact alignment encoding; the readout for one record is rendered
+    here from alignment_res.json and the job's target FASTA when the UI expands it.
+    """
+    job_data = get_job_status(job_id)
+    if not job_data or job_data.get('status') != 'COMPLETED':
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found or not completed.")
+
+    target_key = job_data.get('target_key', f"tmp/{job_id}/target.fasta")
+    alignment_file, target_file = await asyncio.gather(
+        asyncio.to_thread(download_from_s3, job_data['alignment_key']),
+        asyncio.to_thread(download_from_s3, target_key))
+
+    alignment_results = loads_json(alignment_file.getvalue())
+    result = alignment_results.get(input_name)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Input sequence name not found for this job.")
+
+    targets = await process_fasta_upload(target_file)
+    return {'alignment': render_result_alignment(result, targets)}
 
 @router.get("/getResultDownloadURL")
 def retrieve_result_presigned_url(key: str = Query(...)):
@@ -6,12 +6,22 @@ from app.models.seq_input import *
 from app.models.auth_tools import *
 from app.routers.auth import get_optional_user
 from app.database import get_db
-from collections import defaultdict
-from fastapi import APIRouter, UploadFile, Form, File, Depends
+from app.scripts.compression import open_fasta_text
+from app.scripts.metrics import CACHE_REQUESTS, Gauge
+from app.scripts.packed_seq import PackedRecords
+from app.scripts.target_clusters import TargetClusters, cluster_targets
+from app.scripts.result_index import *
+from app.scripts.scheduling import schedule_rethreshold
+from app.scripts.serialization import FastJSONResponse, loads_json
+from app.scripts.validation import DEFAULT_ALPHABET, NucleotideAlphabet, validate_target_panel
+from app.scripts.warm_cache import cached_artifact_json
+from fastapi import APIRouter, UploadFile, Form, File, Depends, Query
 from sqlalchemy.orm import Session
+from typing import Mapping
 import pandas as pd
 
-router = APIRouter()
+# Large payloads are returned as FastJSONResponse directly, which also skips jsonable_encoder.
+router = APIRouter(default_response_class=FastJSONResponse)
 
 # ==============================================================================
 #  NEW: IN-MEMORY CACHE FOR LAZY LOADING
@@ -20,6 +30,71 @@ router = APIRouter()
 # with a more robust solution like Redis to handle multiple server instances
 # and prevent data loss on server restart.
 RESULTS_CACHE: Dict[str, Dict] = {}
+RESULTS_CACHE_ENTRIES = Gauge("esa_results_cache_entries", "Jobs currently held in RESULTS_CACHE.",
+                              callback=lambda: len(RESULTS_CACHE))
+
+# Inline responses with more records than this return the first page plus a cursor for /results/{job_id}/records.
+INLINE_RESULTS_LIMIT = int(os.environ.get("INLINE_RESULTS_LIMIT", "5000"))
+
+def _get_cached_job(job_id: str) -> Dict:
+    job_data = RESULTS_CACHE.get(job_id)
+    CACHE_REQUESTS.inc(cache="results", result="miss" if job_data is None else "hit")
+    if not job_data:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Job not found or results have expired.")
+    return job_data
+
+class _LazyArtifact:
+    # A queued job's S3 artifact, fetched (through the warm cache) only when a getter needs it.
+    def __init__(self, key: str):
+        self.key = key
+
+    def load(self):
+        return cached_artifact_json(self.key, s3_client, fasta_bucket_name)
+
+def _load_indexed_job(job_id: str) -> Dict:
+    """
+    Inline jobs are served from RESULTS_CACHE; queued jobs from the worker's result_index.json and JSON
+    artifacts, which stay parsed in the warm cache between page requests.
+    """
+    job_data = RESULTS_CACHE.get(job_id)
+    if job_data is not None:
+        CACHE_REQUESTS.inc(cache="results", result="hit")
+        return job_data
+
+    stored = get_job_status(job_id)
+    if not stored or stored.get("status") != "COMPLETED" or not stored.get("result_index_key"):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Job not found, not completed, or has no result index.")
+
+    # Artifacts are loaded on first access, so a records page never pulls top_hits.json (and vice versa).
+    loaders = {
+        "result_index": stored["result_index_key"],
+        "alignment_results": stored["alignment_key"],
+        "top_hits_json": stored["top_hits_key"]
+    }
+    return {name: _LazyArtifact(key) for name, key in loaders.items()}
+
+def _job_artifact(job_data: Dict, name: str):
+    value = job_data[name]
+    return value.load() if isinstance(value, _LazyArtifact) else value
+
+def _index_results(alignment_results: Dict, top_hits: TopHits) -> Dict:
+    # Sorted once here; every page and top-hit lookup afterwards reads the precomputed orders.
+    top_hits_json = top_hits.to_json()
+    return {"top_hits_json": top_hits_json, "result_index": build_result_index(alignment_results, top_hits_json)}
+
+def _first_results_page(job_data: Dict, page_size: int) -> Dict:
+    rows, next_cursor = query_index(job_data["result_index"], "records", limit=page_size)
+    alignment_results = job_data["alignment_results"]
+    return {
+        "alignment_results": {row[0]: alignment_results[row[0]] for row in rows},
+        "next_cursor": next_cursor,
+        "total_records": len(alignment_results)
+    }
+
+def _hit_orf(top_hits_json: Dict, orf_id) -> Dict:
+    # ORF ids are ints in memory but become string keys once top_hits.json has been through JSON.
+    orfs = top_hits_json["orfs"]
+    return orfs[orf_id] if orf_id in orfs else orfs[str(orf_id)]
 
 
 # ==============================================================================
@@ -30,7 +105,7 @@ def _process_fasta_sync(upload_file: UploadFile) -> Dict[str, str]:
     """
     A synchronous version of your FASTA parser to be called from sync endpoints.
     """
-    content = upload_file.file.read().decode("utf-8")
+    content = decode_fasta_bytes(upload_file.file.read())
     # This is a placeholder for your actual parsing logic from process_fasta_upload
     # For example:
     lines = content.splitlines()
@@ -49,19 +124,26 @@ def _run_multi_alignment_pipeline(
     query_frames: Dict,
     targets: Dict[str, str],
     direction: str,
-    align_threshold: float
+    align_threshold: float,
+    top_k: int = DEFAULT_TOP_K,
+    alignment_cache: Optional[AlignmentCache] = None,
+    target_clusters: Optional[TargetClusters] = None
 ) -> tuple:
     """
     This is the core logic extracted from your original /align/multi endpoint.
-    It can now be reused by both the old and new endpoints.
+    It can now be reused by both the old and new endpoints. Passing a populated 'alignment_cache'
+    (e.g. from a finished job) reuses its stored alignments instead of re-aligning. 'target_clusters'
+    collapses redundant targets (see target_clusters).
     """
-    top_hits = defaultdict(list)
+    top_hits = TopHits(top_k)
     results_df = pd.DataFrame(columns = ["Name", "Target", "Identity-Score", "Direction", 
                                          "Most-Likely-ORF", "Notes"])
     alignment_results = {}
+    if alignment_cache is None:
+        alignment_cache = AlignmentCache() # Identical ORFs across records are aligned once.
     
     for seq_name, frame_data in query_frames.items():
-        all_orfs = [orf for frame in frame_data.values() for orf in frame.get('orf_set', [])]
+        all_orfs, orf_refs = record_orf_refs(seq_name, frame_data, top_hits)
 
         if not all_orfs:
             results_df = data_export(results_df, seq_name, direction, "N/A", 0.0, "N/A", notes="No ORFs!")
@@ -75,7 +157,10 @@ def _run_multi_alignment_pipeline(
             target_set=targets,
             top_hits=top_hits, 
             curr_results_data=results_df,
-            align_threshold=align_threshold
+            align_threshold=align_threshold,
+            orf_refs=orf_refs,
+            alignment_cache=alignment_cache,
+            target_clusters=target_clusters
         )
 
         alignment_results[seq_name] = final_align_res or {'detail': 'No final alignment determined.'}
@@ -93,6 +178,11 @@ def process_multi_alignment(
     target_fasta: UploadFile = File(...),
     direction: str = Form("BOTH"),
     align_threshold: float = Form(0.98),
+    top_k: int = Form(DEFAULT_TOP_K, ge=1, le=MAX_TOP_K),
+    output_format: Literal["csv", "parquet", "both"] = Form("csv"),
+    page_size: Optional[int] = Form(None, ge=1, le=INLINE_RESULTS_LIMIT),
+    alphabet: NucleotideAlphabet = Form(DEFAULT_ALPHABET),
+    collapse_targets: bool = Form(False),
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
@@ -102,26 +192,60 @@ def process_multi_alignment(
     intermediate data (like frames) to the client.
     """
     # 1. Parse FASTA files directly on the server
-    input_sequences = _process_fasta_sync(input_fasta)
-    target_sequences = _process_fasta_sync(target_fasta)
-
-    # 2. Generate frames in server memory (never sent to client)
-    all_frames_data = {}
+    # Inputs are parsed straight off the upload stream and packed at 2 bits per base record by record,
+    # so the set never exists as a dict of unpacked strings.
+    try:
+        input_sequences = PackedRecords.from_records(iter_fasta_records(open_fasta_text(input_fasta.file)),
+                                                     alphabet)
+        target_sequences = validate_target_panel(_process_fasta_sync(target_fasta))
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return FastJSONResponse(build_multi_alignment_response(input_sequences, target_sequences, direction,
+                                                           align_threshold, db, current_user, top_k,
+                                                           output_format, page_size, collapse_targets))
+
+def build_multi_alignment_response(input_sequences: Mapping[str, str], target_sequences: Dict[str, str],
+                                   direction: str, align_threshold: float, db: Session,
+                                   current_user: Optional[User], top_k: int = DEFAULT_TOP_K,
+                                   output_format: str = "csv", page_size: Optional[int] = None,
+                                   collapse_targets: bool = False) -> dict:
+    """
+    Runs frames + alignment in-process, caches the heavy results for the lazy getters, and returns the
+    lean summary. Shared by /process/multi and the inline branch of /jobs/run. With 'page_size' (or
+    past INLINE_RESULTS_LIMIT records) only the first page of results is returned, with a cursor.
+    'input_sequences' is usually a PackedRecords set, which frame generation reads directly. With
+    'collapse_targets', redundant targets are clustered and aligned through their representatives.
+    """
+    # 2. Generate frames in server memory (never sent to client), with ORFs kept as offsets
+    all_frames_data, frame_interner = {}, FrameInterner()
     for name, seq in input_sequences.items():
-        all_frames_data[name] = generate_frames(seq, direction)
+        all_frames_data[name] = frame_interner.generate(seq, direction, compact=True)
     
     # 3. Run the reusable alignment pipeline
+    alignment_cache = AlignmentCache()
+    target_clusters = cluster_targets(target_sequences) if collapse_targets else None
     alignment_results, top_hits, results_df = _run_multi_alignment_pipeline(
         query_frames=all_frames_data,
         targets=target_sequences,
         direction=direction,
-        align_threshold=align_threshold)
+        align_threshold=align_threshold,
+        top_k=top_k,
+        alignment_cache=alignment_cache,
+        target_clusters=target_clusters)
     
     # 4. Cache the large, detailed results for lazy loading
     job_id = str(uuid.uuid4())
     RESULTS_CACHE[job_id] = {
         "frames": all_frames_data,
-        "top_hits": top_hits
+        "alignment_results": alignment_results,
+        **_index_results(alignment_results, top_hits),
+        "targets": target_sequences, # Needed to render alignment readouts on demand.
+        "alignment_cache": alignment_cache, # Per-pair match vectors, for re-thresholding.
+        "target_clusters": target_clusters, # Re-thresholding collapses the same targets.
+        "direction": direction,
+        "align_threshold": align_threshold,
+        "top_k": top_k
     }
     
     # 5. Prepare and return the LEAN summary response
@@ -130,19 +254,16 @@ def process_multi_alignment(
         "alignment_results": alignment_results,
         "available_targets": list(top_hits.keys()), # Just the names for the dropdown
     }
+    if target_clusters is not None:
+        response['target_clusters'] = target_clusters.summary()
+    if page_size or len(alignment_results) > INLINE_RESULTS_LIMIT:
+        response.update(_first_results_page(RESULTS_CACHE[job_id], page_size or INLINE_RESULTS_LIMIT))
     
     if current_user:
-        results_key, top_hits_key = save_alignment_artifacts(results_df=results_df, top_hits=top_hits,
-                                                             current_user=current_user, s3_client=s3_client,
-                                                             bucket_name=fasta_bucket_name, db=db)
-
-        presigned_result_url = generate_presigned_url(results_key, filename="orf_mappings.csv")
-        presigned_hits_url = generate_presigned_url(top_hits_key, filename="top_hits.csv")
-
-        response['download_links'] = {
-            'orf_mappings': presigned_result_url,
-            'top_hits': presigned_hits_url
-        }
+        artifact_keys = save_alignment_artifacts(results_df=results_df, top_hits=top_hits,
+                                                 current_user=current_user, s3_client=s3_client,
+                                                 bucket_name=fasta_bucket_name, db=db, output_format=output_format)
+        response['download_links'] = generate_artifact_links(artifact_keys)
         
     return response
 
@@ -152,35 +273,168 @@ def process_multi_alignment(
 # ==============================================================================
 
 @router.get("/results/{job_id}/frames/{input_name}")
-def get_frames_for_input(job_id: str, input_name: str):
-    job_data = RESULTS_CACHE.get(job_id)
-    if not job_data:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Job not found or results have expired.")
-    
+def get_frames_for_input(job_id: str, input_name: str, compact: bool = False):
+    """
+    Frames are cached with ORFs as (start, end) offsets into aa_seq; pass compact=true to receive that
+    layout directly, otherwise each frame is expanded back to the legacy 'orf_set' strings.
+    """
+    job_data = _get_cached_job(job_id)
     input_frames = job_data.get("frames", {}).get(input_name)
     if input_frames is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Input sequence name not found for this job.")
         
-    return input_frames
+    return FastJSONResponse(input_frames if compact else expand_frame_set(input_frames))
 
 @router.get("/results/{job_id}/tophits/{target_name}")
 def get_top_hits_for_target(job_id: str, target_name: str):
     """
-    This endpoint returns the top hits for a single target.
-    The min-heap (list of tuples) is directly serializable to a JSON array of arrays.
-    Frontend receives: [[98.5, 149, "ORF_SEQ_1"], [97.2, 148, "ORF_SEQ_2"]]
+    This endpoint returns the top hits for a single target, best first. The cached heaps only hold ORF
+    references, so each hit is expanded to its residues here.
+    Frontend receives: [[98.5, 149, "ORF_SEQ_1", "record_1"], [97.2, 148, "ORF_SEQ_2", "record_2"]]
     """
-    job_data = RESULTS_CACHE.get(job_id)
-    if not job_data:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Job not found or results have expired.")
-    
-    target_hits = job_data.get("top_hits", {}).get(target_name)
-    if target_hits is None:
+    job_data = _load_indexed_job(job_id)
+    hits = _job_artifact(job_data, "result_index")["hits"]
+    target_range = hits["target_ranges"].get(target_name)
+    if target_range is None:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Target name not found for this job.")
-        
-    # The list of tuples is already a valid JSON structure.
-    # FastAPI will automatically convert it.
-    return sorted(target_hits, key=lambda x: x[0], reverse=True) # Sort before sending
+
+    top_hits_json = _job_artifact(job_data, "top_hits_json")
+    target_hits = []
+    for _, identity, lca, orf_id in hits["rows"][target_range[0]:target_range[1]]:
+        orf = _hit_orf(top_hits_json, orf_id)
+        target_hits.append([identity, lca, orf["sequence"], orf["record"]])
+    return FastJSONResponse(target_hits)
+
+@router.get("/results/{job_id}/records")
+def get_result_records(job_id: str, cursor: Optional[str] = None,
+                       limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       sort: Literal["input", "identity", "lca", "record"] = "input",
+                       order: Optional[Literal["asc", "desc"]] = None, min_identity: Optional[float] = None,
+                       min_lca: Optional[int] = None, target: Optional[str] = None):
+    """
+    One page of per-record results, filtered and sorted server-side. 'order' defaults to best first for
+    identity/LCA and to submission/alphabetical order otherwise; pass back 'next_cursor' (with the same
+    query) for the following page until it comes back null.
+    """
+    job_data = _load_indexed_job(job_id)
+    result_index = _job_artifact(job_data, "result_index")
+    try:
+        rows, next_cursor = query_index(result_index, "records", sort=sort, order=order, min_identity=min_identity,
+                                        min_lca=min_lca, target=target, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    alignment_results = _job_artifact(job_data, "alignment_results") if rows else {}
+    return FastJSONResponse({
+        "job_id": job_id,
+        "items": [{"record": row[0], "result": alignment_results[row[0]]} for row in rows],
+        "next_cursor": next_cursor,
+        "total_records": len(result_index["records"]["rows"])
+    })
+
+@router.get("/results/{job_id}/hits")
+def get_result_hits(job_id: str, cursor: Optional[str] = None,
+                    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                    sort: Literal["identity", "lca", "target"] = "identity",
+                    order: Optional[Literal["asc", "desc"]] = None, min_identity: Optional[float] = None,
+                    min_lca: Optional[int] = None, target: Optional[str] = None):
+    """
+    One page of top hits across all targets (or just 'target'), each with its ORF expanded.
+    """
+    job_data = _load_indexed_job(job_id)
+    result_index = _job_artifact(job_data, "result_index")
+    try:
+        rows, next_cursor = query_index(result_index, "hits", sort=sort, order=order, min_identity=min_identity,
+                                        min_lca=min_lca, target=target, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    top_hits_json = _job_artifact(job_data, "top_hits_json") if rows else {}
+    return FastJSONResponse({
+        "job_id": job_id,
+        "items": [{"target": hit_target, "identity_pct": identity, "lca": lca,
+                   "orf": _hit_orf(top_hits_json, orf_id)} for hit_target, identity, lca, orf_id in rows],
+        "next_cursor": next_cursor,
+        "total_hits": len(result_index["hits"]["rows"])
+    })
+
+
+@router.get("/results/{job_id}/alignment/{input_name}")
+def get_alignment_for_input(job_id: str, input_name: str):
+    """
+    Results only carry the compact alignment encoding; this renders the human-readable readout for a
+    single record when the UI expands it.
+    """
+    job_data = _get_cached_job(job_id)
+    result = job_data.get("alignment_results", {}).get(input_name)
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Input sequence name not found for this job.")
+
+    return {'alignment': render_result_alignment(result, job_data.get("targets", {}))}
+
+
+def _queue_rethreshold(job_id: str, data: RethresholdRequest) -> FastJSONResponse:
+    # Queued jobs are the large ones, so their re-threshold runs on the worker as a job of its own, whose
+    # results are paged through /results/{job_id}/records and /hits like any other queued job's.
+    stored = get_job_status(job_id)
+    if not stored or stored.get("status") != "COMPLETED" or not stored.get("match_vectors_key"):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Job not found, not completed, or has no stored match vectors.")
+
+    rethreshold_id = str(uuid.uuid4())
+    placement = schedule_rethreshold(rethreshold_id, job_id, stored, data.threshold,
+                                     data.top_k or int(stored.get("top_k", DEFAULT_TOP_K)))
+    return FastJSONResponse({
+        "job_id": rethreshold_id,
+        "rethreshold_of": job_id,
+        "mode": "queued",
+        "status": "PENDING",
+        "size_class": placement['size_class'],
+        "threshold": data.threshold
+    }, status_code=status.HTTP_202_ACCEPTED)
+
+@router.post("/results/{job_id}/rethreshold")
+def rethreshold_results(job_id: str, data: RethresholdRequest):
+    """
+    Recomputes LCA picks, alignment results and top hits for a new threshold. Only compute_lca depends on
+    the threshold, so stored match vectors are reused; pairs that were pruned (or didn't fit in the
+    cache) during the original run are the only ones aligned here. Inline jobs are re-thresholded here and
+    cached under a new job id (paged like /process/multi); queued jobs are handed to the worker, and the
+    response carries the new job id to poll.
+    """
+    job_data = RESULTS_CACHE.get(job_id)
+    if job_data is None:
+        return _queue_rethreshold(job_id, data)
+    CACHE_REQUESTS.inc(cache="results", result="hit")
+
+    started = time.perf_counter()
+    top_k = data.top_k or job_data["top_k"]
+    alignment_results, top_hits, _ = _run_multi_alignment_pipeline(
+        query_frames=job_data["frames"],
+        targets=job_data["targets"],
+        direction=job_data["direction"],
+        align_threshold=data.threshold,
+        top_k=top_k,
+        alignment_cache=job_data["alignment_cache"],
+        target_clusters=job_data.get("target_clusters"))
+
+    rethreshold_id = str(uuid.uuid4())
+    RESULTS_CACHE[rethreshold_id] = {**job_data, "alignment_results": alignment_results,
+                                     **_index_results(alignment_results, top_hits),
+                                     "align_threshold": data.threshold, "top_k": top_k}
+    response = {
+        "job_id": rethreshold_id,
+        "rethreshold_of": job_id,
+        "mode": "inline",
+        "threshold": data.threshold,
+        "alignment_results": alignment_results,
+        "available_targets": top_hits.keys()
+    }
+    if data.page_size or len(alignment_results) > INLINE_RESULTS_LIMIT:
+        response.update(_first_results_page(RESULTS_CACHE[rethreshold_id], data.page_size or INLINE_RESULTS_LIMIT))
+    else:
+        response["top_hits"] = top_hits.to_json()
+    response["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return FastJSONResponse(response)
 
 
 # ==============================================================================
@@ -197,22 +451,23 @@ async def parse_fasta_file(fasta_file: UploadFile = File(...)):
 
 @router.post("/frames/single")
 def build_frames_single(data: FrameRequestSingle):
-    frame_set = generate_frames(data.sequence, data.direction)
-    return frame_set
+    frame_set = generate_frames(data.sequence, data.direction, compact=data.compact)
+    return FastJSONResponse(frame_set)
 
 @router.post("/frames/multi")
 def build_frames_multi(data: FrameRequestMulti):
     frame_set = {}
     for name, seq in data.sequences.items():
-        frame_set[name] = generate_frames(seq, data.direction)
-    return frame_set
+        frame_set[name] = generate_frames(seq, data.direction, compact=data.compact)
+    return FastJSONResponse(frame_set)
 
 @router.post("/align/single")
 def pairwise_align_single(data: AlignmentRequestSingle):
-    top_hits = defaultdict(list)
+    top_hits = TopHits(data.top_k)
     results_df = pd.DataFrame(columns = ["Name", "Target", "Identity-Score", "Direction", 
                                          "Most-Likely-ORF", "Notes"])
-    all_orfs = [orf for entry in data.query_frames.values() for orf in entry.orf_set]
+    all_orfs, orf_refs = record_orf_refs("", {label: entry.dict() for label, entry in data.query_frames.items()},
+                                         top_hits)
     direction = infer_direction(data.query_frames)
 
     if len(all_orfs) == 0:
@@ -221,7 +476,7 @@ def pairwise_align_single(data: AlignmentRequestSingle):
     results_df, final_align_res = batch_alignment_cycle(direction=direction, record_id="", orf_set=all_orfs, 
                                                         target_set={'': data.target}, top_hits=top_hits,
                                                         curr_results_data=results_df, 
-                                                        align_threshold=data.threshold)
+                                                        align_threshold=data.threshold, orf_refs=orf_refs)
     
     if final_align_res is None:
         return {'detail': 'No final alignment was determined.'}
@@ -229,20 +484,33 @@ def pairwise_align_single(data: AlignmentRequestSingle):
     
     return response
 
+@router.post("/align/render")
+def render_alignment_readout(data: AlignmentRenderRequest):
+    # Stateless counterpart of the lazy getter, for /align/single and /align/multi results.
+    try:
+        return {'alignment': render_alignment(data.target, data.query, data.alignment.dict())}
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=f"Alignment doesn't fit the sequences: {e}")
+
 @router.post("/align/multi")
 def pairwise_align_multi(data: AlignmentRequestMulti, db: Session = Depends(get_db),
                          current_user: Optional[User] = Depends(get_optional_user)):
-    top_hits = defaultdict(list)
+    top_hits = TopHits(data.top_k)
     results_df = pd.DataFrame(columns = ["Name", "Target", "Identity-Score", "Direction", 
                                          "Most-Likely-ORF", "Notes"])
     alignment_results = {}
+    alignment_cache = AlignmentCache()
+    try:
+        validate_target_panel(data.targets)
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail=str(e))
+    target_clusters = cluster_targets(data.targets) if data.collapse_targets else None
+    query_frames = {seq_name: {label: frame.dict() for label, frame in frame_data.items()}
+                    for seq_name, frame_data in data.query_frames.items()}
+    direction = infer_direction(data.query_frames) if data.query_frames else "BOTH"
     
-    for seq_name, frame_data in data.query_frames.items():
-        all_orfs = []
-        for frame in frame_data.values():
-            all_orfs.extend(frame.orf_set)
-
-        direction = infer_direction(data.query_frames)
+    for seq_name, frame_data in query_frames.items():
+        all_orfs, orf_refs = record_orf_refs(seq_name, frame_data, top_hits)
 
         if len(all_orfs) == 0:
             results_df = data_export(results_df, seq_name, direction, "N/A", 0.0, "N/A", notes="No ORFs!")
@@ -253,7 +521,9 @@ def pairwise_align_multi(data: AlignmentRequestMulti, db: Session = Depends(get_
         results_df, final_align_res = batch_alignment_cycle(direction=direction, record_id=seq_name, 
                                                             orf_set=all_orfs, target_set=data.targets,
                                                             top_hits=top_hits, curr_results_data=results_df,
-                                                            align_threshold=data.threshold)
+                                                            align_threshold=data.threshold, orf_refs=orf_refs,
+                                                            alignment_cache=alignment_cache,
+                                                            target_clusters=target_clusters)
 
         if final_align_res is None:
             alignment_results[seq_name] = {'detail': 'No final alignment determined.'}
@@ -261,17 +531,32 @@ def pairwise_align_multi(data: AlignmentRequestMulti, db: Session = Depends(get_
             alignment_results[seq_name] = final_align_res
 
     # Save artifacts if user is logged in
-    response = {'alignment_results': alignment_results, 'top_hits': top_hits}
-    if current_user:
-        results_key, top_hits_key = save_alignment_artifacts(results_df=results_df, top_hits=top_hits,
-                                                             current_user=current_user, s3_client=s3_client,
-                                                             bucket_name=fasta_bucket_name, db=db)
-        presigned_result_url = generate_presigned_url(results_key, filename="orf_mappings.csv")
-        presigned_hits_url = generate_presigned_url(top_hits_key, filename="top_hits.csv")
-
-        response['download_links'] = {
-            'orf_mappings': presigned_result_url,
-            'top_hits': presigned_hits_url
+    if data.page_size:
+        # Paged responses keep the full results in RESULTS_CACHE, behind /results/{job_id}/records and /hits,
+        # along with everything /results/{job_id}/rethreshold needs (as /process/multi stores them).
+        job_id = str(uuid.uuid4())
+        RESULTS_CACHE[job_id] = {
+            "frames": query_frames,
+            "alignment_results": alignment_results,
+            **_index_results(alignment_results, top_hits),
+            "targets": data.targets,
+            "alignment_cache": alignment_cache,
+            "target_clusters": target_clusters,
+            "direction": direction,
+            "align_threshold": data.threshold,
+            "top_k": data.top_k
         }
+        response = {'job_id': job_id, **_first_results_page(RESULTS_CACHE[job_id], data.page_size),
+                    'available_targets': top_hits.keys()}
+    else:
+        response = {'alignment_results': alignment_results, 'top_hits': top_hits.to_json()}
+    if target_clusters is not None:
+        response['target_clusters'] = target_clusters.summary()
+    if current_user:
+        artifact_keys = save_alignment_artifacts(results_df=results_df, top_hits=top_hits,
+                                                 current_user=current_user, s3_client=s3_client,
+                                                 bucket_name=fasta_bucket_name, db=db,
+                                                 output_format=data.output_format)
+        response['download_links'] = generate_artifact_links(artifact_keys)
 
-    return response
+    return FastJSONResponse(response)
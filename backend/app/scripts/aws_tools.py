@@ -1,51 +1,107 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.scripts.profiling import span
+from app.scripts.compression import decode_fasta_bytes, open_fasta_text
+
+import asyncio
 import boto3
 import json
 import os
 import io
+import sys
+import uuid
 
 fasta_bucket_name = os.environ.get("FASTA_S3_BUCKET_NAME")
+
+# Direct-to-S3 uploads: a single presigned PUT up to the threshold, presigned multipart parts beyond it.
+MULTIPART_THRESHOLD_BYTES = int(os.environ.get("MULTIPART_THRESHOLD_MB", "64")) * 1024 * 1024
+UPLOAD_PART_BYTES = int(os.environ.get("UPLOAD_PART_MB", "32")) * 1024 * 1024
+MAX_DIRECT_UPLOAD_BYTES = int(os.environ.get("MAX_DIRECT_UPLOAD_MB", "5120")) * 1024 * 1024
+MAX_UPLOAD_PARTS = 10000 # S3's own limit.
+
 sqs_queue_url = os.environ.get("JOB_QUEUE_URL")
 dynamo_table_name = os.environ.get("DYNAMO_TABLE_NAME", "JobStatus")
-
-sqs_client = boto3.client("sqs")
-dynamo = boto3.resource("dynamodb")
-jobs_table = dynamo.Table(dynamo_table_name)
+# Lane counters and fair-share leases; kept apart from the job table, whose rows /jobs/status serves.
+scheduling_table_name = os.environ.get("SCHEDULING_TABLE_NAME", "SchedulingState")
 
 # In Lambda, boto3 will automatically find the IAM Role credentials -- no keys needed.
 # However, when running locally, we need to collect the credentials ourselves.
 if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
     print("Running in Lambda, using IAM Role for S3 credentials.")
-    s3_client = boto3.client("s3", region_name="us-east-2")
 else:
     print("Running locally, using .env file for S3 credentials.")
+
+def create_s3_client():
+    if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return boto3.client("s3", region_name="us-east-2")
+
     aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
     aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
 
-    s3_client = boto3.client(
+    return boto3.client(
         's3',
         aws_access_key_id=aws_access_key_id,
         aws_secret_access_key=aws_secret_access_key,
         region_name="us-east-2"
     )
 
+sqs_client = boto3.client("sqs")
+dynamo = boto3.resource("dynamodb")
+jobs_table = dynamo.Table(dynamo_table_name)
+scheduling_table = dynamo.Table(scheduling_table_name)
+s3_client = create_s3_client()
+
+def reset_aws_clients():
+    """
+    boto3 sessions and clients aren't fork-safe: a forked worker child would otherwise share the parent's
+    connection pools. Replaces this module's clients with fresh ones, along with the copies that 'from aws_tools
+    import *' left in other modules.
+    """
+    global sqs_client, dynamo, jobs_table, scheduling_table, s3_client
+    stale = {"sqs_client": sqs_client, "dynamo": dynamo, "jobs_table": jobs_table,
+             "scheduling_table": scheduling_table, "s3_client": s3_client}
+
+    boto3.setup_default_session() # The session (credential cache, locks) is replaced too.
+    sqs_client = boto3.client("sqs")
+    dynamo = boto3.resource("dynamodb")
+    jobs_table = dynamo.Table(dynamo_table_name)
+    scheduling_table = dynamo.Table(scheduling_table_name)
+    s3_client = create_s3_client()
+
+    fresh = {"sqs_client": sqs_client, "dynamo": dynamo, "jobs_table": jobs_table,
+             "scheduling_table": scheduling_table, "s3_client": s3_client}
+    for module in list(sys.modules.values()):
+        for name, client in stale.items():
+            if getattr(module, name, None) is client:
+                setattr(module, name, fresh[name])
+
 # S3 Helpers
 
 async def upload_to_s3(file_obj, upload_key: str):
     if isinstance(file_obj, str):
         raw_content = file_obj.encode('utf-8')
+    elif isinstance(file_obj, (bytes, bytearray)):
+        raw_content = file_obj
     else:
         raw_content = await file_obj.read()
     
-    s3_client.put_object(Bucket=fasta_bucket_name, Key=upload_key, Body=raw_content)
+    # put_object blocks, so it runs on the default thread pool; concurrent uploads can then overlap.
+    with span("s3_upload"):
+        await asyncio.to_thread(s3_client.put_object, Bucket=fasta_bucket_name, Key=upload_key, Body=raw_content)
 
 def download_from_s3(file_key: str):
     file_obj = s3_client.get_object(Bucket=fasta_bucket_name, Key=file_key)
-    file_content = file_obj["Body"].read().decode("utf-8")
+    # Gzip/BGZF objects (e.g. uploaded .fa.gz files) are inflated transparently.
+    file_content = decode_fasta_bytes(file_obj["Body"].read())
     return io.StringIO(file_content) 
 
+def open_s3_stream(file_key: str):
+    # Lazily-decoded (and, for gzip/BGZF, lazily-inflated) text handle over the object body, so parsing can
+    # begin before the download ends.
+    file_obj = s3_client.get_object(Bucket=fasta_bucket_name, Key=file_key)
+    return open_fasta_text(file_obj["Body"])
+
 def get_bucket_name():
     return fasta_bucket_name
 
@@ -56,28 +112,117 @@ def generate_presigned_url(key: str, filename: str = None, expires: int = 3600):
 
     return s3_client.generate_presigned_url('get_object', Params=url_params, ExpiresIn=expires)
 
+def generate_presigned_upload(key: str, size: int, expires: int = 3600) -> dict:
+    if size <= MULTIPART_THRESHOLD_BYTES:
+        url = s3_client.generate_presigned_url('put_object', Params={'Bucket': fasta_bucket_name, 'Key': key},
+                                               ExpiresIn=expires)
+        return {'key': key, 'method': 'PUT', 'url': url}
+
+    part_size = max(UPLOAD_PART_BYTES, -(-size // MAX_UPLOAD_PARTS))
+    upload_id = s3_client.create_multipart_upload(Bucket=fasta_bucket_name, Key=key)["UploadId"]
+    part_urls = [
+        s3_client.generate_presigned_url('upload_part', ExpiresIn=expires,
+                                         Params={'Bucket': fasta_bucket_name, 'Key': key,
+                                                 'UploadId': upload_id, 'PartNumber': part_number})
+        for part_number in range(1, -(-size // part_size) + 1)
+    ]
+    return {'key': key, 'method': 'MULTIPART', 'upload_id': upload_id, 'part_size': part_size,
+            'part_urls': part_urls}
+
+def complete_multipart_upload(key: str, upload_id: str, parts: list):
+    # 'parts' holds (part_number, etag) pairs as reported back by the client after each part PUT.
+    s3_client.complete_multipart_upload(
+        Bucket=fasta_bucket_name, Key=key, UploadId=upload_id,
+        MultipartUpload={'Parts': [{'PartNumber': number, 'ETag': etag} for number, etag in sorted(parts)]})
+
+def head_from_s3(file_key: str):
+    # Object metadata (size, ETag), or None if the object doesn't exist.
+    try:
+        return s3_client.head_object(Bucket=fasta_bucket_name, Key=file_key)
+    except s3_client.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+def read_s3_prefix(file_key: str, length: int) -> bytes:
+    file_obj = s3_client.get_object(Bucket=fasta_bucket_name, Key=file_key, Range=f"bytes=0-{length - 1}")
+    return file_obj["Body"].read()
+
+def generate_artifact_links(artifact_keys: dict) -> dict:
+    """
+    Presigned links for save_alignment_artifacts' output. '<table>' points at the first format written
+    (CSV unless the job asked for Parquet only) and every format is also linked as '<table>_<format>'.
+    """
+    links = {}
+    for table, keys in artifact_keys.items():
+        for fmt, key in keys.items():
+            url = generate_presigned_url(key, filename=f"{table}.{fmt}")
+            links.setdefault(table, url)
+            links[f"{table}_{fmt}"] = url
+    return links
+
 # SQS Helper
 
-def enqueue_job(job_id, input_key, target_key, direction, user_id=None):
+def enqueue_job(job_id, input_key, target_key, direction, user_id=None, align_threshold=0.98,
+                queue_url=None, delay_seconds=0, extra_fields=None, top_k=5, target_library_key=None,
+                output_format="csv", alphabet="strict", collapse_targets=False, expected_status=None,
+                message_fields=None):
+    """
+    Marks the job PENDING and sends its message. The row is updated in place, so a direct upload's row
+    keeps its upload keys; with 'expected_status' the flip only happens from that status. If the send
+    fails, the job goes back to 'expected_status' (so finalize can be retried) or, for a fresh job, to
+    FAILED, since nothing would ever pick it up.
+    """
+    extra_fields = extra_fields or {}
     message = {
         "job_id": job_id,
         "input_key": input_key,
         "target_key": target_key,
         "direction": direction,
-        "user_id": user_id
+        "user_id": user_id,
+        "align_threshold": align_threshold,
+        "top_k": top_k,
+        "target_library_key": target_library_key,
+        "output_format": output_format,
+        "alphabet": alphabet,
+        "collapse_targets": collapse_targets,
+        "size_class": extra_fields.get("size_class"),
+        **(message_fields or {})
     }
-    sqs_client.send_message(QueueUrl=sqs_queue_url, MessageBody=json.dumps(message))
+    # PENDING is written first, so a worker that picks the message up straight away always finds it.
+    fields = {"status": "PENDING", **extra_fields}
+    update = {
+        "Key": {"job_id": job_id},
+        "UpdateExpression": "SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+        "ExpressionAttributeNames": {f"#f{i}": name for i, name in enumerate(fields)},
+        "ExpressionAttributeValues": {f":v{i}": value for i, value in enumerate(fields.values())}
+    }
+    if expected_status:
+        update["ConditionExpression"] = "#f0 = :expected"
+        update["ExpressionAttributeValues"][":expected"] = expected_status
+    jobs_table.update_item(**update)
 
-    jobs_table.put_item(
-        Item={
-            "job_id": job_id,
-            "status": "PENDING"
-        }
-    )
+    try:
+        sqs_client.send_message(QueueUrl=queue_url or sqs_queue_url, MessageBody=json.dumps(message),
+                                DelaySeconds=delay_seconds)
+    except Exception:
+        jobs_table.update_item(Key={"job_id": job_id}, UpdateExpression="SET #status = :previous",
+                               ExpressionAttributeNames={"#status": "status"},
+                               ExpressionAttributeValues={":previous": expected_status or "FAILED"})
+        raise
 
 # Redis Helpers
 
+def is_job_id(job_id) -> bool:
+    # Job ids are always str(uuid4()); anything else is never looked up.
+    try:
+        return str(uuid.UUID(job_id)) == job_id
+    except (TypeError, ValueError, AttributeError):
+        return False
+
 def get_job_status(job_id):
+    if not is_job_id(job_id):
+        return {"status": "UNKNOWN"}
     try:
         response = jobs_table.get_item(Key={"job_id": job_id})
         return response.get("Item", {"status": "UNKNOWN"})
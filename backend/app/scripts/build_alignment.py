@@ -10,34 +10,343 @@ the end for clarity; the final identity score is returned to the user.
 
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from Bio import Align
 from Bio.Align import substitution_matrices
 from app.scripts.utils import *
+from app.scripts.profiling import span
+from app.scripts.metrics import ALIGNERS_CREATED, ALIGNMENTS_TOTAL, ALIGNMENT_SECONDS, ALIGNMENTS_PRUNED, \
+    CACHE_REQUESTS
+from itertools import groupby
+import hashlib
 import heapq
+import os
+import re
+import threading
+import time
+import numpy as np
+
+DEFAULT_TOP_K = 5
+MAX_TOP_K = 100
+
+# Exactness mode for the bound-based pruning in batch_alignment_cycle/align(). Every record's best hit
+# is exact either way. With EXACT_TOP_HITS on (the default), an ORF-target pair is only skipped when it
+# can neither beat the record's best LCA nor enter that target's top-hit heap, so heaps match an
+# exhaustive search. Turning it off ("0") also skips pairs that could only have fed the heaps, which is
+# faster but leaves the top hits approximate.
+EXACT_TOP_HITS = os.environ.get("EXACT_TOP_HITS", "1") != "0"
+
+# Upper bound on memoized ORF-target results held by one AlignmentCache (roughly 200 bytes each).
+ALIGNMENT_CACHE_MAX_PAIRS = int(os.environ.get("ALIGNMENT_CACHE_MAX_PAIRS", "250000"))
+
+# One configured PairwiseAligner per thread, reused across ORFs, records and (on warm containers) jobs.
+_THREAD_ALIGNERS = threading.local()
+
+# An ORF reference: (record id, frame label, start, end) offsets into that frame's aa_seq.
+OrfRef = Tuple[str, str, int, int]
+
+class TopHits:
+    """
+    Per-target min-heaps of the K best ORFs by identity. Heap entries are (identity_pct, -rank, lca,
+    orf_ref) -- the ref only points at shared record/frame strings plus two offsets, so no ORF residues
+    are copied into the heaps. Residues are resolved from the registered frame sequences on export.
+
+    'rank' is the ORF's position in input order. Identity ties go to the earlier ORF no matter what order
+    the ORFs are aligned in, which is what lets batch_alignment_cycle reorder and prune them.
+    """
+
+    def __init__(self, k: int = DEFAULT_TOP_K):
+        self.k = max(1, min(int(k), MAX_TOP_K))
+        self.heaps: Dict[str, List] = defaultdict(list)
+        self.frame_seqs: Dict[Tuple[str, str], str] = {}
+        self.next_rank = 0
+
+    def reserve_ranks(self, count: int) -> int:
+        base, self.next_rank = self.next_rank, self.next_rank + count
+        return base
+
+    def register_frame(self, record_id: str, frame_label: str, aa_seq: str):
+        self.frame_seqs[(record_id, frame_label)] = aa_seq
+
+    def push(self, target_id: str, identity_pct: float, lca: int, orf_ref: OrfRef, rank: int = 0):
+        # Reevaluate the heap to fit in the new datapoint if it outranks the min element (at index 0).
+        # Being that this is a min-heap, we only spend O(logn) time on the insertion/search step as
+        # opposed to the O(n) limitation of a standard list.
+        heap = self.heaps[target_id]
+        new_heap_entry = (identity_pct, -rank, lca, orf_ref)
+        if len(heap) < self.k:
+            heapq.heappush(heap, new_heap_entry) # Populate heap if still vacant.
+        elif new_heap_entry[:2] > heap[0][:2]:
+            heapq.heappushpop(heap, new_heap_entry) # Replace if needed.
+
+    def could_enter(self, target_id: str, identity_bound: float, rank: int) -> bool:
+        heap = self.heaps.get(target_id)
+        return heap is None or len(heap) < self.k or (identity_bound, -rank) > heap[0][:2]
+
+    def orf_sequence(self, orf_ref: OrfRef) -> str:
+        record_id, frame_label, start, end = orf_ref
+        return self.frame_seqs[(record_id, frame_label)][start:end]
+
+    def keys(self) -> List[str]:
+        return list(self.heaps.keys())
+
+    def sorted_hits(self, target_id: str) -> Optional[List]:
+        heap = self.heaps.get(target_id)
+        if heap is None:
+            return None
+        return [(identity, lca, ref) for identity, _, lca, ref in sorted(heap, reverse=True)]
+
+    def expanded_hits(self, target_id: str) -> Optional[List]:
+        # Legacy row shape consumed by the UI and CSV export: [identity, lca, orf_sequence, record_id].
+        hits = self.sorted_hits(target_id)
+        if hits is None:
+            return None
+        return [[identity, lca, self.orf_sequence(ref), ref[0]] for identity, lca, ref in hits]
+
+    def expanded_items(self):
+        for target_id in self.heaps:
+            yield target_id, self.expanded_hits(target_id)
+
+    def to_json(self) -> dict:
+        """
+        Compact artifact: every referenced ORF is emitted once in 'orfs' (keyed by a small integer id),
+        and each target's hits point at those ids: {'k', 'orfs': {id: {...}}, 'hits': {target: [...]}}.
+        """
+        orf_ids, orfs, hits = {}, {}, {}
+        for target_id in self.heaps:
+            rows = []
+            for identity, lca, ref in self.sorted_hits(target_id):
+                if ref not in orf_ids:
+                    orf_ids[ref] = len(orf_ids)
+                    record_id, frame_label, start, end = ref
+                    orfs[orf_ids[ref]] = {'record': record_id, 'frame': frame_label, 'start': start, 'end': end,
+                                          'sequence': self.orf_sequence(ref)}
+                rows.append([identity, lca, orf_ids[ref]])
+            hits[target_id] = rows
+
+        return {'k': self.k, 'orfs': orfs, 'hits': hits}
+
+class AlignmentCache:
+    """
+    Per-job interning of ORF-target alignments. Identical ORFs (repeated reads, or the same ORF found in
+    different records/frames) are keyed by a digest of their residues, so each unique ORF is aligned
+    against a target once and later copies reuse the stored result. Callers still push every copy into
+    the top-hit heaps under its own ref and rank, so outputs are unchanged.
+
+    Entries hold only the threshold-independent part of a pair -- (identity_pct, chunks, encoding), where
+    chunks are the per-chunk (query_start, match_string) vectors -- and LCA picks are derived from them
+    per threshold. Persisting the cache (to_json/from_json) is what lets a finished job be re-thresholded
+    without re-aligning.
+    """
+
+    def __init__(self, max_pairs: int = ALIGNMENT_CACHE_MAX_PAIRS):
+        self.pairs: Dict[str, Dict[str, tuple]] = {}
+        self.lca_picks: Dict[tuple, tuple] = {}
+        self.max_pairs = max_pairs
+        self.size = 0
+
+    def get(self, orf_key: str, target_id: str) -> Optional[tuple]:
+        result = self.pairs.get(orf_key, {}).get(target_id)
+        CACHE_REQUESTS.inc(cache="orf_alignment", result="miss" if result is None else "hit")
+        return result
+
+    def put(self, orf_key: str, target_id: str, result: tuple):
+        if self.size >= self.max_pairs:
+            return
+        self.pairs.setdefault(orf_key, {})[target_id] = result
+        self.size += 1
+
+    def lca(self, orf_key: str, target_id: str, chunks: List, identity_ratio: float) -> tuple:
+        pick_key = (orf_key, target_id, identity_ratio)
+        pick = self.lca_picks.get(pick_key)
+        if pick is None:
+            pick = chunk_lca(chunks, identity_ratio)
+            if orf_key in self.pairs and target_id in self.pairs[orf_key]:
+                self.lca_picks[pick_key] = pick
+        return pick
+
+    def to_json(self) -> dict:
+        # Match strings are run-length encoded, e.g. '||||.||--' -> '4|1.2|2-'.
+        return {'pairs': {orf_key: {target_id: [identity_pct, [[query_start, encode_match_vector(match_seq)]
+                                                               for query_start, match_seq in chunks], encoding]
+                                    for target_id, (identity_pct, chunks, encoding) in targets.items()}
+                          for orf_key, targets in self.pairs.items()}}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "AlignmentCache":
+        cache = cls(max_pairs=float("inf"))
+        for orf_key, targets in data.get('pairs', {}).items():
+            for target_id, (identity_pct, chunks, encoding) in targets.items():
+                cache.put(orf_key, target_id, (identity_pct, [(query_start, decode_match_vector(vector))
+                                                              for query_start, vector in chunks], encoding))
+        return cache
+
+def orf_digest(orf: str) -> str:
+    return hashlib.blake2b(orf.encode(), digest_size=16).hexdigest()
+
+def encode_match_vector(match_seq: str) -> str:
+    return ''.join(f"{len(list(run))}{symbol}" for symbol, run in groupby(match_seq))
+
+def decode_match_vector(vector: str) -> str:
+    return ''.join(symbol * int(count) for count, symbol in re.findall(r"(\d+)(\D)", vector))
+
+def record_orf_refs(record_id: str, frame_data: Dict, top_hits: TopHits) -> Tuple[List[str], List[OrfRef]]:
+    """
+    Registers a record's frames with the top-hit store and returns its ORFs alongside their refs. Handles
+    compact frames ('orf_spans') directly; legacy 'orf_set' frames are located by scanning aa_seq in order.
+    """
+    orfs, refs = [], []
+    for frame_label, frame in frame_data.items():
+        aa_seq = frame.get('aa_seq', "")
+        top_hits.register_frame(record_id, frame_label, aa_seq)
+
+        if frame.get('orf_spans') is not None:
+            for start, end in frame['orf_spans']:
+                orfs.append(aa_seq[start:end])
+                refs.append((record_id, frame_label, start, end))
+            continue
+
+        cursor = 0
+        for i, orf in enumerate(frame.get('orf_set') or []):
+            start = aa_seq.find(orf, cursor)
+            orfs.append(orf)
+            if start < 0: # Not a substring of aa_seq (hand-edited input), so register it standalone.
+                standalone_label = f"{frame_label}#{i}"
+                top_hits.register_frame(record_id, standalone_label, orf)
+                refs.append((record_id, standalone_label, 0, len(orf)))
+                continue
+            refs.append((record_id, frame_label, start, start + len(orf)))
+            cursor = start + len(orf)
+
+    return orfs, refs
 
 def batch_alignment_cycle(direction: str, record_id: str, orf_set: List[str], target_set: Dict[str, str], 
-                          top_hits: Dict[str, List], curr_results_data: pd.DataFrame, align_threshold: float):
-    max_lca, final_align_res, top_orf = 0, None, None
-    for orf in orf_set:
-        align_res = align(query=orf, origin_seq=record_id, target_set=target_set, 
-                          top_hits=top_hits, identity_ratio=align_threshold)
-        if align_res.get('length') > max_lca:
+                          top_hits: TopHits, curr_results_data: pd.DataFrame, align_threshold: float,
+                          orf_refs: List[OrfRef], exact_top_hits: bool = EXACT_TOP_HITS,
+                          alignment_cache: Optional[AlignmentCache] = None, target_clusters=None):
+    # ORFs are aligned longest-first: an LCA can never exceed the ORF's length, so once the best LCA is
+    # at least as long as the next ORF, neither it nor anything after it can take over.
+    order = sorted(range(len(orf_set)), key=lambda i: (-len(orf_set[i]), i))
+    base_rank = top_hits.reserve_ranks(len(orf_set))
+
+    max_lca, best_index, final_align_res, top_orf = 0, None, None, None
+    for i in order:
+        orf = orf_set[i]
+        # Ties on LCA still go to the ORF that comes first in input order, as they did before reordering,
+        # so an earlier ORF only has to match max_lca while a later one has to beat it.
+        lca_floor = max_lca - 1 if best_index is not None and i < best_index else max_lca
+        if len(orf) <= lca_floor and not exact_top_hits:
+            ALIGNMENTS_PRUNED.inc(len(target_set) * (len(order) - order.index(i)))
+            break
+
+        with span("align"):
+            align_res = align(query=orf, orf_ref=orf_refs[i], target_set=target_set, 
+                              top_hits=top_hits, identity_ratio=align_threshold, rank=base_rank + i,
+                              lca_floor=lca_floor, exact_top_hits=exact_top_hits,
+                              alignment_cache=alignment_cache, target_clusters=target_clusters)
+        if align_res.get('length') > lca_floor:
                 max_lca = align_res.get('length')
+                best_index = i
                 final_align_res = align_res
                 top_orf = orf
 
-    results_df = data_export(curr_results_data, record_id, direction, top_orf, 
-                             final_align_res.get("identity_pct"), final_align_res.get("target"), "")
+    with span("data_export"):
+        if final_align_res is None:
+            return data_export(curr_results_data, record_id, direction, "N/A", 0.0, "N/A",
+                               "No alignment above threshold!"), None
+        results_df = data_export(curr_results_data, record_id, direction, top_orf, 
+                                 final_align_res.get("identity_pct"), final_align_res.get("target"), "")
     final_align_res.update({'top_orf': top_orf})
 
     return results_df, final_align_res
 
-def align(query: str, origin_seq: str, target_set: dict, top_hits: dict, identity_ratio: float):
-    aligner = create_aligner()
+def align(query: str, orf_ref: OrfRef, target_set: dict, top_hits: TopHits, identity_ratio: float,
+          rank: int = 0, lca_floor: int = -1, exact_top_hits: bool = EXACT_TOP_HITS,
+          alignment_cache: Optional[AlignmentCache] = None, target_clusters=None):
+    """
+    Aligns one ORF against every target. Targets are skipped when they can't matter: the LCA is bounded
+    by the shorter of the two sequences and the identity by shorter/longer, so a target whose LCA bound
+    can't beat both 'lca_floor' and this ORF's best so far (and, in exact mode, whose identity bound can't
+    enter its top-hit heap) is never aligned. A perfect full-length LCA therefore ends the scan early.
+
+    With 'target_clusters' (a target_clusters.TargetClusters), representatives are aligned first and
+    byte-identical copies reuse their alignment; near-identical members are only aligned when their
+    representative comes within the clusters' margin of this ORF's best. Hits keep the original target ids.
+    """
+    aligner = None # Fetched on first use, since cached or pruned ORFs may never need one.
+    orf_key = orf_digest(query) if alignment_cache is not None else None
     alignment_metadata = {'start': None, 'end': None, 'length': 0, 'target': None, 
                           'alignment': None, 'identity_pct': 0}
 
+    def evaluate(target_id: str, source_id: Optional[str] = None, pair_result: Optional[tuple] = None) -> tuple:
+        # Scores one target, optionally reusing the alignment of an identical 'source_id'. Returns the
+        # pair result (None if pruned) and its LCA.
+        nonlocal aligner
+        target_seq = target_set[target_id]
+        pair_key = source_id or target_id
+        hit_id = target_id.replace('\u200b', '')
+        lca_bound = min(len(query), len(target_seq))
+        if lca_bound <= max(lca_floor, alignment_metadata['length']):
+            identity_bound = round(lca_bound / max(len(query), len(target_seq), 1) * 100, 1)
+            if not exact_top_hits or not top_hits.could_enter(hit_id, identity_bound, rank):
+                ALIGNMENTS_PRUNED.inc()
+                return None, 0
+
+        if pair_result is None and alignment_cache is not None:
+            pair_result = alignment_cache.get(orf_key, pair_key)
+        if pair_result is None:
+            aligner = aligner or shared_aligner()
+            pair_result = align_pair(aligner, query, target_seq)
+            if alignment_cache is not None:
+                alignment_cache.put(orf_key, pair_key, pair_result)
+        identity_pct, chunks, encoding = pair_result
+
+        # Only the LCA pick depends on the threshold.
+        if alignment_cache is not None:
+            best_chunk_lca, best_start, best_end = alignment_cache.lca(orf_key, pair_key, chunks, identity_ratio)
+        else:
+            best_chunk_lca, best_start, best_end = chunk_lca(chunks, identity_ratio)
+
+        # If the winning LCA for this ORF-target combination beats out prior targets, reassign
+        # the metadata dictionary to represent the new best-fit target (and its LCA info).
+        if best_chunk_lca > alignment_metadata.get('length'):
+            alignment_metadata.update({'start': best_start, 'end': best_end, 'length': best_chunk_lca, 
+                                       'target': hit_id, 
+                                       'alignment': encoding, 'identity_pct': identity_pct})
+
+        top_hits.push(hit_id, identity_pct, best_chunk_lca, orf_ref, rank)
+        return pair_result, best_chunk_lca
+
+    if target_clusters is None:
+        for target_id in target_set:
+            evaluate(target_id)
+        # Return the final alignment result and target match for the input ORF.
+        return alignment_metadata
+
+    # A copy always comes after its original in panel order, so it can never take a tie from it.
+    representative_lcas = []
+    for target_id in target_clusters.representatives:
+        pair_result, lca = evaluate(target_id)
+        for copy_id in target_clusters.copies.get(target_id, ()):
+            evaluate(copy_id, target_id, pair_result)
+        representative_lcas.append((target_id, lca))
+
+    best_lca = alignment_metadata['length']
+    for target_id, lca in representative_lcas:
+        if not target_clusters.should_expand(lca, best_lca):
+            continue
+        for member_id in target_clusters.near[target_id]:
+            pair_result, _ = evaluate(member_id)
+            for copy_id in target_clusters.copies.get(member_id, ()):
+                evaluate(copy_id, member_id, pair_result)
+
+    return alignment_metadata
+
+def align_pair(aligner, query: str, target_seq: str) -> tuple:
+    # Returns the threshold-independent (identity_pct, chunks, encoding) for one ORF-target pair, where
+    # chunks are (query_start, match_string) per aligned chunk.
+    chunks = []
+
     '''
     General Body of the Alignment:
     
@@ -52,63 +361,63 @@ def align(query: str, origin_seq: str, target_set: dict, top_hits: dict, identit
 
     '''
 
-    best_chunk_lca, best_start, best_end = 0, None, None
-    for target_id, target_seq in target_set.items():
-        # We're trying to determine how much of the target is covered by the query (ORF) -- the
-        # alignment direction should reflect that.
+    # We're trying to determine how much of the target is covered by the query (ORF) -- the
+    # alignment direction should reflect that.
+    with span("pairwise_align"):
+        align_start = time.perf_counter()
         alignments = aligner.align(target_seq, query)
         alignment = alignments[0]
+        ALIGNMENTS_TOTAL.inc()
+        ALIGNMENT_SECONDS.inc(time.perf_counter() - align_start)
 
-        # Compute the global identity if there's a pairwise alignment to process.
+    # Compute the global identity if there's a pairwise alignment to process.
+    with span("identity_score"):
         identity_pct = 0.0 if alignment is None else float(calculate_identity_score(alignment))
 
-        for i in range(len(alignment.aligned[0])): # Parsing each chunk!
-            query_range = slice(alignment.aligned[1][i][0], alignment.aligned[1][i][1])
-            align_chunk = alignment[:, query_range]
+    for i in range(len(alignment.aligned[0])): # Parsing each chunk!
+        query_range = slice(alignment.aligned[1][i][0], alignment.aligned[1][i][1])
+        align_chunk = alignment[:, query_range]
 
-            # Helpful for viewing other components of the alignment object:
-            # target_range = slice(alignment.aligned[0][i][0], alignment.aligned[0][i][1])
-            # target_seq = alignment.sequences[0][target_range]
-            # query_seq = alignment.sequences[1][query_range]
+        # Helpful for viewing other components of the alignment object:
+        # target_range = slice(alignment.aligned[0][i][0], alignment.aligned[0][i][1])
+        # target_seq = alignment.sequences[0][target_range]
+        # query_seq = alignment.sequences[1][query_range]
 
-            # To exclude overly minimal and unlikely alignment portions:
-            # if query_range.stop - query_range.start <= 10:
-            #     continue
+        # To exclude overly minimal and unlikely alignment portions:
+        # if query_range.stop - query_range.start <= 10:
+        #     continue
 
-            # Extract the middle match string (comprised of |, ., or -), which will be used to
-            # find the longest overlapping region in the alignment.
+        # Extract the middle match string (comprised of |, ., or -), which will be used to
+        # find the longest overlapping region in the alignment.
+        with span("match_string"):
             match_elements = ''.join(str(align_chunk).splitlines()[1::2]).split()
             filtered_matches = [phrase for phrase in match_elements if not phrase.isdigit()]
             match_seq = ''.join(filtered_matches)
-            
-            # Retrieve the longest continuous alignment (LCA) parameters.
+        chunks.append((int(query_range.start), match_seq))
+
+    return identity_pct, chunks, encode_alignment(alignment)
+
+def chunk_lca(chunks: List, identity_ratio: float) -> tuple:
+    best_chunk_lca, best_start, best_end = 0, None, None
+    for query_start, match_seq in chunks:
+        # Retrieve the longest continuous alignment (LCA) parameters.
+        with span("lca"):
             start, end, length = compute_lca(match_seq, threshold=identity_ratio)
 
-            # If this LCA outperforms prior align chunks, update the appropriate variables!
-            if length > best_chunk_lca:
-                best_chunk_lca = length
-                best_start = start + int(query_range.start)
-                best_end = best_start + (end - start + 1)
-        
-        # If the winning LCA for this ORF-target combination beats out prior targets, reassign
-        # the metadata dictionary to represent the new best-fit target (and its LCA info).
-        if best_chunk_lca > alignment_metadata.get('length'):
-            alignment_metadata.update({'start': best_start, 'end': best_end, 'length': best_chunk_lca, 
-                                       'target': target_id.replace('\u200b', ''), 
-                                       'alignment': str(alignment), 'identity_pct': identity_pct})
-
-        # Reevaluate the heap to fit in the new datapoint if its identity score is higher than the
-        # min element (at index 0). Being that this is a min-heap, we only spend O(logn) time on the
-        # insertion/search step as opposed to the O(n) limitation of a standard list.
-        heap = top_hits[target_id.replace('\u200b', '')]
-        new_heap_entry = (identity_pct, best_chunk_lca, query, origin_seq)
-        if len(heap) < 5:
-            heapq.heappush(heap, new_heap_entry) # Populate heap if still vacant.
-        elif identity_pct > heap[0][0]:
-            heapq.heappushpop(heap, new_heap_entry) # Replace if needed.
-    
-    # Return the final alignment result and target match for the input ORF.
-    return alignment_metadata
+        # If this LCA outperforms prior align chunks, update the appropriate variables!
+        if length > best_chunk_lca:
+            best_chunk_lca = length
+            best_start = start + query_start
+            best_end = best_start + (end - start + 1)
+
+    return best_chunk_lca, best_start, best_end
+
+def shared_aligner():
+    # Aligners are configured once and only read afterwards, so each thread keeps one for the process's life.
+    aligner = getattr(_THREAD_ALIGNERS, "aligner", None)
+    if aligner is None:
+        aligner = _THREAD_ALIGNERS.aligner = create_aligner()
+    return aligner
 
 def create_aligner():
     # Declaring aligner attributes to exactly match those of EMBOSS Needle
@@ -118,6 +427,7 @@ def create_aligner():
     aligner.open_gap_score = -10
     aligner.extend_gap_score = -0.5
     aligner.substitution_matrix = substitution_matrices.load("BLOSUM62")
+    ALIGNERS_CREATED.inc()
 
     return aligner
 
@@ -157,3 +467,54 @@ def calculate_identity_score(alignment):
     # Computing relevant alignment statistics
     identity = sum(1 for a, b in zip(alignment[0], alignment[1]) if a == b and a != "-")
     return round(identity/alignment.length * 100, 1)
+
+def encode_alignment(alignment) -> dict:
+    """
+    Compact stand-in for str(alignment): the aligned coordinate blocks plus an equivalent CIGAR string
+    (target as reference, so 'D' is a gap in the ORF and 'I' a gap in the target). The sequences
+    themselves are carried by reference -- the result's 'target' id and 'top_orf'.
+    """
+    coordinates = alignment.coordinates.tolist()
+    return {'coordinates': coordinates, 'cigar': coordinates_to_cigar(coordinates)}
+
+def coordinates_to_cigar(coordinates: List[List[int]]) -> str:
+    ops = []
+    target_coords, query_coords = coordinates
+    for i in range(1, len(target_coords)):
+        target_step = target_coords[i] - target_coords[i - 1]
+        query_step = query_coords[i] - query_coords[i - 1]
+        op, size = ('M', target_step) if target_step and query_step else ('D', target_step) if target_step \
+            else ('I', query_step)
+        if size == 0:
+            continue
+        if ops and ops[-1][0] == op: # Merge runs split across coordinate blocks.
+            ops[-1][1] += size
+        else:
+            ops.append([op, size])
+
+    return ''.join(f"{size}{op}" for op, size in ops)
+
+def render_alignment(target_seq: str, query_seq: str, encoded: dict) -> str:
+    # Rebuilds the pretty-printed Biopython view from an encode_alignment() record on demand.
+    coordinates = encoded['coordinates']
+    if max(coordinates[0]) > len(target_seq) or max(coordinates[1]) > len(query_seq):
+        raise ValueError("coordinates run past the end of the sequences")
+
+    alignment = Align.Alignment([target_seq, query_seq], np.array(coordinates))
+    return str(alignment)
+
+def render_result_alignment(result: dict, targets: Dict[str, str]) -> Optional[str]:
+    encoded = result.get('alignment')
+    if not encoded:
+        return None
+    if isinstance(encoded, str): # Results written before the compact encoding are already rendered.
+        return encoded
+
+    target_id = result.get('target')
+    target_seq = targets.get(target_id)
+    if target_seq is None: # Stored target ids have zero-width spaces stripped (see align()).
+        target_seq = next((seq for name, seq in targets.items() if name.replace('\u200b', '') == target_id), None)
+    if target_seq is None:
+        return None
+
+    return render_alignment(target_seq, result['top_orf'], encoded)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# compression.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'compression' lets every FASTA reader in the backend accept gzip-compressed files (.fa.gz,
+including block-gzipped BGZF output from sequencing pipelines) as well as plain text. Compression is
+detected from the gzip magic bytes rather than the file name, and the data is decompressed as it's
+read, so compressed objects can stay compressed in S3 and still be parsed record by record.
+
+"""
+
+import gzip
+import io
+import zlib
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+def is_gzipped(data: bytes) -> bool:
+    return data[:2] == GZIP_MAGIC
+
+def decode_fasta_bytes(data: bytes) -> str:
+    # gzip.decompress reads every member, so BGZF's concatenated blocks come back whole.
+    return (gzip.decompress(data) if is_gzipped(data) else data).decode("utf-8")
+
+def gzip_fasta_text(text: str) -> bytes:
+    return gzip.compress(text.encode("utf-8"), compresslevel=6)
+
+def decompress_prefix(data: bytes) -> bytes:
+    """
+    Decompresses as much as possible of a truncated gzip/BGZF byte range (e.g. an S3 Range GET of a
+    file's first megabyte). Plain data is returned unchanged.
+    """
+    if not is_gzipped(data):
+        return data
+
+    output = []
+    while data[:2] == GZIP_MAGIC:
+        decompressor = zlib.decompressobj(wbits=31)
+        try:
+            output.append(decompressor.decompress(data))
+        except zlib.error:
+            break # The range ended inside a header; keep what was already decoded.
+        data = decompressor.unused_data
+    return b"".join(output)
+
+class _PeekedStream(io.RawIOBase):
+    # Replays bytes already read for sniffing before continuing with the underlying (non-seekable) stream.
+    def __init__(self, head: bytes, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.head:
+            count = min(len(buffer), len(self.head))
+            buffer[:count] = self.head[:count]
+            self.head = self.head[count:]
+            return count
+
+        chunk = self.stream.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+def open_fasta_text(stream) -> io.TextIOBase:
+    """
+    Wraps a binary stream (an S3 StreamingBody, an open file, ...) as a lazily-decoded text handle,
+    inflating it on the fly when it turns out to be gzip/BGZF.
+    """
+    head = stream.read(2)
+    binary = io.BufferedReader(_PeekedStream(head, stream))
+    if is_gzipped(head):
+        binary = gzip.GzipFile(fileobj=binary, mode="rb")
+    return io.TextIOWrapper(binary, encoding="utf-8")
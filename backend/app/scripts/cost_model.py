@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# cost_model.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'cost_model' predicts how long an alignment request will take before any alignment runs,
+which is what lets the API decide between answering inline (under API Gateway's 29-second ceiling) and
+queueing the job for the worker. ORF counts are extrapolated from an exact six-frame scan of a small,
+evenly spaced sample of records, and the runtime is a linear model over three work terms:
+
+    seconds = per_pair * (ORFs x targets) + per_cell * (ORF residues x target residues)
+              + per_lca_step * (sum of squared ORF lengths / 2 x targets)
+
+The last term reflects compute_lca's quadratic window scan, which dominates on long ORFs. Coefficients
+are read from cost_coefficients.json, fit with calibrate_cost_model against 'align' benchmark reports over
+read lengths of 300-2400 bp, panels of 3-10 targets and targets of 150-500 aa. DEFAULT_COEFFICIENTS (older
+hand measurements, which underestimate by about 4x) are only a fallback if that file is missing.
+
+"""
+
+from app.scripts.frame_retrieve import generate_frames
+from typing import Dict, List
+
+import json
+import os
+
+# Number of records scanned exactly when predicting ORF statistics.
+SAMPLE_RECORDS = 25
+
+# For reference, uniformly random DNA scanned in six frames yields roughly 0.024 ORFs, 0.48 ORF residues
+# and 19 squared ORF residues per input bp.
+EMPTY_ORF_STATS = {'orfs_per_bp': 0.0, 'orf_residues_per_bp': 0.0, 'orf_sq_residues_per_bp': 0.0}
+
+DEFAULT_COEFFICIENTS = {'per_pair': 2.0e-4, 'per_cell': 2.0e-8, 'per_lca_step': 1.5e-7}
+COEFFICIENTS_PATH = os.environ.get("COST_MODEL_PATH",
+                                   os.path.join(os.path.dirname(__file__), "cost_coefficients.json"))
+
+def load_coefficients(path: str = COEFFICIENTS_PATH) -> Dict[str, float]:
+    try:
+        with open(path) as f:
+            return {**DEFAULT_COEFFICIENTS, **json.load(f)}
+    except (FileNotFoundError, ValueError):
+        return dict(DEFAULT_COEFFICIENTS)
+
+COEFFICIENTS = load_coefficients()
+
+def sample_orf_stats(input_sequences: Dict[str, str], direction: str) -> Dict[str, float]:
+    names = list(input_sequences.keys())
+    if not names:
+        return dict(EMPTY_ORF_STATS)
+
+    step = max(1, len(names) // SAMPLE_RECORDS)
+    sampled_bp = orf_count = orf_residues = orf_sq_residues = 0
+    for name in names[::step][:SAMPLE_RECORDS]:
+        seq = input_sequences[name]
+        sampled_bp += len(seq)
+        for frame in generate_frames(seq, direction, compact=True).values():
+            for start, end in frame['orf_spans']:
+                orf_count += 1
+                orf_residues += end - start
+                orf_sq_residues += (end - start) ** 2
+
+    if sampled_bp == 0:
+        return dict(EMPTY_ORF_STATS)
+
+    return {'orfs_per_bp': orf_count / sampled_bp, 'orf_residues_per_bp': orf_residues / sampled_bp,
+            'orf_sq_residues_per_bp': orf_sq_residues / sampled_bp}
+
+def work_terms(orf_count: float, orf_residues: float, orf_sq_residues: float,
+               target_count: int, target_residues: int) -> Dict[str, float]:
+    return {'per_pair': orf_count * target_count,
+            'per_cell': orf_residues * target_residues,
+            'per_lca_step': orf_sq_residues / 2 * target_count}
+
+def _predict(stats: Dict[str, float], total_bp: int, records: int, targets: Dict[str, str],
+             coefficients: Dict[str, float] = None) -> dict:
+    coefficients = coefficients or COEFFICIENTS
+    target_residues = sum(len(seq) for seq in targets.values())
+
+    predicted_orfs = stats['orfs_per_bp'] * total_bp
+    terms = work_terms(predicted_orfs, stats['orf_residues_per_bp'] * total_bp,
+                       stats['orf_sq_residues_per_bp'] * total_bp, len(targets), target_residues)
+    seconds = sum(coefficients[name] * value for name, value in terms.items())
+
+    return {
+        'records': records,
+        'total_bp': total_bp,
+        'predicted_orfs': int(round(predicted_orfs)),
+        'targets': len(targets),
+        'target_residues': target_residues,
+        'estimated_seconds': round(seconds, 3)
+    }
+
+def estimate_alignment_cost(input_sequences: Dict[str, str], targets: Dict[str, str], direction: str,
+                            coefficients: Dict[str, float] = None) -> dict:
+    total_bp = sum(len(seq) for seq in input_sequences.values())
+    return _predict(sample_orf_stats(input_sequences, direction), total_bp, len(input_sequences), targets,
+                    coefficients)
+
+def estimate_alignment_cost_from_prefix(prefix_sequences: Dict[str, str], prefix_bytes: int, total_bytes: int,
+                                        targets: Dict[str, str], direction: str,
+                                        coefficients: Dict[str, float] = None) -> dict:
+    """
+    Same estimate for inputs the API never reads in full (direct-to-S3 uploads): the records parsed from
+    the file's first 'prefix_bytes' set the bp and record densities, which are scaled up to 'total_bytes'.
+    """
+    scale = total_bytes / max(1, prefix_bytes)
+    prefix_bp = sum(len(seq) for seq in prefix_sequences.values())
+    return _predict(sample_orf_stats(prefix_sequences, direction), int(prefix_bp * scale),
+                    int(round(len(prefix_sequences) * scale)), targets, coefficients)
+
+def calibrate_cost_model(reports: List[dict]) -> Dict[str, float]:
+    """
+    Least-squares fit of the three coefficients against the 'align' stage of benchmark reports
+    (benchmarks/run_benchmarks.py). Reports should span different read lengths and panel sizes, otherwise
+    the terms are collinear; negative fits are clamped back to the defaults.
+    """
+    import numpy as np
+
+    rows, seconds = [], []
+    for report in reports:
+        workload, stage = report['workload'], report['stages'].get('align')
+        if stage is None:
+            continue
+        terms = work_terms(workload['orf_count'], workload['orf_residues'], workload['orf_sq_residues'],
+                           workload['panel_size'], workload['target_residues'])
+        rows.append([terms[name] for name in DEFAULT_COEFFICIENTS])
+        seconds.append(stage['seconds'])
+
+    if len(rows) < len(DEFAULT_COEFFICIENTS):
+        raise ValueError(f"Need at least {len(DEFAULT_COEFFICIENTS)} benchmark reports with an 'align' stage.")
+
+    fit, *_ = np.linalg.lstsq(np.array(rows, dtype=float), np.array(seconds, dtype=float), rcond=None)
+    return {name: float(value) if value > 0 else DEFAULT_COEFFICIENTS[name]
+            for name, value in zip(DEFAULT_COEFFICIENTS, fit)}
+
+if __name__ == "__main__":
+    # Usage: python -m app.scripts.cost_model bench_a.json bench_b.json bench_c.json
+    # e.g. reports from: python -m benchmarks.run_benchmarks --only align --repeat 1 --reads 10 \
+    #                        --read-length {300,900,2400} --panel-size {3,10} --target-length {150,500}
+    import sys
+
+    loaded = []
+    for report_path in sys.argv[1:]:
+        with open(report_path) as f:
+            loaded.append(json.load(f))
+
+    calibrated = calibrate_cost_model(loaded)
+    with open(COEFFICIENTS_PATH, "w") as f:
+        json.dump(calibrated, f, indent=2)
+    print(f"Calibrated coefficients written to {COEFFICIENTS_PATH}: {calibrated}")
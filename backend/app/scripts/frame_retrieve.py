@@ -9,26 +9,65 @@ Description: 'process_seq' is responsible for executing and rendering the six-fr
 associated amino acid reads, this set of code is ultimately able to come up with the "most likely" AA 
 ORF (by length) to slot into the alignment portion of ESA.
 
+Records longer than WINDOWED_MIN_BP (chromosome-scale contigs) are translated in windows of
+FRAME_WINDOW_BP instead, so no full-length translation or reverse complement is ever held in memory.
+Windowed frames keep only their ORFs: 'aa_seq' is the ORF residues packed back to back (with
+'orf_spans' pointing into it as usual), 'orf_coords' maps each ORF to its nucleotide span on the forward
+strand of the original sequence, and 'aa_length' records the frame's full translated length.
+
+'input_seq' may also be a PackedSequence (see packed_seq): windowed frames decode it one window at a
+time, and shorter records are decoded once for the duration of their translation.
+
 """
 
 from app.scripts.translate import *
+from app.scripts.packed_seq import sequence_digest
+from typing import Dict, Iterator, List, Optional
+import os
 import re
 import warnings
 warnings.filterwarnings('ignore')
 
-def generate_frames(input_seq, translate_direction):
+WINDOWED_MIN_BP = int(os.environ.get("WINDOWED_MIN_BP", "1000000"))
+FRAME_WINDOW_BP = int(os.environ.get("FRAME_WINDOW_BP", "300000"))
+
+def generate_frames(input_seq, translate_direction, compact = False, windowed: Optional[bool] = None):
     frame_set = {}
     direction_set = ["FWD"] * 3 + ["REV"] * 3 if translate_direction == "BOTH" else \
                     [translate_direction] * 3 # building the frame labels
 
-    aa_seqs = get_translate_output(input_seq, translate_direction)
+    if windowed is None:
+        windowed = len(input_seq) > WINDOWED_MIN_BP
+    if windowed:
+        for i, direction in enumerate(direction_set):
+            entry = f"Frame #{i + 1} ({direction})"
+            frame_set[entry] = windowed_frame(input_seq, i % 3, direction == "REV", compact)
+        return frame_set
+
+    aa_seqs = get_translate_output(str(input_seq), translate_direction)
     
     for i in range(len(aa_seqs)):
         entry = f"Frame #{i + 1} ({direction_set[i]})" # label
-        frame_set[entry] = find_orfs(aa_seqs[i]) # extracting the ORF set
+        frame_set[entry] = find_orfs(aa_seqs[i], compact) # extracting the ORF set
     
     return frame_set
 
+class FrameInterner:
+    """
+    Identical reads (amplicon panels, clone screens) only get translated once: frames are keyed by a digest
+    of the sequence, and repeat records share the same frame dict (and aa_seq strings) as the first copy.
+    """
+
+    def __init__(self):
+        self.frames: Dict[tuple, Dict] = {}
+
+    def generate(self, input_seq: str, translate_direction: str, compact: bool = False) -> Dict:
+        key = (sequence_digest(input_seq), translate_direction, compact)
+        frame_set = self.frames.get(key)
+        if frame_set is None:
+            frame_set = self.frames[key] = generate_frames(input_seq, translate_direction, compact)
+        return frame_set
+
 def get_translate_output(input_seq, translate_direction):
     if translate_direction == "BOTH": # recursive call to account for both FWD and REV
         return get_translate_output(input_seq, "FWD") + get_translate_output(input_seq, "REV")
@@ -43,21 +82,101 @@ def get_translate_output(input_seq, translate_direction):
     
     return aa_seqs
 
-def find_orfs(aa_seq):
+def find_orfs(aa_seq, compact = False):
     leading_seq = "M"
     start_positions = [match.start() for match in re.finditer(leading_seq, aa_seq)]
     stop_positions = [match.start() for match in re.finditer("-", aa_seq)]
 
     closest_stop = 0
-    suitable_orfs = []
+    orf_spans = []
     for start in start_positions:
         if start > closest_stop:
             stop_candidates = [n for n, i in enumerate(stop_positions) if i > start]
             if len(stop_candidates) == 0:
-                suitable_orfs.append(aa_seq[start:])
+                orf_spans.append([start, len(aa_seq)])
                 break
             else:
                 closest_stop = stop_positions[stop_candidates[0]]
-                suitable_orfs.append(aa_seq[start:closest_stop])
+                orf_spans.append([start, closest_stop])
     
-    return {'aa_seq': aa_seq, 'orf_set': suitable_orfs}
+    # Compact frames keep (start, end) offsets into aa_seq instead of a second copy of every ORF's residues.
+    if compact:
+        return {'aa_seq': aa_seq, 'orf_spans': orf_spans}
+    return {'aa_seq': aa_seq, 'orf_set': [aa_seq[start:end] for start, end in orf_spans]}
+
+def frame_chunks(input_seq: str, offset: int, reverse: bool, window_bp: int = FRAME_WINDOW_BP) -> Iterator[str]:
+    """
+    Yields one frame's translation window by window, in frame order. Windows hold whole codons, so the
+    chunks concatenate to exactly what get_translate_output returns for that frame.
+    """
+    length = len(input_seq)
+    total_codons = max(0, (length - offset) // 3)
+    window_codons = max(1, window_bp // 3)
+    for first in range(0, total_codons, window_codons):
+        last = min(total_codons, first + window_codons)
+        if reverse:
+            yield translate(reverse_complement(input_seq[length - offset - 3 * last:length - offset - 3 * first]))
+        else:
+            yield translate(input_seq[offset + 3 * first:offset + 3 * last])
+
+def scan_orfs(chunks) -> Iterator[tuple]:
+    """
+    Streaming find_orfs over a frame's translation chunks: yields (start, end, residues) for the same
+    ORFs, in the same order. An ORF still open at the end of a chunk carries its residues (and the scan
+    state) into the next one, so ORFs spanning window boundaries are stitched without overlapping windows.
+    """
+    offset, open_start, pieces = 0, None, []
+    for chunk in chunks:
+        cursor = 0
+        while cursor < len(chunk):
+            if open_start is None:
+                # find_orfs never opens an ORF at position 0 of a frame (start must exceed the last stop, 0).
+                start = chunk.find("M", cursor if offset + cursor > 0 else 1)
+                if start < 0:
+                    break
+                open_start, cursor = offset + start, start
+
+            stop = chunk.find("-", cursor)
+            if stop < 0:
+                pieces.append(chunk[cursor:])
+                break
+            pieces.append(chunk[cursor:stop])
+            yield open_start, offset + stop, "".join(pieces)
+            open_start, pieces, cursor = None, [], stop + 1
+        offset += len(chunk)
+
+    if open_start is not None: # Runs off the end of the frame, like find_orfs' stop-less final ORF.
+        yield open_start, offset, "".join(pieces)
+
+def windowed_frame(input_seq: str, offset: int, reverse: bool, compact: bool = False,
+                   window_bp: int = FRAME_WINDOW_BP) -> Dict:
+    length = len(input_seq)
+    packed, orf_spans, orf_coords, cursor = [], [], [], 0
+    for start, end, residues in scan_orfs(frame_chunks(input_seq, offset, reverse, window_bp)):
+        packed.append(residues)
+        orf_spans.append([cursor, cursor + len(residues)])
+        cursor += len(residues)
+        # Nucleotide span of the ORF's residues (stop codon excluded) on the forward strand.
+        if reverse:
+            orf_coords.append([length - offset - 3 * end, length - offset - 3 * start])
+        else:
+            orf_coords.append([offset + 3 * start, offset + 3 * end])
+
+    frame = {'aa_seq': "".join(packed), 'orf_coords': orf_coords, 'aa_length': max(0, (length - offset) // 3)}
+    if compact:
+        frame['orf_spans'] = orf_spans
+    else:
+        frame['orf_set'] = packed
+    return frame
+
+def frame_orfs(frame: Dict) -> List[str]:
+    # Materializes a frame's ORFs from either layout (legacy 'orf_set' or compact 'orf_spans').
+    if frame.get('orf_set') is not None:
+        return frame['orf_set']
+    aa_seq = frame.get('aa_seq', "")
+    return [aa_seq[start:end] for start, end in frame.get('orf_spans') or []]
+
+def expand_frame_set(frame_set: Dict) -> Dict:
+    # Windowed frames keep their extra keys ('orf_coords', 'aa_length') alongside the expanded ORFs.
+    return {label: {**{key: value for key, value in frame.items() if key != 'orf_spans'}, 'orf_set': frame_orfs(frame)}
+            for label, frame in frame_set.items()}
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# metrics.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'metrics' is a small, dependency-free metrics registry (counters, gauges and fixed-bucket
+histograms) rendered in the Prometheus text exposition format for the /metrics endpoint. The ASGI
+middleware defined here records per-route latency, request/response byte counts and in-flight requests
+without buffering bodies. Note that each Lambda container keeps its own registry, so scraped values are
+per-container and reset on cold start.
+
+"""
+
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 29.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 6291456)
+
+REGISTRY: List["Metric"] = []
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple, object] = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, label_names)
+        self.callback = callback
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        # Callback gauges (e.g. cache sizes) are sampled at scrape time rather than on every update.
+        if self.callback is not None:
+            self.set(self.callback())
+        return super().render()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, state in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), state['counts']):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    bucket_labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {state['sum']}")
+                lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# Shared Metrics
+
+REQUEST_LATENCY = Histogram("esa_http_request_duration_seconds", "HTTP request latency by route.",
+                            ("method", "route", "status"))
+REQUEST_SIZE = Histogram("esa_http_request_size_bytes", "HTTP request body size by route.",
+                         ("method", "route"), buckets=SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram("esa_http_response_size_bytes", "HTTP response body size by route.",
+                          ("method", "route"), buckets=SIZE_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("esa_http_requests_in_flight", "HTTP requests currently being served.")
+
+CACHE_REQUESTS = Counter("esa_results_cache_requests_total", "Results cache lookups by outcome.",
+                         ("cache", "result"))
+ALIGNERS_CREATED = Counter("esa_aligners_created_total", "PairwiseAligner instances constructed.")
+ALIGNMENTS_TOTAL = Counter("esa_pairwise_alignments_total", "ORF-target pairwise alignments performed.")
+ALIGNMENT_SECONDS = Counter("esa_pairwise_alignment_seconds_total", "Wall time spent in pairwise alignment.")
+ALIGNMENTS_PRUNED = Counter("esa_pairwise_alignments_pruned_total", "ORF-target pairs skipped by LCA/identity bounds.")
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (rather than BaseHTTPMiddleware) so that bodies are streamed through untouched
+    and the per-request cost is a couple of counter updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.route_paths: Dict[Callable, str] = {}
+
+    def _route_template(self, scope) -> str:
+        # Starlette stores the matched endpoint on the scope; map it back to its path template so that
+        # path parameters (job ids, target names) don't explode label cardinality.
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+
+        if endpoint not in self.route_paths:
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    self.route_paths[endpoint] = route.path
+                    break
+            else:
+                self.route_paths[endpoint] = getattr(endpoint, "__name__", "unknown")
+        return self.route_paths[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        sizes = {'request': 0, 'response': 0, 'status': 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes['request'] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                sizes['status'] = message["status"]
+            elif message["type"] == "http.response.body":
+                sizes['response'] += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            method, route = scope["method"], self._route_template(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=method, route=route,
+                                    status=sizes['status'])
+            REQUEST_SIZE.observe(sizes['request'], method=method, route=route)
+            RESPONSE_SIZE.observe(sizes['response'], method=method, route=route)
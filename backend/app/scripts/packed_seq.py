@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+# packed_seq.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'packed_seq' holds an input set at 2 bits per base instead of one Python str per record.
+PackedRecords is a read-only {record_id: sequence} mapping over a single bytearray: A/C/G/T are packed
+four to a byte (each record starting on a byte boundary), and anything else (N runs, IUPAC ambiguity
+codes, lowercase from unvalidated input) goes in a sparse exception list of (start, run length, symbol)
+runs that overrides the packed bases on decode.
+
+Looking a record up returns a PackedSequence view, which supports len(), slicing and str(). Slices
+decode only the bytes they cover, so the windowed translation path in frame_retrieve reads long
+records one window at a time and the rest of the engine sees ordinary str slices.
+
+"""
+
+from app.scripts.validation import normalize_nucleotides
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import hashlib
+import numpy as np
+
+BASES = b"ACGT"
+EXCEPTION_CODE = 255
+
+_ENCODE = np.full(256, EXCEPTION_CODE, dtype=np.uint8)
+_ENCODE[np.frombuffer(BASES, dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+
+# Row b holds the four ASCII bases packed into byte b, most significant pair first.
+_DECODE = np.frombuffer(BASES, dtype=np.uint8)[
+    (np.arange(256, dtype=np.uint8)[:, None] >> np.array([6, 4, 2, 0], dtype=np.uint8)) & 3]
+
+class PackedSequence:
+    """
+    One record of a PackedRecords set. Behaves like a read-only str for len(), indexing and slicing
+    (which return str); str() decodes the whole record.
+    """
+    __slots__ = ("_records", "_start", "_length")
+
+    def __init__(self, records: "PackedRecords", start: int, length: int):
+        self._records = records
+        self._start = start
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step == 1:
+                return self._records.decode(self._start + start, self._start + max(start, stop))
+            return str(self)[key]
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError("PackedSequence index out of range")
+        return self._records.decode(self._start + key, self._start + key + 1)
+
+    def __str__(self) -> str:
+        return self._records.decode(self._start, self._start + self._length)
+
+    def __repr__(self) -> str:
+        return f"PackedSequence(length={self._length})"
+
+    def digest(self) -> bytes:
+        # Hashes the packed bytes and exception runs, so identical records are found without decoding them.
+        return self._records.digest(self._start, self._length)
+
+class PackedRecords(Mapping):
+    def __init__(self):
+        self._data = bytearray()
+        self._index: Dict[str, int] = {}
+        self._starts = array("Q") # Absolute base offset of each record (always a multiple of 4).
+        self._lengths = array("Q")
+        self._exc_starts = array("Q") # Exception runs, sorted by absolute base offset.
+        self._exc_lengths = array("Q")
+        self._exc_symbols = bytearray()
+
+    @classmethod
+    def from_records(cls, records: Iterable[Tuple[str, str]], alphabet: Optional[str] = None) -> "PackedRecords":
+        """
+        Packs (record_id, sequence) pairs as they arrive, so a streamed FASTA never exists as a full dict
+        of strings. With an 'alphabet', each sequence is validated and normalized first (see validation).
+        """
+        packed = cls()
+        for record_id, seq in records:
+            packed.add(record_id, normalize_nucleotides(seq, alphabet, record_id) if alphabet else seq)
+        return packed
+
+    def add(self, record_id: str, seq: str):
+        if record_id in self._index:
+            raise ValueError(f"Duplicate record ID '{record_id}' in input FASTA.")
+
+        start = len(self._data) * 4
+        raw = np.frombuffer(seq.encode("ascii"), dtype=np.uint8)
+        codes = _ENCODE[raw]
+
+        exceptions = np.flatnonzero(codes == EXCEPTION_CODE)
+        if exceptions.size:
+            # A run ends wherever the positions stop being consecutive or the symbol changes.
+            symbols = raw[exceptions]
+            breaks = np.flatnonzero((np.diff(exceptions) != 1) | (np.diff(symbols) != 0)) + 1
+            run_starts = np.concatenate(([0], breaks))
+            run_ends = np.concatenate((breaks, [exceptions.size]))
+            self._exc_starts.extend((exceptions[run_starts] + start).tolist())
+            self._exc_lengths.extend((run_ends - run_starts).tolist())
+            self._exc_symbols.extend(symbols[run_starts].tobytes())
+            codes[exceptions] = 0
+
+        padded = np.zeros(-(-codes.size // 4) * 4, dtype=np.uint8)
+        padded[:codes.size] = codes
+        quads = padded.reshape(-1, 4)
+        self._data.extend(((quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]).tobytes())
+
+        self._index[record_id] = len(self._starts)
+        self._starts.append(start)
+        self._lengths.append(len(seq))
+
+    def decode(self, start: int, end: int) -> str:
+        # Bases [start, end) in absolute offsets; only the bytes (and exception runs) in range are touched.
+        if end <= start:
+            return ""
+        first_byte = start // 4
+        window = _DECODE[np.frombuffer(self._data[first_byte:(end + 3) // 4], dtype=np.uint8)].ravel()
+        base = first_byte * 4
+        window = window[start - base:end - base]
+
+        run = max(0, bisect_right(self._exc_starts, start) - 1)
+        while run < len(self._exc_starts) and self._exc_starts[run] < end:
+            run_start = self._exc_starts[run]
+            run_end = run_start + self._exc_lengths[run]
+            if run_end > start:
+                window[max(run_start, start) - start:min(run_end, end) - start] = self._exc_symbols[run]
+            run += 1
+        return window.tobytes().decode("ascii")
+
+    def digest(self, start: int, length: int) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(length.to_bytes(8, "little"))
+        h.update(self._data[start // 4:(start + length + 3) // 4])
+        first = bisect_left(self._exc_starts, start)
+        last = bisect_left(self._exc_starts, start + length)
+        for run in range(first, last):
+            h.update((self._exc_starts[run] - start).to_bytes(8, "little"))
+            h.update(self._exc_lengths[run].to_bytes(8, "little"))
+            h.update(self._exc_symbols[run:run + 1])
+        return h.digest()
+
+    def __getitem__(self, record_id: str) -> PackedSequence:
+        i = self._index[record_id]
+        return PackedSequence(self, self._starts[i], self._lengths[i])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def total_bp(self) -> int:
+        return sum(self._lengths)
+
+    @property
+    def nbytes(self) -> int:
+        # Sequence storage only (packed bases, offsets, exception runs); record IDs are held as usual.
+        return (len(self._data) + self._starts.itemsize * (len(self._starts) + len(self._lengths))
+                + self._exc_starts.itemsize * (len(self._exc_starts) + len(self._exc_lengths))
+                + len(self._exc_symbols))
+
+def sequence_digest(seq) -> bytes:
+    # Interning key for a str or a PackedSequence (the two never share keys, which only costs a repeat).
+    if isinstance(seq, PackedSequence):
+        return seq.digest()
+    return hashlib.blake2b(seq.encode(), digest_size=16).digest()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# profiling.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'profiling' provides the lightweight span/timer API used to break a job's wall time down
+by pipeline stage. A StageTimer is bound to the running job through a context variable, so deeply
+nested helpers (align, compute_lca, ...) can open spans without threading a timer through every call;
+when no timer is bound, spans are no-ops. Optional cProfile sampling is also handled here (on the
+Lambda's Python 3.12, cProfile is interpreter-wide, so work offloaded with to_thread is captured too).
+
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import cProfile
+import os
+import random
+import threading
+import time
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+
+class StageTimer:
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.started = time.perf_counter()
+        self.lock = threading.Lock() # Spans may close concurrently from to_thread() workers.
+
+    def record(self, name: str, seconds: float, calls: int = 1):
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = {'seconds': seconds, 'calls': calls}
+            else:
+                stage['seconds'] += seconds
+                stage['calls'] += calls
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        # Spans may nest (e.g. 'lca' inside 'align'), so stage times are inclusive and won't sum to total.
+        stages = sorted(self.stages.items(), key=lambda item: item[1]['seconds'], reverse=True)
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'stages': {name: {'seconds': round(data['seconds'], 4), 'calls': data['calls']}
+                       for name, data in stages}
+        }
+
+current_timer: ContextVar[Optional[StageTimer]] = ContextVar("current_timer", default=None)
+
+@contextmanager
+def span(name: str):
+    timer = current_timer.get()
+    if timer is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - start)
+
+@contextmanager
+def stage_timer():
+    # Binds a fresh StageTimer to the current context (and any tasks/threads spawned from it).
+    timer = StageTimer()
+    token = current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        current_timer.reset(token)
+
+def maybe_start_profiler(sample_rate: float = None) -> Optional[cProfile.Profile]:
+    sample_rate = PROFILE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return None
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def dump_profile(profiler: cProfile.Profile, path: str) -> bytes:
+    profiler.disable()
+    profiler.dump_stats(path)
+    with open(path, "rb") as f:
+        return f.read()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# result_index.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'result_index' builds the pre-sorted index that backs paginated access to a job's results,
+so large jobs never have to be returned (or re-sorted) in one response. The index holds two tables:
+
+    records     one row per input record: [record, target, identity, lca] (its best hit, if any)
+    hits        one row per top hit: [target, identity, lca, orf_id], grouped by target (best first), with
+                each target's [start, end) row range kept in 'target_ranges'
+
+For every sort key a table also stores the row permutation in that key's default order (best first for
+identity/LCA, alphabetical for names, submission order for 'input'; the opposite order walks it
+backwards), so a page is a slice of a precomputed order plus a filter. Identity/LCA floors
+end the scan early when the order runs on that same column. Cursors are opaque tokens carrying the scan
+position and a fingerprint of the query they belong to.
+
+The same index is kept in RESULTS_CACHE for inline jobs and written to S3 (result_index.json) by the
+worker for queued ones.
+
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import base64
+import hashlib
+import json
+
+INDEX_VERSION = 1
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+RECORD_COLUMNS = ["record", "target", "identity", "lca"]
+HIT_COLUMNS = ["target", "identity", "lca", "orf"]
+SORT_KEYS = {'records': ("input", "identity", "lca", "record"), 'hits': ("identity", "lca", "target")}
+DEFAULT_ORDER = {'input': "asc", 'record': "asc", 'target': "asc", 'identity': "desc", 'lca': "desc"}
+
+def _orders(rows: List[list], columns: List[str], sort_keys: Tuple[str, ...]) -> Dict[str, List[int]]:
+    orders = {}
+    for key in sort_keys:
+        if key == "input":
+            orders[key] = list(range(len(rows)))
+        elif DEFAULT_ORDER[key] == "asc":
+            column = columns.index(key)
+            orders[key] = sorted(range(len(rows)), key=lambda i: (rows[i][column], i))
+        else:
+            # Ties fall back to row order so pages are deterministic.
+            column = columns.index(key)
+            orders[key] = sorted(range(len(rows)), key=lambda i: (-(rows[i][column] or 0), i))
+    return orders
+
+def build_result_index(alignment_results: Dict[str, dict], top_hits_json: dict) -> dict:
+    """
+    'top_hits_json' is TopHits.to_json() (or the worker's top_hits.json), whose per-target lists are
+    already best-first; the index keeps that order and refers to ORFs by the same ids.
+    """
+    record_rows = []
+    for record, result in alignment_results.items():
+        if result and 'identity_pct' in result:
+            record_rows.append([record, result.get('target'), result.get('identity_pct'), result.get('length')])
+        else:
+            record_rows.append([record, None, 0.0, 0])
+
+    hit_rows, target_ranges = [], {}
+    for target, hits in top_hits_json.get('hits', {}).items():
+        start = len(hit_rows)
+        hit_rows.extend([target, identity, lca, orf_id] for identity, lca, orf_id in hits)
+        target_ranges[target] = [start, len(hit_rows)]
+
+    return {
+        'version': INDEX_VERSION,
+        'records': {'columns': RECORD_COLUMNS, 'rows': record_rows,
+                    'orders': _orders(record_rows, RECORD_COLUMNS, SORT_KEYS['records'])},
+        'hits': {'columns': HIT_COLUMNS, 'rows': hit_rows, 'target_ranges': target_ranges,
+                 'orders': _orders(hit_rows, HIT_COLUMNS, SORT_KEYS['hits'])}
+    }
+
+def _fingerprint(table: str, query: dict) -> str:
+    return hashlib.blake2b(json.dumps([table, query], sort_keys=True).encode("utf-8"), digest_size=6).hexdigest()
+
+def encode_cursor(position: int, fingerprint: str) -> str:
+    token = json.dumps({'p': position, 'q': fingerprint}).encode("utf-8")
+    return base64.urlsafe_b64encode(token).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, fingerprint: str) -> int:
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        position = int(token['p'])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Malformed cursor.")
+    if position < 0:
+        raise ValueError("Malformed cursor.")
+    if token.get('q') != fingerprint:
+        raise ValueError("Cursor belongs to a different query; restart without one.")
+    return position
+
+def query_index(index: dict, table: str, sort: str = None, order: str = None, min_identity: float = None,
+                min_lca: int = None, target: str = None, cursor: str = None,
+                limit: int = DEFAULT_PAGE_SIZE) -> Tuple[List[list], Optional[str]]:
+    """
+    Returns one page of matching rows from 'records' or 'hits' and the cursor for the next page (None
+    once the scan is exhausted). Raises ValueError for unknown sort keys or a cursor from another query.
+    """
+    data = index[table]
+    sort = sort or SORT_KEYS[table][0]
+    if sort not in SORT_KEYS[table]:
+        raise ValueError(f"Sort must be one of {', '.join(SORT_KEYS[table])}.")
+    order = order or DEFAULT_ORDER[sort]
+    if order not in ("asc", "desc"):
+        raise ValueError("Order must be 'asc' or 'desc'.")
+
+    query = {'sort': sort, 'order': order, 'min_identity': min_identity, 'min_lca': min_lca, 'target': target}
+    fingerprint = _fingerprint(table, query)
+    position = decode_cursor(cursor, fingerprint) if cursor else 0
+    limit = max(1, limit)
+
+    rows, columns = data['rows'], data['columns']
+    identity_col, lca_col, target_col = columns.index("identity"), columns.index("lca"), columns.index("target")
+
+    permutation = data['orders'][sort]
+    if table == "hits" and target is not None and sort == "identity" and order == "desc":
+        # Each target's rows are already stored best-first, so its range is the order itself.
+        start, end = data['target_ranges'].get(target, [0, 0])
+        permutation = range(start, end)
+    if order != DEFAULT_ORDER[sort]:
+        permutation = permutation[::-1]
+
+    # On a descending scan of the filtered column, the first row under the floor ends the whole scan.
+    stop_identity = min_identity is not None and sort == "identity" and order == "desc"
+    stop_lca = min_lca is not None and sort == "lca" and order == "desc"
+
+    page = []
+    while position < len(permutation) and len(page) < limit:
+        row = rows[permutation[position]]
+        position += 1
+        if min_identity is not None and (row[identity_col] or 0) < min_identity:
+            if stop_identity:
+                position = len(permutation)
+            continue
+        if min_lca is not None and (row[lca_col] or 0) < min_lca:
+            if stop_lca:
+                position = len(permutation)
+            continue
+        if target is not None and row[target_col] != target:
+            continue
+        page.append(row)
+
+    next_cursor = encode_cursor(position, fingerprint) if position < len(permutation) else None
+    return page, next_cursor
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+# scheduling.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'scheduling' routes queued alignment jobs into size-class lanes so that a single huge
+submission can't sit in front of dozens of small interactive ones. Each lane is its own SQS queue with
+its own worker function. Per-user fair share is enforced with an active-job counter: once an account
+exceeds its share, further jobs are demoted one lane and delayed. Queue position is derived from two
+per-lane counters (tickets handed out vs. jobs started), so status polling never scans the table.
+Counters and leases live in their own table (keyed by 'state_id'), never alongside the job rows that
+/jobs/status serves.
+
+A user's active jobs are held as leases ({job_id: expiry}) rather than a bare counter: a job that never
+reaches a final status (redriven to the DLQ after a timeout or OOM) would otherwise hold its slot for
+good. Expired leases simply stop counting, and each delivery of the job renews its lease.
+
+"""
+
+from app.scripts.aws_tools import *
+from botocore.exceptions import ClientError
+from decimal import Decimal
+from typing import Optional
+
+import time
+
+# Lanes ordered from highest to lowest priority, with the estimated-seconds ceiling for each.
+SIZE_CLASSES = [
+    ("interactive", float(os.environ.get("INTERACTIVE_MAX_SECONDS", "20"))),
+    ("standard", float(os.environ.get("STANDARD_MAX_SECONDS", "240"))),
+    ("bulk", float("inf"))
+]
+
+LANE_QUEUE_URLS = {
+    "interactive": os.environ.get("JOB_QUEUE_URL_INTERACTIVE") or sqs_queue_url,
+    "standard": sqs_queue_url,
+    "bulk": os.environ.get("JOB_QUEUE_URL_BULK") or sqs_queue_url
+}
+
+# Jobs a single account may have pending/running before new ones are demoted and delayed.
+FAIR_SHARE_ACTIVE_JOBS = int(os.environ.get("FAIR_SHARE_ACTIVE_JOBS", "3"))
+FAIR_SHARE_DELAY_SECONDS = 30
+MAX_SQS_DELAY_SECONDS = 900
+# Must outlast the longest queue delay plus one attempt (the queues' visibility timeout); renewed per delivery.
+FAIR_SHARE_LEASE_SECONDS = int(os.environ.get("FAIR_SHARE_LEASE_SECONDS", "3600"))
+
+def classify_job(estimated_seconds: float) -> str:
+    for size_class, ceiling in SIZE_CLASSES:
+        if estimated_seconds <= ceiling:
+            return size_class
+    return SIZE_CLASSES[-1][0]
+
+def demote(size_class: str) -> str:
+    names = [name for name, _ in SIZE_CLASSES]
+    return names[min(names.index(size_class) + 1, len(names) - 1)]
+
+def _increment_counter(counter_id: str, attribute: str, amount: int = 1) -> int:
+    # Counters are keyed by lane or user (e.g. 'lane#bulk', 'user#12').
+    response = scheduling_table.update_item(
+        Key={"state_id": counter_id},
+        UpdateExpression="ADD #attr :amount",
+        ExpressionAttributeNames={"#attr": attribute},
+        ExpressionAttributeValues={":amount": amount},
+        ReturnValues="UPDATED_NEW"
+    )
+    return int(response["Attributes"][attribute])
+
+def _is_condition_failure(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+def _set_user_lease(user_id, job_id: str, renew_only: bool = False) -> Optional[dict]:
+    key = {"state_id": f"user#{user_id}"}
+    expires = int(time.time()) + FAIR_SHARE_LEASE_SECONDS
+    condition = "attribute_exists(active_leases.#job)" if renew_only else "attribute_exists(active_leases)"
+    try:
+        return scheduling_table.update_item(
+            Key=key,
+            UpdateExpression="SET active_leases.#job = :expires",
+            ConditionExpression=condition,
+            ExpressionAttributeNames={"#job": job_id},
+            ExpressionAttributeValues={":expires": expires},
+            ReturnValues="ALL_NEW"
+        )["Attributes"]
+    except ClientError as e:
+        if renew_only and _is_condition_failure(e):
+            return None # Already released; don't bring it back.
+        if not _is_condition_failure(e):
+            raise
+
+    # The user's first lease creates the map. If a concurrent request created it first, set ours inside it.
+    try:
+        return scheduling_table.update_item(
+            Key=key,
+            UpdateExpression="SET active_leases = :leases",
+            ConditionExpression="attribute_not_exists(active_leases)",
+            ExpressionAttributeValues={":leases": {job_id: expires}},
+            ReturnValues="ALL_NEW"
+        )["Attributes"]
+    except ClientError as e:
+        if not _is_condition_failure(e):
+            raise
+        return _set_user_lease(user_id, job_id)
+
+def reserve_user_slot(user_id, job_id: str) -> int:
+    # Returns the user's active jobs, this one included. Expired leases are dropped while we're here.
+    leases = _set_user_lease(user_id, job_id).get("active_leases", {})
+    now = time.time()
+    expired = [lease for lease, expires in leases.items() if int(expires) <= now]
+    active_jobs = len(leases) - len(expired)
+    if expired:
+        names = {f"#job{i}": lease for i, lease in enumerate(expired)}
+        try:
+            scheduling_table.update_item(
+                Key={"state_id": f"user#{user_id}"},
+                UpdateExpression="REMOVE " + ", ".join(f"active_leases.{name}" for name in names),
+                ExpressionAttributeNames=names
+            )
+        except Exception as e:
+            print(f"Couldn't drop expired fair-share leases for user {user_id}: {e}")
+    return active_jobs
+
+def release_user_slot(user_id, job_id: Optional[str]):
+    if user_id is None or job_id is None:
+        return
+    try:
+        scheduling_table.update_item(
+            Key={"state_id": f"user#{user_id}"},
+            UpdateExpression="REMOVE active_leases.#job",
+            ExpressionAttributeNames={"#job": job_id}
+        )
+    except Exception as e:
+        print(f"Couldn't release fair-share slot for user {user_id}: {e}")
+
+def schedule_job(job_id: str, input_key: str, target_key: str, direction: str, user_id=None,
+                 align_threshold: float = 0.98, estimate: Optional[dict] = None, top_k: int = 5,
+                 target_library_key: Optional[str] = None, output_format: str = "csv",
+                 alphabet: str = "strict", collapse_targets: bool = False,
+                 expected_status: Optional[str] = None) -> dict:
+    estimated_seconds = (estimate or {}).get('estimated_seconds', 0.0)
+    size_class = classify_job(estimated_seconds)
+    delay_seconds = 0
+
+    if user_id is not None:
+        active_jobs = reserve_user_slot(user_id, job_id)
+        overage = active_jobs - FAIR_SHARE_ACTIVE_JOBS
+        if overage > 0:
+            size_class = demote(size_class)
+            delay_seconds = min(MAX_SQS_DELAY_SECONDS, FAIR_SHARE_DELAY_SECONDS * overage)
+
+    try:
+        ticket = _increment_counter(f"lane#{size_class}", "enqueued")
+        enqueue_job(job_id, input_key, target_key, direction, user_id, align_threshold=align_threshold,
+                    top_k=top_k, target_library_key=target_library_key, output_format=output_format,
+                    alphabet=alphabet, collapse_targets=collapse_targets, queue_url=LANE_QUEUE_URLS[size_class],
+                    delay_seconds=delay_seconds, expected_status=expected_status,
+                    extra_fields={"size_class": size_class, "queue_ticket": ticket,
+                                  "estimated_seconds": Decimal(str(estimated_seconds))})
+    except Exception:
+        release_user_slot(user_id, job_id) # Nothing will ever run this job to release it.
+        raise
+
+    return {'size_class': size_class, 'queue_ticket': ticket, 'delay_seconds': delay_seconds}
+
+def schedule_rethreshold(job_id: str, source_job_id: str, source_job: dict, align_threshold: float,
+                         top_k: int) -> dict:
+    """
+    Queues a re-threshold of a finished job as a job of its own, in the lane the source job ran in: it
+    reuses the source's match vectors, so it's never the more expensive of the two.
+    """
+    size_class = source_job.get("size_class") or classify_job(float(source_job.get("estimated_seconds", 0)))
+    ticket = _increment_counter(f"lane#{size_class}", "enqueued")
+    enqueue_job(job_id, None, source_job.get("target_key"), source_job.get("direction", "BOTH"),
+                align_threshold=align_threshold, top_k=top_k, target_library_key=source_job.get("target_library_key"),
+                collapse_targets=bool(source_job.get("collapse_targets")), queue_url=LANE_QUEUE_URLS[size_class],
+                message_fields={"rethreshold_of": source_job_id},
+                extra_fields={"size_class": size_class, "queue_ticket": ticket, "rethreshold_of": source_job_id})
+    return {'size_class': size_class, 'queue_ticket': ticket}
+
+def mark_job_started(job_id: str, size_class: Optional[str], user_id=None):
+    """
+    Moves the job to RUNNING. Only the first delivery (PENDING -> RUNNING) counts towards the lane's
+    'started' counter; SQS redeliveries (RETRYING or a lost RUNNING) would otherwise skew queue positions.
+    """
+    try:
+        try:
+            jobs_table.update_item(
+                Key={"job_id": job_id},
+                UpdateExpression="SET #status = :running",
+                ConditionExpression="#status = :pending",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":running": "RUNNING", ":pending": "PENDING"}
+            )
+            first_start = True
+        except ClientError as e:
+            if not _is_condition_failure(e):
+                raise
+            first_start = False
+            jobs_table.update_item(
+                Key={"job_id": job_id},
+                UpdateExpression="SET #status = :running",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":running": "RUNNING"}
+            )
+
+        if first_start and size_class:
+            _increment_counter(f"lane#{size_class}", "started")
+        if user_id is not None:
+            _set_user_lease(user_id, job_id, renew_only=True)
+    except Exception as e:
+        print(f"Couldn't mark job {job_id} as started: {e}")
+
+def get_queue_position(job_data: dict) -> Optional[int]:
+    """
+    Approximate number of jobs ahead of this one in its lane. Lanes drain roughly in ticket order, so
+    'tickets issued before mine' minus 'jobs already started' is a good O(1) estimate.
+    """
+    size_class, ticket = job_data.get("size_class"), job_data.get("queue_ticket")
+    if job_data.get("status") != "PENDING" or size_class is None or ticket is None:
+        return None
+
+    lane = scheduling_table.get_item(Key={"state_id": f"lane#{size_class}"}).get("Item", {})
+    return max(0, int(ticket) - int(lane.get("started", 0)) - 1)
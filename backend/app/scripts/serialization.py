@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# serialization.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'serialization' is the fast path for the large JSON payloads the API and worker produce
+(frames, alignment results, top hits, result indexes). dumps_json/loads_json run on orjson, which
+encodes these string-heavy structures several times faster than the json module. FastJSONResponse
+renders with it, and endpoints that return one directly also skip FastAPI's jsonable_encoder walk.
+
+CompressionMiddleware compresses JSON/text responses above COMPRESSION_MIN_BYTES for clients that
+accept it: brotli when the optional 'brotli' package is installed and preferred, gzip otherwise.
+Streamed responses (file downloads) pass through untouched.
+
+"""
+
+from app.scripts.metrics import Counter
+from decimal import Decimal
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from typing import Any, Optional
+
+import gzip
+import os
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "4096"))
+GZIP_LEVEL = 4 # On result payloads, ~2x faster than level 6 for a few percent less saved.
+BROTLI_QUALITY = 5 # Quality 11 (the default) is far too slow for per-request compression.
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+COMPRESSED_RESPONSES = Counter("esa_compressed_responses_total", "Responses compressed, by encoding.",
+                               ("encoding",))
+COMPRESSION_BYTES_SAVED = Counter("esa_compression_bytes_saved_total",
+                                  "Response bytes saved by compression, by encoding.", ("encoding",))
+
+def _default(obj: Any):
+    # DynamoDB items come back with Decimal numbers; sets and numpy scalars show up in job payloads too.
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_json(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=JSON_OPTIONS)
+
+def loads_json(data) -> Any:
+    return orjson.loads(data)
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    # Picks the best supported encoding from an Accept-Encoding header, honouring q-values (q=0 refuses).
+    weights = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip()] = quality
+
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    supported = [(weights.get(name, weights.get("*", 0.0)), -rank, name) for rank, name in enumerate(candidates)]
+    quality, _, name = max(supported)
+    return name if quality > 0 else None
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+class CompressionMiddleware:
+    """
+    Plain ASGI middleware, like MetricsMiddleware. The response start is held back until the first body
+    message shows whether the response is complete and large enough to be worth compressing.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        pending_start = None
+
+        async def compressing_send(message):
+            nonlocal pending_start
+            if message["type"] == "http.response.start":
+                pending_start = message
+                return
+            if pending_start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            start, pending_start = pending_start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body", False) or len(body) < self.minimum_size or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                await send(start)
+                await send(message)
+                return
+
+            compressed = compress_body(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            COMPRESSED_RESPONSES.inc(encoding=encoding)
+            COMPRESSION_BYTES_SAVED.inc(len(body) - len(compressed), encoding=encoding)
+            await send(start)
+            await send({**message, "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+# target_clusters.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'target_clusters' collapses redundant targets in a reference panel so align() can score one
+representative per group instead of every variant. Collapsing is opt-in per job ('collapse_targets').
+
+Byte-identical targets are grouped by hash: they always align identically, so each copy reuses its
+representative's alignment and reports the same hit under its own id. Near-identical targets are then
+clustered greedily, longest first (as CD-HIT does). A target joins a representative when it is at least
+TARGET_CLUSTER_IDENTITY of its length and shares at least TARGET_CLUSTER_IDENTITY ** k of its distinct
+k-mers with it, which is about what that identity leaves intact. Such members are aligned only when their
+representative's LCA comes within TARGET_CLUSTER_MARGIN of the ORF's best. Results for near-identical
+members are therefore approximate: members that are never expanded get no hits.
+
+"""
+
+from app.scripts.target_library import ALPHABET, distinct_kmers
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Dict, List
+
+import hashlib
+import os
+import numpy as np
+
+TARGET_CLUSTER_IDENTITY = float(os.environ.get("TARGET_CLUSTER_IDENTITY", "0.95"))
+TARGET_CLUSTER_MARGIN = float(os.environ.get("TARGET_CLUSTER_MARGIN", "0.1")) # Fraction of the ORF's best LCA.
+CLUSTER_KMER_SIZE = 5 # Long enough that unrelated proteins rarely share more than a few.
+
+class TargetClusters:
+    """
+    'representatives' are in panel order. 'near' maps each representative to its near-identical
+    members, and 'copies' maps a representative or member to its byte-identical duplicates.
+    """
+
+    def __init__(self, representatives: List[str], near: Dict[str, List[str]], copies: Dict[str, List[str]],
+                 identity: float = TARGET_CLUSTER_IDENTITY, margin: float = TARGET_CLUSTER_MARGIN):
+        self.representatives = representatives
+        self.near = near
+        self.copies = copies
+        self.identity = identity
+        self.margin = margin
+
+    def should_expand(self, representative_lca: int, best_lca: int) -> bool:
+        return representative_lca > 0 and representative_lca >= (1 - self.margin) * best_lca
+
+    def summary(self) -> dict:
+        near = sum(len(members) for members in self.near.values())
+        copies = sum(len(duplicates) for duplicates in self.copies.values())
+        return {'targets': len(self.representatives) + near + copies, 'representatives': len(self.representatives),
+                'near_duplicates': near, 'exact_duplicates': copies, 'identity': self.identity,
+                'margin': self.margin}
+
+def cluster_targets(targets: Mapping, identity: float = TARGET_CLUSTER_IDENTITY,
+                    margin: float = TARGET_CLUSTER_MARGIN, k: int = CLUSTER_KMER_SIZE) -> TargetClusters:
+    # Works on any {target_id: sequence} mapping, including a memory-mapped TargetLibrary.
+    first_copy, copies, unique_ids = {}, defaultdict(list), []
+    for target_id, seq in targets.items():
+        original = first_copy.setdefault(hashlib.blake2b(seq.encode("ascii"), digest_size=16).digest(), target_id)
+        if original == target_id:
+            unique_ids.append(target_id)
+        else:
+            copies[original].append(target_id)
+
+    # Distinct k-mers of every unique target, plus an inverted index (k-mer -> targets holding it).
+    seqs = [targets[target_id] for target_id in unique_ids]
+    lengths = np.array([len(seq) for seq in seqs], dtype=np.int64)
+    owners, codes = distinct_kmers(seqs, k)
+    bounds = np.searchsorted(owners, np.arange(len(seqs) + 1))
+    postings = owners[np.argsort(codes)] # Order within a k-mer doesn't matter; hits are counted.
+    kmer_offsets = np.zeros(len(ALPHABET) ** k + 1, dtype=np.int64) # As in a library file, but transient.
+    kmer_offsets[1:] = np.cumsum(np.bincount(codes, minlength=len(ALPHABET) ** k))
+
+    required_fraction = identity ** k
+    rank = np.full(len(seqs), -1, dtype=np.int64) # Position among representatives, -1 for non-representatives.
+    parents, representative_count = {}, 0
+    for i in np.argsort(-lengths, kind="stable"): # Stable, so ties stay in panel order.
+        query = codes[bounds[i]:bounds[i + 1]]
+        first = kmer_offsets[query]
+        counts = kmer_offsets[query + 1] - first
+        hits = postings[np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())]
+        hits = hits[rank[hits] >= 0]
+
+        if hits.size:
+            # Representatives come first in length order, so this target is never the longer of the two.
+            candidates, shared = np.unique(hits, return_counts=True)
+            keep = (shared >= required_fraction * len(query)) & (lengths[i] >= identity * lengths[candidates])
+            if keep.any():
+                candidates, shared = candidates[keep], shared[keep]
+                best = candidates[np.lexsort((rank[candidates], -shared))[0]]
+                parents[unique_ids[i]] = unique_ids[best]
+                continue
+        rank[i], representative_count = representative_count, representative_count + 1
+
+    near = {target_id: [] for target_id in unique_ids if target_id not in parents}
+    for target_id in unique_ids:
+        if target_id in parents:
+            near[parents[target_id]].append(target_id)
+
+    return TargetClusters(list(near), near, dict(copies), identity, margin)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+# target_library.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'target_library' precompiles a reference (target) FASTA into a single binary file that
+workers and the CLI can memory-map instead of re-parsing text on every job. Libraries are content
+addressed -- stored in S3 under libraries/<sha256>.esalib -- so a panel reused by thousands of jobs is
+built once, and a container that has already pulled a library into /tmp never downloads it again.
+
+File layout (all integers little-endian, every section 8-byte aligned):
+
+    magic           8 bytes     b"ESALIB01"
+    header_len      uint32      length of the JSON header that follows
+    header          JSON        version, content hash, k, alphabet, target ids + per-target hashes,
+                                and the [offset, length] of each section below
+    offsets         uint64[n+1] residue offsets of each target in 'residues'
+    residues        uint8[...]  every target's residues, concatenated (ASCII)
+    kmer_offsets    uint32[a^k+1] start of each k-mer's postings (a = alphabet size)
+    kmer_postings   uint32[...] indices of the targets containing each k-mer
+
+"""
+
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import numpy as np
+
+MAGIC = b"ESALIB01"
+LIBRARY_VERSION = 1
+LIBRARY_PREFIX = "libraries"
+DEFAULT_KMER_SIZE = 3
+ALPHABET = "ACDEFGHIKLMNPQRSTVWY" # k-mers with other symbols (X, *, B, Z, ...) are left out of the index.
+LOCAL_LIBRARY_DIR = os.environ.get("TARGET_LIBRARY_DIR", "/tmp/target_libraries")
+
+# Lowercase (soft-masked) residues share their uppercase code, so masked panels are indexed like any other.
+_RESIDUE_CODES = np.full(256, 255, dtype=np.uint8)
+for _code, _residue in enumerate(ALPHABET):
+    _RESIDUE_CODES[ord(_residue)] = _RESIDUE_CODES[ord(_residue.lower())] = _code
+
+def content_hash(targets: Dict[str, str]) -> str:
+    digest = hashlib.sha256()
+    for target_id, seq in targets.items():
+        digest.update(target_id.encode("utf-8") + b"\n" + seq.encode("ascii") + b"\n")
+    return digest.hexdigest()
+
+def library_key(library_hash: str) -> str:
+    return f"{LIBRARY_PREFIX}/{library_hash}.esalib"
+
+def _kmer_codes(residues: np.ndarray, k: int) -> np.ndarray:
+    # Distinct k-mer codes (base-len(ALPHABET) numbers) of one target, skipping non-standard residues.
+    codes = _RESIDUE_CODES[residues]
+    if len(codes) < k:
+        return np.empty(0, dtype=np.uint32)
+
+    windows = np.lib.stride_tricks.sliding_window_view(codes, k)
+    windows = windows[(windows != 255).all(axis=1)].astype(np.uint32)
+    powers = len(ALPHABET) ** np.arange(k - 1, -1, -1, dtype=np.uint32)
+    return np.unique(windows @ powers)
+
+def distinct_kmers(seqs: List[str], k: int) -> tuple:
+    """
+    Batch counterpart of _kmer_codes for a whole panel: (owners, codes) arrays holding every distinct k-mer
+    code of every sequence, sorted by owner (the sequence's index) and then code. Windows that cross from
+    one sequence into the next are dropped.
+    """
+    residues = _RESIDUE_CODES[np.frombuffer("".join(seqs).encode("ascii"), dtype=np.uint8)]
+    if len(residues) < k:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    positions = np.repeat(np.arange(len(seqs), dtype=np.int64), [len(seq) for seq in seqs])
+    windows = np.lib.stride_tricks.sliding_window_view(residues, k)
+    valid = (windows != 255).all(axis=1) & (positions[:len(windows)] == positions[k - 1:])
+    space = len(ALPHABET) ** k
+    codes = windows[valid].astype(np.int64) @ (len(ALPHABET) ** np.arange(k - 1, -1, -1, dtype=np.int64))
+    keys = np.sort(positions[:len(windows)][valid] * space + codes)
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))] # np.unique, minus its much slower hashing path.
+    return keys // space, keys % space
+
+def _aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+def build_target_library(targets: Dict[str, str], k: int = DEFAULT_KMER_SIZE) -> bytes:
+    ids = list(targets.keys())
+    encoded = [targets[target_id].encode("ascii") for target_id in ids]
+
+    offsets = np.zeros(len(ids) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(seq) for seq in encoded], dtype=np.uint64)
+    residues = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    # Inverted index: for each k-mer code, the (sorted, distinct) targets that contain it.
+    per_target = [_kmer_codes(residues[int(offsets[i]):int(offsets[i + 1])], k) for i in range(len(ids))]
+    all_codes = np.concatenate(per_target) if per_target else np.empty(0, dtype=np.uint32)
+    owners = np.repeat(np.arange(len(ids), dtype=np.uint32), [len(codes) for codes in per_target])
+    order = np.argsort(all_codes, kind="stable")
+    kmer_postings = owners[order]
+    kmer_offsets = np.zeros(len(ALPHABET) ** k + 1, dtype=np.uint32)
+    kmer_offsets[1:] = np.cumsum(np.bincount(all_codes, minlength=len(ALPHABET) ** k), dtype=np.uint32)
+
+    arrays = {'offsets': offsets, 'residues': residues, 'kmer_offsets': kmer_offsets,
+              'kmer_postings': kmer_postings}
+    header = {
+        'version': LIBRARY_VERSION,
+        'content_hash': content_hash(targets),
+        'k': k,
+        'alphabet': ALPHABET,
+        'targets': [{'id': target_id, 'hash': hashlib.blake2b(seq, digest_size=16).hexdigest()}
+                    for target_id, seq in zip(ids, encoded)],
+        'sections': {}
+    }
+
+    # Section offsets depend on the header's own length, so grow the reserved header room until it fits.
+    header_room = _aligned(len(json.dumps(header)) + 64 * len(arrays))
+    while True:
+        cursor = _aligned(len(MAGIC) + 4 + header_room)
+        for name, array in arrays.items():
+            header['sections'][name] = [cursor, array.nbytes]
+            cursor = _aligned(cursor + array.nbytes)
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        if len(header_bytes) <= header_room:
+            header_bytes = header_bytes.ljust(header_room, b" ")
+            break
+        header_room = _aligned(len(header_bytes))
+
+    buffer = bytearray(cursor)
+    buffer[:len(MAGIC)] = MAGIC
+    buffer[len(MAGIC):len(MAGIC) + 4] = struct.pack("<I", len(header_bytes))
+    buffer[len(MAGIC) + 4:len(MAGIC) + 4 + len(header_bytes)] = header_bytes
+    for name, array in arrays.items():
+        start, size = header['sections'][name]
+        buffer[start:start + size] = array.tobytes()
+
+    return bytes(buffer)
+
+class TargetLibrary(Mapping):
+    """
+    Read-only {target_id: sequence} view over a memory-mapped library file. Opening only parses the JSON
+    header; residues are decoded from the mapped buffer the first time a target is requested.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.buffer[:len(MAGIC)] != MAGIC:
+            self.buffer.close()
+            raise ValueError(f"{path} is not an ESA target library.")
+
+        header_len = struct.unpack("<I", self.buffer[len(MAGIC):len(MAGIC) + 4])[0]
+        self.header = json.loads(bytes(self.buffer[len(MAGIC) + 4:len(MAGIC) + 4 + header_len]))
+        if self.header['version'] != LIBRARY_VERSION:
+            self.buffer.close()
+            raise ValueError(f"Unsupported target library version {self.header['version']}.")
+
+        self.content_hash = self.header['content_hash']
+        self.k = self.header['k']
+        self.ids: List[str] = [target['id'] for target in self.header['targets']]
+        self.hashes: Dict[str, str] = {target['id']: target['hash'] for target in self.header['targets']}
+        self.index = {target_id: i for i, target_id in enumerate(self.ids)}
+        self.offsets = self._section('offsets', np.uint64)
+        self.kmer_offsets = self._section('kmer_offsets', np.uint32)
+        self.kmer_postings = self._section('kmer_postings', np.uint32)
+        self.residues_start = self.header['sections']['residues'][0]
+        self.decoded: Dict[int, str] = {}
+
+    def _section(self, name: str, dtype) -> np.ndarray:
+        start, size = self.header['sections'][name]
+        return np.frombuffer(self.buffer, dtype=dtype, count=size // np.dtype(dtype).itemsize, offset=start)
+
+    def sequence(self, i: int) -> str:
+        seq = self.decoded.get(i)
+        if seq is None:
+            start = self.residues_start + int(self.offsets[i])
+            end = self.residues_start + int(self.offsets[i + 1])
+            seq = self.decoded[i] = self.buffer[start:end].decode("ascii")
+        return seq
+
+    def __getitem__(self, target_id: str) -> str:
+        return self.sequence(self.index[target_id])
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def residue_count(self) -> int:
+        return int(self.offsets[-1])
+
+    def shared_kmers(self, query: str, min_shared: int = 1) -> Dict[str, int]:
+        # Number of distinct k-mers each target shares with 'query' (targets below 'min_shared' omitted).
+        codes = _kmer_codes(np.frombuffer(query.encode("ascii"), dtype=np.uint8), self.k)
+        if len(codes) == 0:
+            return {}
+
+        postings = [self.kmer_postings[self.kmer_offsets[code]:self.kmer_offsets[code + 1]] for code in codes]
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.ids))
+        return {self.ids[i]: int(counts[i]) for i in np.flatnonzero(counts >= min_shared)}
+
+    def close(self):
+        self.offsets = self.kmer_offsets = self.kmer_postings = None # Release buffer exports first.
+        self.buffer.close()
+
+def write_target_library(targets: Dict[str, str], path: str, k: int = DEFAULT_KMER_SIZE) -> str:
+    with open(path, "wb") as f:
+        f.write(build_target_library(targets, k))
+    return path
+
+def ensure_target_library(targets: Dict[str, str], s3_client, bucket_name: str,
+                          k: int = DEFAULT_KMER_SIZE) -> str:
+    """
+    Returns the S3 key of the library for 'targets', building and uploading it only if no library with
+    the same content hash exists yet.
+    """
+    key = library_key(content_hash(targets))
+    try:
+        s3_client.head_object(Bucket=bucket_name, Key=key)
+        return key
+    except s3_client.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            raise
+
+    s3_client.put_object(Bucket=bucket_name, Key=key, Body=build_target_library(targets, k))
+    return key
+
+def load_target_library(key: str, s3_client, bucket_name: str,
+                        local_dir: Optional[str] = None) -> TargetLibrary:
+    # Libraries are immutable (content addressed), so a copy already in local storage is always valid.
+    local_dir = local_dir or LOCAL_LIBRARY_DIR
+    path = os.path.join(local_dir, os.path.basename(key))
+    if not os.path.exists(path):
+        os.makedirs(local_dir, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.part"
+        s3_client.download_file(bucket_name, key, partial)
+        os.replace(partial, path) # Atomic, so concurrent jobs never map a half-written file.
+    return TargetLibrary(path)
+
+if __name__ == "__main__":
+    # Usage: python -m app.scripts.target_library panel.fasta[.gz] [--out panel.esalib] [--k 3] [--upload]
+    import argparse
+    from app.scripts.compression import open_fasta_text
+    from app.scripts.utils import iter_fasta_records
+
+    parser = argparse.ArgumentParser(description="Compile a target FASTA into a memory-mappable library.")
+    parser.add_argument("fasta")
+    parser.add_argument("--out", help="Output path (defaults to <fasta>.esalib).")
+    parser.add_argument("--k", type=int, default=DEFAULT_KMER_SIZE)
+    parser.add_argument("--upload", action="store_true", help="Also upload to S3 under its content hash.")
+    args = parser.parse_args()
+
+    with open(args.fasta, "rb") as f:
+        fasta_targets = dict(iter_fasta_records(open_fasta_text(f)))
+
+    default_out = os.path.splitext(args.fasta[:-3] if args.fasta.endswith(".gz") else args.fasta)[0] + ".esalib"
+    out_path = write_target_library(fasta_targets, args.out or default_out, args.k)
+    print(f"Wrote {len(fasta_targets)} targets to {out_path} (content hash {content_hash(fasta_targets)}).")
+
+    if args.upload:
+        from app.scripts.aws_tools import s3_client, fasta_bucket_name
+        print(f"Uploaded to s3://{fasta_bucket_name}/{ensure_target_library(fasta_targets, s3_client, fasta_bucket_name, args.k)}")
@@ -10,11 +10,14 @@ generated to an external dataframe. Functions as a helper script for main.
 
 """
 
-from io import StringIO
-from typing import Dict, Union
+from io import BytesIO, StringIO
+from typing import Dict, Iterator, List, Tuple, Union
 from app.models.denote_file import AlignmentResult
 from app.models.auth_tools import User
+from app.scripts.profiling import span
+from app.scripts.compression import decode_fasta_bytes
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from Bio import SeqIO
 from datetime import datetime, timezone
 from fastapi import UploadFile, HTTPException, status
@@ -25,14 +28,18 @@ import uuid
 async def process_fasta_upload(fasta_file: Union[UploadFile, StringIO]) -> Dict[str, str]:
     if isinstance(fasta_file, UploadFile):
         contents = await fasta_file.read()
-        stream = StringIO(contents.decode("utf-8"))
+        stream = StringIO(decode_fasta_bytes(contents))
     elif isinstance(fasta_file, StringIO):
         stream = fasta_file
     else:
         raise TypeError("Param fasta_file must be of type UploadFile or StringIO!")
 
+    return parse_fasta(stream)
+
+def parse_fasta(handle) -> Dict[str, str]:
+    # Synchronous core of process_fasta_upload, for callers (e.g. the worker's warm cache) off the event loop.
     try:
-        raw_seq_library = SeqIO.to_dict(SeqIO.parse(stream, "fasta"))
+        raw_seq_library = SeqIO.to_dict(SeqIO.parse(handle, "fasta"))
     except Exception as e:
         raise ValueError(f"Failed to parse FASTA file: {str(e)}.")
 
@@ -43,6 +50,14 @@ async def process_fasta_upload(fasta_file: Union[UploadFile, StringIO]) -> Dict[
 
     return simplified_fasta_seqs
 
+def iter_fasta_records(handle) -> Iterator[Tuple[str, str]]:
+    # Streaming counterpart to process_fasta_upload: yields (record_id, sequence) as each record is parsed.
+    try:
+        for record in SeqIO.parse(handle, "fasta"):
+            yield record.id, str(record.seq)
+    except Exception as e:
+        raise ValueError(f"Failed to parse FASTA file: {str(e)}.")
+
 def infer_direction(query_frames: dict) -> str:
     first_key = next(iter(query_frames))
     if len(query_frames) == 6:
@@ -61,10 +76,10 @@ def data_export(df: pd.DataFrame, seq_name: str, direction: str, likely_orf: str
     df = pd.concat([df, pd.DataFrame([new_row])], ignore_index = True) # Appending new row.
     return df
 
-def build_target_map(target_orf_hits: dict):
+def build_target_map(top_hits):
+    # 'top_hits' is a build_alignment.TopHits; expanded rows resolve each ORF reference to its residues.
     rows = []
-    for target, hits in target_orf_hits.items():
-        hits = sorted(hits, key=lambda x: x[0], reverse=True)
+    for target, hits in top_hits.expanded_items():
         for identity, lca, source_orf, source_seq in hits:
             rows.append({
                 "Target": target,
@@ -77,37 +92,75 @@ def build_target_map(target_orf_hits: dict):
     df = pd.DataFrame(rows)
     return df
 
-def save_alignment_artifacts(results_df: pd.DataFrame, top_hits: defaultdict,
-                             current_user: Union[User, str], s3_client, bucket_name: str, db):
+# Result tables can be written as CSV, typed + compressed Parquet, or both (chosen per job).
+OUTPUT_FORMATS = ("csv", "parquet", "both")
+NUMERIC_COLUMNS = {"Identity-Score": "float64", "LCA": "Int32"}
+CATEGORICAL_COLUMNS = ("Target", "Direction", "Notes") # Few distinct values; dictionary-encoded in Parquet.
+
+def artifact_formats(output_format: str) -> List[str]:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {', '.join(OUTPUT_FORMATS)}.")
+    return ["csv", "parquet"] if output_format == "both" else [output_format]
+
+def serialize_table(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+
+    # "N/A" placeholders become nulls so score/LCA columns keep a numeric type downstream.
+    typed = df.copy()
+    for column, dtype in NUMERIC_COLUMNS.items():
+        if column in typed:
+            typed[column] = pd.to_numeric(typed[column], errors="coerce").astype(dtype)
+    for column in CATEGORICAL_COLUMNS:
+        if column in typed:
+            typed[column] = typed[column].astype(str).astype("category")
+
+    # fastparquet rather than pyarrow: pyarrow alone would push the Lambda bundle past its 250 MB limit.
+    buffer = BytesIO()
+    typed.to_parquet(buffer, index=False, engine="fastparquet", compression="zstd")
+    return buffer.getvalue()
+
+def save_alignment_artifacts(results_df: pd.DataFrame, top_hits, current_user: Union[User, int, str],
+                             s3_client, bucket_name: str, db, output_format: str = "csv") -> Dict[str, Dict[str, str]]:
+    """
+    Uploads the per-record ORF mappings and the per-target top hits in each requested format, returning
+    {'orf_mappings': {format: key}, 'top_hits': {format: key}}. 'current_user' may be a bare user id (the
+    worker has no database session); the AlignmentResult row is only recorded when 'db' is given.
+    """
     unique_id = uuid.uuid4()
-    user_id = current_user if isinstance(current_user, str) else current_user.id
-    results_key = f"users/{user_id}/results/{unique_id}_orf_mappings.csv"
-    top_hits_key = f"users/{user_id}/results/{unique_id}_top_hits.csv"
+    user_id = getattr(current_user, "id", current_user)
+    tables = {'orf_mappings': results_df, 'top_hits': build_target_map(top_hits)}
+
+    with span("artifact_build"):
+        bodies = {(table, fmt): serialize_table(df, fmt)
+                  for table, df in tables.items() for fmt in artifact_formats(output_format)}
 
-    results_buffer = StringIO()
-    results_df.to_csv(results_buffer, index=False)
-    results_buffer.seek(0)
+    keys = defaultdict(dict)
+    for table, fmt in bodies:
+        keys[table][fmt] = f"users/{user_id}/results/{unique_id}_{table}.{fmt}"
 
-    top_hits_df = build_target_map(top_hits)
-    top_hits_buffer = StringIO()
-    top_hits_df.to_csv(top_hits_buffer, index=False)
-    top_hits_buffer.seek(0)
+    def upload(item):
+        (table, fmt), body = item
+        s3_client.put_object(Bucket=bucket_name, Key=keys[table][fmt], Body=body)
 
     try:
-        s3_client.put_object(Bucket=bucket_name, Key=results_key, Body=results_buffer.getvalue())
-        s3_client.put_object(Bucket=bucket_name, Key=top_hits_key, Body=top_hits_buffer.getvalue())
+        # The 2-4 bodies go up concurrently (boto3 clients are thread-safe); list() surfaces any failure.
+        with span("s3_upload"), ThreadPoolExecutor(max_workers=len(bodies)) as pool:
+            list(pool.map(upload, bodies.items()))
     except Exception as e:
         print(f"[ERROR] S3 upload failed: {e}")
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Couldn't upload alignment results.")
 
-    db_result = AlignmentResult(
-        s3_results_key=results_key,
-        s3_top_hits_key=top_hits_key,
-        created_at=datetime.now(timezone.utc),
-        owner_id=current_user.id)
-    
-    db.add(db_result)
-    db.commit()
-    db.refresh(db_result)
+    if db is not None:
+        primary = artifact_formats(output_format)[0]
+        db_result = AlignmentResult(
+            s3_results_key=keys['orf_mappings'][primary],
+            s3_top_hits_key=keys['top_hits'][primary],
+            created_at=datetime.now(timezone.utc),
+            owner_id=user_id)
+
+        db.add(db_result)
+        db.commit()
+        db.refresh(db_result)
 
-    return results_key, top_hits_key
+    return dict(keys)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+# validation.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'validation' checks nucleotide input against a configurable alphabet -- strict (ACGTN),
+IUPAC (ambiguity codes plus U) or RNA (ACGUN) -- for the frame, upload and job endpoints. The common
+case (a valid sequence) is a single bytes.translate pass that deletes every allowed symbol in C. Only a
+sequence with something left over is searched again, to report the first offending position.
+
+Accepted sequences come back uppercased with U written as T, since translation and reverse complements
+run on the DNA alphabet.
+
+"""
+
+from typing import Dict, Literal, Optional
+
+import os
+import re
+
+ALPHABETS = {
+    'strict': "ACGTN",
+    'iupac': "ACGTURYSWKMBDHVN",
+    'rna': "ACGUN"
+}
+NucleotideAlphabet = Literal["strict", "iupac", "rna"]
+DEFAULT_ALPHABET = os.environ.get("NUCLEOTIDE_ALPHABET", "strict")
+
+# Both cases are accepted; sequences are uppercased after they pass.
+_ALLOWED_BYTES = {name: (symbols + symbols.lower()).encode("ascii") for name, symbols in ALPHABETS.items()}
+_INVALID_PATTERNS = {name: re.compile(f"[^{symbols}{symbols.lower()}]") for name, symbols in ALPHABETS.items()}
+
+class InvalidSequenceError(ValueError):
+    def __init__(self, position: int, symbol: str, alphabet: str, record_id: Optional[str] = None):
+        self.position = position # 0-based; messages count from 1.
+        self.symbol = symbol
+        self.alphabet = alphabet
+        self.record_id = record_id
+        where = f"Record '{record_id}': invalid" if record_id is not None else "Invalid"
+        super().__init__(f"{where} nucleotide '{symbol}' at position {position + 1} "
+                         f"({alphabet} alphabet allows {ALPHABETS[alphabet]}).")
+
+def first_invalid_position(sequence: str, alphabet: str = "strict") -> int:
+    # Offset of the first symbol outside 'alphabet', or -1 if the whole sequence is valid.
+    try:
+        leftover = sequence.encode("ascii").translate(None, _ALLOWED_BYTES[alphabet])
+    except UnicodeEncodeError:
+        leftover = True # Non-ASCII input can never be valid; the search below finds where it starts.
+
+    if not leftover:
+        return -1
+    return _INVALID_PATTERNS[alphabet].search(sequence).start()
+
+def normalize_nucleotides(sequence: str, alphabet: str = "strict", record_id: Optional[str] = None) -> str:
+    if alphabet not in ALPHABETS:
+        raise ValueError(f"Unknown alphabet '{alphabet}' (choose from {', '.join(ALPHABETS)}).")
+
+    position = first_invalid_position(sequence, alphabet)
+    if position >= 0:
+        raise InvalidSequenceError(position, sequence[position], alphabet, record_id)
+
+    sequence = sequence.upper()
+    return sequence.replace("U", "T") if "U" in ALPHABETS[alphabet] else sequence
+
+def validate_records(records: Dict[str, str], alphabet: str = "strict") -> Dict[str, str]:
+    # Normalized copy of a {record_id: sequence} mapping; the first invalid record raises.
+    return {record_id: normalize_nucleotides(seq, alphabet, record_id) for record_id, seq in records.items()}
+
+def validate_target_panel(targets: Dict[str, str]) -> Dict[str, str]:
+    # Target residues aren't restricted to an alphabet, but libraries, content hashes and k-mer codes are
+    # byte-based, so a non-ASCII symbol is rejected up front instead of failing deep inside a job.
+    for target_id, seq in targets.items():
+        if not seq.isascii():
+            position = next(i for i, symbol in enumerate(seq) if not symbol.isascii())
+            raise ValueError(f"Target '{target_id}': invalid residue '{seq[position]}' at position {position + 1}.")
+    return targets
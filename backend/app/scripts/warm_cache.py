@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# warm_cache.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'warm_cache' keeps parsed target panels alive between jobs on a warm Lambda container.
+Entries are keyed by S3 key and validated against the object's current ETag with a HEAD request, so a
+job against a panel the container has already seen skips both the download and the parse. The cache
+is bounded by an approximate byte budget and evicts least-recently-used panels first.
+
+Compiled target libraries (see target_library) are content addressed, so their keys can never point
+at different bytes; they're cached without the HEAD round trip. The same goes for a finished job's JSON
+artifacts (tmp/<job_id>/...), which the worker writes once and the paginated result getters reread.
+
+"""
+
+from app.scripts.compression import open_fasta_text
+from app.scripts.metrics import CACHE_REQUESTS, Gauge
+from app.scripts.serialization import loads_json
+from app.scripts.target_library import TargetLibrary, ensure_target_library, load_target_library
+from app.scripts.utils import parse_fasta
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Optional, Tuple
+
+import os
+import threading
+
+WARM_CACHE_MAX_BYTES = int(os.environ.get("WARM_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# Rough per-record overhead of a parsed {id: sequence} entry (two str objects + dict slot).
+RECORD_OVERHEAD_BYTES = 150
+
+class WarmCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, Tuple[Optional[str], Any, int]]" = OrderedDict() # key -> (etag, value, size)
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str, etag: Optional[str]):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: str, etag: Optional[str], value, size: int):
+        if size > self.max_bytes:
+            return # Never worth flushing the whole cache for one oversized panel.
+
+        dropped = []
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[2]
+                if previous[1] is not value:
+                    dropped.append(previous[1])
+
+            self.entries[key] = (etag, value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, (_, evicted, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                dropped.append(evicted)
+        _close_all(dropped)
+
+    def clear(self):
+        with self.lock:
+            dropped = [value for _, value, _ in self.entries.values()]
+            self.entries.clear()
+            self.total_bytes = 0
+        _close_all(dropped)
+
+def _close_all(values: list):
+    # Target libraries hold an mmap (and its file descriptor) until closed. They're only used by the job
+    # that fetched them, which has finished by the time the next job's panel can push them out.
+    for value in values:
+        close = getattr(value, "close", None)
+        if close is not None:
+            close()
+
+WARM_CACHE = WarmCache(WARM_CACHE_MAX_BYTES)
+WARM_CACHE_BYTES = Gauge("esa_warm_cache_bytes", "Approximate bytes of target panels held in WARM_CACHE.",
+                         callback=lambda: WARM_CACHE.total_bytes)
+
+def _cached(key: str, etag: Optional[str], loader: Callable[[], Tuple[Any, int, Optional[str]]]):
+    value = WARM_CACHE.get(key, etag)
+    if value is not None:
+        CACHE_REQUESTS.inc(cache="warm_targets", result="hit")
+        return value
+
+    CACHE_REQUESTS.inc(cache="warm_targets", result="miss")
+    value, size, loaded_etag = loader()
+    WARM_CACHE.put(key, loaded_etag, value, size)
+    return value
+
+def cached_target_set(target_key: str, s3_client, bucket_name: str) -> Mapping[str, str]:
+    etag = s3_client.head_object(Bucket=bucket_name, Key=target_key)["ETag"]
+
+    def loader():
+        # The ETag stored is the one GetObject actually served, in case the object changed after the HEAD.
+        response = s3_client.get_object(Bucket=bucket_name, Key=target_key)
+        targets = parse_fasta(open_fasta_text(response["Body"]))
+        size = sum(len(target_id) + len(seq) + RECORD_OVERHEAD_BYTES for target_id, seq in targets.items())
+        return targets, size, response["ETag"]
+
+    return _cached(target_key, etag, loader)
+
+def cached_target_library(library_key: str, s3_client, bucket_name: str) -> TargetLibrary:
+    def loader():
+        library = load_target_library(library_key, s3_client, bucket_name)
+        return library, os.path.getsize(library.path), None
+
+    return _cached(library_key, None, loader)
+
+def cached_artifact_json(key: str, s3_client, bucket_name: str):
+    def loader():
+        body = s3_client.get_object(Bucket=bucket_name, Key=key)["Body"].read()
+        return loads_json(body), len(body) * 4, None # Parsed JSON is a few times larger than its text.
+
+    return _cached(key, None, loader)
+
+def fetch_targets(target_key: str, s3_client, bucket_name: str,
+                  target_library_key: Optional[str] = None) -> Mapping[str, str]:
+    """
+    Prefers the compiled library (memory-mapped, nothing to parse); the raw FASTA is the fallback. The API
+    only names the library (by the panel's content hash), so the first job against a new panel parses the
+    FASTA and compiles the library here for every job after it.
+    """
+    if not target_library_key:
+        return cached_target_set(target_key, s3_client, bucket_name)
+
+    try:
+        return cached_target_library(target_library_key, s3_client, bucket_name)
+    except Exception as e:
+        print(f"Couldn't load target library {target_library_key}, falling back to FASTA: {e}")
+
+    targets = cached_target_set(target_key, s3_client, bucket_name)
+    try:
+        ensure_target_library(targets, s3_client, bucket_name)
+    except Exception as e:
+        print(f"Couldn't build target library {target_library_key}: {e}")
+    return targets
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+# run_benchmarks.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'run_benchmarks' times every stage of the alignment pipeline (translation, ORF discovery,
+whole-sequence, windowed and packed-input frame generation, LCA computation, pairwise alignment, CSV
+row export)
+plus the end-to-end worker 'run_pipeline' over a seeded synthetic workload. The worker's JSON
+artifacts for that workload are also serialized with the json module and with dumps_json, and
+compressed as API responses would be, with their byte sizes recorded alongside the timings. Each stage
+records its best/mean wall time and peak traced memory, and the full report is written as JSON so it
+can be saved as a baseline and compared against on later runs.
+
+Usage (from the backend/ directory):
+    python -m benchmarks.run_benchmarks --out bench.json
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --tolerance 0.25
+
+"""
+
+import os
+
+# The worker module builds its boto3 clients on import; a default region keeps that offline-safe.
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+
+from benchmarks.synthetic import *
+from app.scripts.translate import translate, reverse_complement
+from app.scripts.frame_retrieve import generate_frames, find_orfs, get_translate_output
+from app.scripts.packed_seq import PackedRecords
+from app.scripts.build_alignment import TopHits, align, compute_lca, record_orf_refs
+from app.scripts.utils import data_export
+from app.scripts.serialization import brotli, compress_body, dumps_json
+from worker_handler import run_pipeline
+from datetime import datetime, timezone
+from io import StringIO
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import pandas as pd
+
+RESULT_COLUMNS = ["Name", "Target", "Identity-Score", "Direction", "Most-Likely-ORF", "Notes"]
+
+def measure(fn, repeat: int = 3) -> dict:
+    """
+    Times 'fn' over 'repeat' runs, then performs one extra traced run for peak memory (tracemalloc slows
+    execution noticeably, so it never overlaps with the timed runs).
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(durations), 'mean_seconds': sum(durations) / len(durations),
+            'repeat': repeat, 'peak_kib': round(peak / 1024, 1)}
+
+def build_stages(workload: dict, direction: str) -> tuple:
+    reads, targets = workload['reads'], workload['targets']
+    rng = random.Random(workload['params']['seed'])
+
+    # Precomputed inputs so that each stage is timed in isolation.
+    aa_seqs = [aa for seq in reads.values() for aa in get_translate_output(seq, direction)]
+    all_orfs = [(name, orf) for name, seq in reads.items()
+                for frame in generate_frames(seq, direction).values() for orf in frame['orf_set']]
+    compact_frames = {name: generate_frames(seq, direction, compact=True) for name, seq in reads.items()}
+    match_strings = [generate_match_string(rng, len(orf)) for _, orf in all_orfs]
+    reads_fasta, targets_fasta = to_fasta(reads), to_fasta(targets)
+    packed_reads = PackedRecords.from_records(reads.items())
+
+    frames, top_hits, alignment_results, _, alignment_cache = asyncio.run(
+        run_pipeline(StringIO(reads_fasta), StringIO(targets_fasta), direction))
+    artifacts = [frames, alignment_results, top_hits.to_json(), alignment_cache.to_json()]
+    payload = b"".join(dumps_json(artifact) for artifact in artifacts)
+
+    def stage_translate():
+        for seq in reads.values():
+            translate(seq)
+            translate(reverse_complement(seq))
+
+    def stage_find_orfs():
+        for aa_seq in aa_seqs:
+            find_orfs(aa_seq)
+
+    def stage_generate_frames():
+        for seq in reads.values():
+            generate_frames(seq, direction)
+
+    def stage_generate_frames_windowed():
+        for seq in reads.values():
+            generate_frames(seq, direction, windowed=True)
+
+    def stage_pack_inputs():
+        PackedRecords.from_records(reads.items())
+
+    def stage_generate_frames_packed():
+        for seq in packed_reads.values():
+            generate_frames(seq, direction)
+
+    def stage_compute_lca():
+        for match_seq in match_strings:
+            compute_lca(match_seq, threshold=0.98)
+
+    def stage_align():
+        top_hits = TopHits()
+        for name, frame_data in compact_frames.items():
+            orfs, orf_refs = record_orf_refs(name, frame_data, top_hits)
+            for orf, orf_ref in zip(orfs, orf_refs):
+                align(query=orf, orf_ref=orf_ref, target_set=targets, top_hits=top_hits, identity_ratio=0.98)
+
+    def stage_data_export():
+        df = pd.DataFrame(columns=RESULT_COLUMNS)
+        for name, orf in all_orfs:
+            df = data_export(df, name, direction, orf, 100.0, "target_1", "")
+
+    def stage_run_pipeline():
+        asyncio.run(run_pipeline(StringIO(reads_fasta), StringIO(targets_fasta), direction))
+
+    def stage_json_stdlib():
+        for artifact in artifacts:
+            json.dumps(artifact)
+
+    def stage_json_fast():
+        for artifact in artifacts:
+            dumps_json(artifact)
+
+    def stage_compress_gzip():
+        compress_body(payload, "gzip")
+
+    def stage_compress_brotli():
+        compress_body(payload, "br")
+
+    stages = {
+        'translate': (stage_translate, len(reads)),
+        'find_orfs': (stage_find_orfs, len(aa_seqs)),
+        'generate_frames': (stage_generate_frames, len(reads)),
+        'generate_frames_windowed': (stage_generate_frames_windowed, len(reads)),
+        'pack_inputs': (stage_pack_inputs, len(reads)),
+        'generate_frames_packed': (stage_generate_frames_packed, len(reads)),
+        'compute_lca': (stage_compute_lca, len(match_strings)),
+        'align': (stage_align, len(all_orfs) * len(targets)),
+        'data_export': (stage_data_export, len(all_orfs)),
+        'run_pipeline': (stage_run_pipeline, len(reads)),
+        'json_stdlib': (stage_json_stdlib, len(payload)),
+        'json_fast': (stage_json_fast, len(payload)),
+        'compress_gzip': (stage_compress_gzip, len(payload))
+    }
+    if brotli is not None:
+        stages['compress_brotli'] = (stage_compress_brotli, len(payload))
+
+    workload_stats = {'orf_count': len(all_orfs), 'orf_residues': sum(len(orf) for _, orf in all_orfs),
+                      'orf_sq_residues': sum(len(orf) ** 2 for _, orf in all_orfs),
+                      'target_residues': sum(len(seq) for seq in targets.values()),
+                      'input_bp': packed_reads.total_bp, 'input_packed_bytes': packed_reads.nbytes,
+                      'payload_bytes': len(payload), 'payload_gzip_bytes': len(compress_body(payload, "gzip"))}
+    return stages, workload_stats
+
+def run_suite(workload: dict, direction: str, repeat: int, only: list = None) -> dict:
+    stages, workload_stats = build_stages(workload, direction)
+    results = {}
+    for name, (fn, items) in stages.items():
+        if only and name not in only:
+            continue
+        print(f"Benchmarking {name}...")
+        results[name] = {**measure(fn, repeat), 'items': items}
+        print(f"  -> {results[name]['seconds']:.4f}s (peak {results[name]['peak_kib']} KiB)")
+
+    return {
+        'meta': {'timestamp': datetime.now(timezone.utc).isoformat(), 'python': sys.version.split()[0],
+                 'platform': platform.platform(), 'direction': direction},
+        'workload': {**workload['params'], **workload_stats},
+        'stages': results
+    }
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a list of stage names whose best time regressed by more than 'tolerance' (a fraction, so
+    0.25 means 25% slower) relative to the baseline. Workload mismatches are reported but not fatal.
+    """
+    if report.get('workload') != baseline.get('workload'):
+        print("WARNING: Workload parameters differ from the baseline; comparisons may be meaningless.")
+
+    regressions = []
+    print(f"\n{'Stage':<18}{'Baseline (s)':>14}{'Current (s)':>14}{'Ratio':>10}")
+    for name, current in report['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous is None:
+            print(f"{name:<18}{'--':>14}{current['seconds']:>14.4f}{'new':>10}")
+            continue
+
+        ratio = current['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+        flag = "  <-- REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<18}{previous['seconds']:>14.4f}{current['seconds']:>14.4f}{ratio:>10.2f}{flag}")
+        if flag:
+            regressions.append(name)
+
+    return regressions
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the ESA alignment pipeline.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reads", type=int, default=50, help="Number of synthetic input reads.")
+    parser.add_argument("--read-length", type=int, default=900, help="Length of each read (bp).")
+    parser.add_argument("--orf-density", type=float, default=2.0, help="Planted ORFs per 1000 bp.")
+    parser.add_argument("--panel-size", type=int, default=5, help="Number of reference targets.")
+    parser.add_argument("--target-length", type=int, default=250, help="Length of each target (aa).")
+    parser.add_argument("--direction", choices=["FWD", "REV", "BOTH"], default="BOTH")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="Restrict the run to the named stages.")
+    parser.add_argument("--out", default="bench_results.json", help="Where to write the JSON report.")
+    parser.add_argument("--baseline", help="Baseline JSON report to compare against.")
+    parser.add_argument("--save-baseline", help="Also write this report as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    workload = generate_workload(seed=args.seed, n_reads=args.reads, read_length=args.read_length,
+                                 orf_density=args.orf_density, panel_size=args.panel_size,
+                                 target_length=args.target_length)
+    report = run_suite(workload, args.direction, args.repeat, args.only)
+    sizes = report['workload']
+    print(f"\nJSON artifacts: {sizes['payload_bytes']} bytes, {sizes['payload_gzip_bytes']} gzipped "
+          f"({1 - sizes['payload_gzip_bytes'] / max(sizes['payload_bytes'], 1):.0%} saved).")
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}.")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}.")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
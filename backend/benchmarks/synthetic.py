@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# synthetic.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: 'synthetic' builds seeded, reproducible FASTA workloads for the benchmark suite. Reference
+panels are random protein sequences, while input reads are random nucleotide filler with ORFs planted
+at a configurable density -- each planted ORF is a back-translated fragment of a panel target, so the
+alignment stage sees realistic high-identity hits rather than pure noise.
+
+"""
+
+from app.scripts.translate import gencode
+from typing import Dict
+import random
+
+STOP_CODONS = [codon for codon, aa in gencode.items() if aa == "-"]
+START_CODON = "ATG"
+
+# Filler codons never open or close a reading frame, so the planted ORFs are the only frame-0 ORFs.
+FILLER_CODONS = [codon for codon, aa in gencode.items() if aa not in ("-", "M")]
+AMINO_ACIDS = sorted({aa for aa in gencode.values() if aa not in ("-", "M")})
+
+# Reverse codon table (AA -> synonymous codons) used to back-translate target fragments.
+BACK_TABLE = {}
+for codon, aa in gencode.items():
+    BACK_TABLE.setdefault(aa, []).append(codon)
+
+def random_protein(rng: random.Random, length: int) -> str:
+    return "M" + ''.join(rng.choice(AMINO_ACIDS) for _ in range(length - 1))
+
+def back_translate(rng: random.Random, protein: str) -> str:
+    return ''.join(rng.choice(BACK_TABLE[aa]) for aa in protein)
+
+def generate_targets(rng: random.Random, panel_size: int, target_length: int) -> Dict[str, str]:
+    return {f"target_{i + 1}": random_protein(rng, target_length) for i in range(panel_size)}
+
+def generate_read(rng: random.Random, read_length: int, orf_density: float, targets: Dict[str, str]) -> str:
+    """
+    Builds one in-frame read: filler codons with ORFs planted at 'orf_density' ORFs per 1000 bp. Each
+    ORF is ATG + a back-translated slice of a random target + a stop codon.
+    """
+    n_codons = read_length // 3
+    codons = [rng.choice(FILLER_CODONS) for _ in range(n_codons)]
+
+    expected_orfs = orf_density * read_length / 1000
+    n_orfs = int(expected_orfs) + (1 if rng.random() < expected_orfs % 1 else 0)
+    target_seqs = list(targets.values())
+
+    for _ in range(n_orfs):
+        if not target_seqs or n_codons < 10:
+            break
+        target = rng.choice(target_seqs)
+        orf_codons = rng.randint(8, max(8, min(len(target), n_codons // max(n_orfs, 1)) - 2))
+        fragment_start = rng.randint(1, max(1, len(target) - orf_codons))
+        fragment = target[fragment_start:fragment_start + orf_codons]
+
+        planted = [START_CODON] + [back_translate(rng, aa) for aa in fragment] + [rng.choice(STOP_CODONS)]
+        insert_at = rng.randint(0, max(0, n_codons - len(planted)))
+        codons[insert_at:insert_at + len(planted)] = planted
+
+    read = ''.join(codons)[:read_length]
+    return read + ''.join(rng.choice("ACGT") for _ in range(read_length - len(read)))
+
+def generate_workload(seed: int = 42, n_reads: int = 50, read_length: int = 900, orf_density: float = 2.0,
+                      panel_size: int = 5, target_length: int = 250) -> dict:
+    rng = random.Random(seed)
+    targets = generate_targets(rng, panel_size, target_length)
+    reads = {f"read_{i + 1}": generate_read(rng, read_length, orf_density, targets) for i in range(n_reads)}
+
+    return {
+        'params': {'seed': seed, 'n_reads': n_reads, 'read_length': read_length,
+                   'orf_density': orf_density, 'panel_size': panel_size, 'target_length': target_length},
+        'reads': reads,
+        'targets': targets
+    }
+
+def generate_match_string(rng: random.Random, length: int, identity: float = 0.95) -> str:
+    # Mirrors the Biopython match line ('|' match, '.' mismatch, '-' gap) consumed by compute_lca.
+    return ''.join('|' if rng.random() < identity else rng.choice(".-") for _ in range(length))
+
+def to_fasta(records: Dict[str, str], line_width: int = 60) -> str:
+    lines = []
+    for record_id, seq in records.items():
+        lines.append(f">{record_id}")
+        lines.extend(seq[i:i + line_width] for i in range(0, len(seq), line_width))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# conftest.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Shared setup for the backend test suite. Run 'python -m pytest -q' from backend/. boto3
+clients are created at import time, so a region is set before any app module loads; nothing in the
+suite talks to AWS. Tests that touch AWS paths take the 'aws' fixture, which swaps the app's clients
+for in-memory fakes. The SQLite file the app creates on import is kept out of the source tree.
+
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+os.chdir(tempfile.mkdtemp(prefix="esa-tests-"))
+
+from benchmarks.synthetic import generate_workload, to_fasta
+from botocore.exceptions import ClientError
+from types import SimpleNamespace
+
+import copy
+import hashlib
+import io
+import json
+import re
+import sys
+import pytest
+
+@pytest.fixture(scope="session")
+def workload():
+    # Small enough to align in a second or two, with enough planted ORFs to give every target hits.
+    return generate_workload(seed=7, n_reads=12, read_length=450, orf_density=4.0, panel_size=4,
+                             target_length=60)
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+    from fastapi.testclient import TestClient
+    return TestClient(app)
+
+@pytest.fixture
+def fasta_files(workload):
+    return {"input_fasta": ("input.fasta", to_fasta(workload['reads']).encode()),
+            "target_fasta": ("targets.fasta", to_fasta(workload['targets']).encode())}
+
+class FakeS3:
+    """
+    In-memory stand-in for the boto3 S3 client, covering the calls the app makes. Presigned URLs are
+    just recognizable strings.
+    """
+
+    class exceptions:
+        ClientError = ClientError
+
+    def __init__(self):
+        self.objects = {}
+        self.multipart = {} # upload_id -> (key, {part_number: body})
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[Key] = Body.encode() if isinstance(Body, str) else bytes(Body)
+        return {"ETag": self._etag(Key)}
+
+    def get_object(self, Bucket, Key, Range=None):
+        body = self._body(Key)
+        if Range is not None:
+            start, end = map(int, Range.removeprefix("bytes=").split("-"))
+            body = body[start:end + 1]
+        return {"Body": io.BytesIO(body), "ETag": self._etag(Key)}
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self._body(Key)), "ETag": self._etag(Key)}
+
+    def download_file(self, Bucket, Key, Filename):
+        with open(Filename, "wb") as f:
+            f.write(self._body(Key))
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn=3600):
+        return f"https://s3.test/{Params['Key']}?op={operation}"
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.multipart) + 1}"
+        self.multipart[upload_id] = (Key, {})
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        # What a client's PUT to a presigned part URL does.
+        self.multipart[UploadId][1][PartNumber] = Body
+        return {"ETag": '"' + hashlib.md5(Body).hexdigest() + '"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        key, parts = self.multipart.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        if key != Key or numbers != sorted(parts):
+            raise ClientError({"Error": {"Code": "InvalidPart", "Message": "Invalid part"}}, "CompleteMultipartUpload")
+        self.objects[Key] = b"".join(parts[number] for number in numbers)
+
+    def _body(self, key):
+        if key not in self.objects:
+            raise ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, "HeadObject")
+        return self.objects[key]
+
+    def _etag(self, key):
+        return '"' + hashlib.md5(self.objects[key]).hexdigest() + '"'
+
+def _condition_failed(operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": "ConditionalCheckFailedException", "Message": "Condition failed"}},
+                       operation)
+
+class FakeTable:
+    """
+    In-memory stand-in for a boto3 DynamoDB Table. update_item understands the expression forms the app
+    uses: SET/ADD/REMOVE on (dotted) paths, and conditions built from attribute_exists,
+    attribute_not_exists and '=' joined with AND.
+    """
+
+    def __init__(self, key_name: str):
+        self.key_name = key_name
+        self.items = {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None):
+        key = Item[self.key_name]
+        self._check(self.items.get(key), ConditionExpression, ExpressionAttributeNames or {},
+                    ExpressionAttributeValues or {}, "PutItem")
+        self.items[key] = copy.deepcopy(Item)
+
+    def get_item(self, Key):
+        item = self.items.get(Key[self.key_name])
+        return {} if item is None else {"Item": copy.deepcopy(item)}
+
+    def update_item(self, Key, UpdateExpression, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues=None):
+        names, values = ExpressionAttributeNames or {}, ExpressionAttributeValues or {}
+        key = Key[self.key_name]
+        self._check(self.items.get(key), ConditionExpression, names, values, "UpdateItem")
+        item = copy.deepcopy(self.items.get(key, dict(Key)))
+
+        clauses = re.split(r"\b(SET|ADD|REMOVE)\b", UpdateExpression)
+        for action, body in zip(clauses[1::2], clauses[2::2]):
+            for part in (part.strip() for part in body.split(",") if part.strip()):
+                if action == "SET":
+                    path, value = (side.strip() for side in part.split("="))
+                    parent, leaf = self._parent(item, path, names, create=True)
+                    parent[leaf] = copy.deepcopy(values[value])
+                elif action == "ADD":
+                    path, value = part.split()
+                    parent, leaf = self._parent(item, path, names, create=True)
+                    parent[leaf] = parent.get(leaf, 0) + values[value]
+                else:
+                    parent, leaf = self._parent(item, part, names)
+                    if parent is not None:
+                        parent.pop(leaf, None)
+
+        self.items[key] = item
+        return {"Attributes": copy.deepcopy(item)}
+
+    @staticmethod
+    def _parent(item, path, names, create=False):
+        *parents, leaf = [names.get(part, part) for part in path.split(".")]
+        for part in parents:
+            if part not in item and create:
+                raise ClientError({"Error": {"Code": "ValidationException",
+                                             "Message": "The document path provided in the update expression "
+                                                        "is invalid for update"}}, "UpdateItem")
+            item = item.get(part)
+            if item is None:
+                return None, leaf
+        return item, leaf
+
+    def _check(self, item, condition, names, values, operation):
+        if condition is None:
+            return
+        for clause in condition.split(" AND "):
+            match = re.fullmatch(r"\s*(attribute_exists|attribute_not_exists)\((.+)\)\s*", clause)
+            if match:
+                parent, leaf = self._parent(item or {}, match.group(2), names)
+                exists = parent is not None and leaf in parent
+                passed = exists if match.group(1) == "attribute_exists" else not exists
+            else:
+                path, value = (side.strip() for side in clause.split("="))
+                parent, leaf = self._parent(item or {}, path, names)
+                passed = parent is not None and parent.get(leaf) == values[value]
+            if not passed:
+                raise _condition_failed(operation)
+
+class FakeSQS:
+    def __init__(self):
+        self.messages = []
+        self.fail = False
+
+    def send_message(self, QueueUrl, MessageBody, DelaySeconds=0):
+        if self.fail:
+            raise ClientError({"Error": {"Code": "ServiceUnavailable", "Message": "Try again"}}, "SendMessage")
+        self.messages.append({"queue_url": QueueUrl, "body": json.loads(MessageBody), "delay": DelaySeconds})
+        return {"MessageId": str(len(self.messages))}
+
+def _swap_clients(monkeypatch, **fakes):
+    # Modules that star-imported aws_tools hold their own references, so every copy is swapped (as
+    # reset_aws_clients does for forked workers).
+    import app.main, worker_handler
+    from app.scripts import aws_tools
+
+    for name, fake in fakes.items():
+        original = getattr(aws_tools, name)
+        for module in list(sys.modules.values()):
+            if getattr(module, name, None) is original:
+                monkeypatch.setattr(module, name, fake)
+
+@pytest.fixture
+def aws(monkeypatch):
+    from app.scripts.warm_cache import WARM_CACHE
+
+    fakes = SimpleNamespace(s3=FakeS3(), sqs=FakeSQS(), jobs=FakeTable("job_id"), scheduling=FakeTable("state_id"))
+    _swap_clients(monkeypatch, s3_client=fakes.s3, sqs_client=fakes.sqs, jobs_table=fakes.jobs,
+                  scheduling_table=fakes.scheduling)
+    WARM_CACHE.clear()
+    yield fakes
+    WARM_CACHE.clear()
+
+@pytest.fixture
+def run_worker(aws):
+    # Runs a message the fake SQS received through the worker, as its Lambda trigger would deliver it.
+    import worker_handler
+
+    def run(message: dict, receive_count: int = 1) -> dict:
+        record = {"messageId": message['body']['job_id'], "body": json.dumps(message['body']),
+                  "attributes": {"ApproximateReceiveCount": str(receive_count)}}
+        return worker_handler.run_record(record)
+
+    return run
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# test_alignment_encoding.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Results carry alignments as coordinate blocks plus a CIGAR string; the pretty-printed
+readout is rebuilt only when asked for. The encoding has to round-trip to exactly what str(alignment)
+used to store, including gapped alignments, for inline results, queued results and /align/render.
+
+"""
+
+from app.scripts.build_alignment import *
+
+import json
+import random
+import uuid
+import pytest
+
+def random_protein(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(length))
+
+@pytest.fixture
+def gapped_pairs() -> list:
+    rng = random.Random(11)
+    pairs = []
+    for _ in range(10):
+        target = random_protein(rng, 80)
+        query = list(target[10:70])
+        del query[20:24] # A deletion and an insertion relative to the target.
+        query[40:40] = random_protein(rng, 3)
+        pairs.append((target, "M" + ''.join(query)))
+    return pairs
+
+def test_encoding_round_trips_to_the_biopython_readout(gapped_pairs):
+    for target, query in gapped_pairs:
+        alignment = create_aligner().align(target, query)[0]
+        encoded = encode_alignment(alignment)
+        assert render_alignment(target, query, encoded) == str(alignment)
+        assert len(json.dumps(encoded)) < len(str(alignment)) / 2
+        assert {'D', 'I'} <= set(encoded['cigar']) # The gaps survive into the CIGAR.
+
+def test_cigar_follows_the_coordinate_blocks():
+    coordinates = [[0, 3, 5, 5, 8], [0, 3, 3, 6, 9]]
+    assert coordinates_to_cigar(coordinates) == "3M2D3I3M"
+    assert coordinates_to_cigar([[0, 2, 4], [0, 2, 4]]) == "4M" # Adjacent match blocks merge.
+
+def test_rendering_rejects_coordinates_past_the_sequences():
+    with pytest.raises(ValueError):
+        render_alignment("MKV", "MKV", {'coordinates': [[0, 5], [0, 3]]})
+
+def test_result_rendering_resolves_targets_and_legacy_readouts():
+    target, orf = "MKVLLAAGHW", "MKVLLAAGHW"
+    encoded = encode_alignment(create_aligner().align(target, orf)[0])
+    result = {'target': "target_1", 'top_orf': orf, 'alignment': encoded}
+    expected = render_alignment(target, orf, encoded)
+    assert render_result_alignment(result, {"target_1": target}) == expected
+    assert render_result_alignment(result, {"target\u200b_1": target}) == expected # Stored ids lose ZWSPs.
+    assert render_result_alignment(result, {"other": target}) is None
+    assert render_result_alignment({**result, 'alignment': "legacy readout"}, {}) == "legacy readout"
+    assert render_result_alignment({**result, 'alignment': None}, {"target_1": target}) is None
+
+def test_inline_results_render_on_demand(client, fasta_files):
+    job = client.post("/process/multi", files=fasta_files, data={"page_size": "100"}).json()
+    name, result = next((name, result) for name, result in job['alignment_results'].items() if result.get('alignment'))
+    assert set(result['alignment']) == {'coordinates', 'cigar'}
+
+    readout = client.get(f"/results/{job['job_id']}/alignment/{name}").json()['alignment']
+    assert "\n" in readout and readout.count("target") >= 1
+
+    render = client.post("/align/render", json={'target': "MKVLL", 'query': "MKVLL",
+                                                'alignment': {'coordinates': [[0, 5], [0, 5]]}})
+    assert render.status_code == 200 and "MKVLL" in render.json()['alignment']
+
+@pytest.mark.parametrize("coordinates, status", [([[0, 9], [0, 5]], 400), ([[0, 5]], 422), ([[0, 5], [0]], 422)])
+def test_render_endpoint_rejects_bad_encodings(client, coordinates, status):
+    response = client.post("/align/render", json={'target': "MKVLL", 'query': "MKVLL",
+                                                  'alignment': {'coordinates': coordinates}})
+    assert response.status_code == status
+
+def test_queued_results_render_from_the_stored_artifacts(aws, client, fasta_files, run_worker):
+    client.post("/jobs/submit", files=fasta_files)
+    [message] = aws.sqs.messages
+    assert run_worker(message)['status'] == "COMPLETED"
+
+    job_id = message['body']['job_id']
+    stored = json.loads(aws.s3.objects[aws.jobs.items[job_id]['alignment_key']])
+    name = next(name for name, result in stored.items() if result.get('alignment'))
+    inline = client.post("/process/multi", files=fasta_files, data={"page_size": "100"}).json()
+    expected = client.get(f"/results/{inline['job_id']}/alignment/{name}").json()
+
+    assert client.get(f"/jobs/{job_id}/alignment/{name}").json() == expected
+    assert client.get(f"/jobs/{job_id}/alignment/missing").status_code == 404
+    assert client.get(f"/jobs/{uuid.uuid4()}/alignment/{name}").status_code == 404
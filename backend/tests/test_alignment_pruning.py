@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# test_alignment_pruning.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: LCA/identity pruning in align() and batch_alignment_cycle must not change results: with
+EXACT_TOP_HITS the picks and top-hit heaps match an exhaustive search, and in approximate mode the
+per-record picks still do. The exhaustive baseline is the same code with TopHits.could_enter forced
+open, which disables every skip.
+
+"""
+
+from app.scripts.build_alignment import *
+from app.scripts.frame_retrieve import generate_frames
+from app.scripts.metrics import ALIGNMENTS_PRUNED
+
+import pandas as pd
+import pytest
+
+def run_alignment(workload: dict, threshold: float = 0.98, top_k: int = 3, **cycle_kwargs) -> tuple:
+    top_hits = TopHits(top_k)
+    results_df = pd.DataFrame(columns=["Name", "Target", "Identity-Score", "Direction", "Most-Likely-ORF", "Notes"])
+    results = {}
+    for name, seq in workload['reads'].items():
+        orfs, refs = record_orf_refs(name, generate_frames(seq, "BOTH", compact=True), top_hits)
+        if orfs:
+            results_df, results[name] = batch_alignment_cycle("BOTH", name, orfs, workload['targets'], top_hits,
+                                                              results_df, threshold, refs, **cycle_kwargs)
+    return results, top_hits.to_json()
+
+def pruned_count() -> float:
+    return sum(ALIGNMENTS_PRUNED.values.values())
+
+@pytest.fixture(scope="module")
+def exhaustive(workload):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(TopHits, "could_enter", lambda self, target_id, identity_bound, rank: True)
+        before = pruned_count()
+        results = run_alignment(workload)
+        assert pruned_count() == before
+    return results
+
+def test_exact_pruning_matches_exhaustive(workload, exhaustive):
+    before = pruned_count()
+    assert run_alignment(workload, exact_top_hits=True) == exhaustive
+    assert pruned_count() > before # Otherwise the workload isn't exercising the bounds at all.
+
+def test_approximate_pruning_keeps_record_picks(workload, exhaustive):
+    results, _ = run_alignment(workload, exact_top_hits=False)
+    assert results == exhaustive[0]
+
+def test_alignment_cache_reuses_pairs_without_changing_results(workload, exhaustive):
+    alignment_cache = AlignmentCache()
+    assert run_alignment(workload, alignment_cache=alignment_cache) == exhaustive
+    assert alignment_cache.to_json()
+
+    # A second pass at another threshold reads every pair back from the cache.
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr("app.scripts.build_alignment.align_pair", lambda *args: pytest.fail("pair was re-aligned"))
+        rethresholded = run_alignment(workload, threshold=0.9, alignment_cache=alignment_cache)
+    assert rethresholded == run_alignment(workload, threshold=0.9)
+
+def test_top_hits_keep_k_best_with_earliest_ties():
+    top_hits = TopHits(2)
+    top_hits.register_frame("r", "f", "MKVLA")
+    for rank, identity in enumerate([90.0, 95.0, 95.0, 80.0]):
+        top_hits.push("t", identity, 5, ("r", "f", 0, 5), rank)
+
+    # Entries are (identity, -rank, lca, ref): the two 95s stay, and rank 1 beats rank 2 on the tie.
+    assert [entry[:2] for entry in sorted(top_hits.heaps["t"], reverse=True)] == [(95.0, -1), (95.0, -2)]
+    assert not top_hits.could_enter("t", 95.0, 3) and top_hits.could_enter("t", 95.0, 0)
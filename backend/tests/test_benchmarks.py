@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# test_benchmarks.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: The benchmark suite's seeded workload generator and its report/baseline handling. Runs
+are kept to a couple of tiny stages; the timings themselves aren't asserted on.
+
+"""
+
+from app.scripts.translate import translate
+from benchmarks import run_benchmarks
+from benchmarks.synthetic import *
+
+import json
+import pytest
+
+def test_workloads_are_reproducible_from_their_seed():
+    assert generate_workload(seed=5, n_reads=4) == generate_workload(seed=5, n_reads=4)
+    assert generate_workload(seed=5, n_reads=4)['reads'] != generate_workload(seed=6, n_reads=4)['reads']
+
+def test_workload_shape_follows_its_parameters():
+    workload = generate_workload(seed=1, n_reads=6, read_length=301, panel_size=3, target_length=40)
+    assert len(workload['reads']) == 6 and len(workload['targets']) == 3
+    assert all(len(read) == 301 and set(read) <= set("ACGT") for read in workload['reads'].values())
+    assert all(len(seq) == 40 and seq[0] == "M" for seq in workload['targets'].values())
+
+def test_planted_orfs_come_from_the_panel():
+    # Filler never opens a frame-0 ORF, so every Met in frame 0 starts a planted target fragment.
+    workload = generate_workload(seed=2, n_reads=10, read_length=900, orf_density=2.0)
+    planted = []
+    for read in workload['reads'].values():
+        for segment in translate(read).split("-"):
+            if "M" in segment:
+                planted.append(segment[segment.index("M") + 1:])
+    assert len(planted) >= 10
+    from_panel = [fragment for fragment in planted if any(fragment in seq for seq in workload['targets'].values())]
+    assert len(from_panel) >= 0.8 * len(planted) # Later plantings may overwrite the tail of earlier ones.
+
+def test_match_strings_use_the_biopython_alphabet():
+    import random
+    match = generate_match_string(random.Random(0), 500, identity=0.9)
+    assert len(match) == 500 and set(match) <= set("|.-")
+    assert 0.8 < match.count("|") / 500 < 1.0
+
+def test_to_fasta_wraps_lines():
+    assert to_fasta({"a": "ACGT" * 20}, line_width=60) == ">a\n" + "ACGT" * 15 + "\n" + "ACGT" * 5 + "\n"
+
+def test_measure_reports_best_and_mean_times():
+    calls = []
+    result = run_benchmarks.measure(lambda: calls.append(bytearray(4096)), repeat=3)
+    assert len(calls) == 4 # Three timed runs plus the traced one.
+    assert result['repeat'] == 3 and result['seconds'] <= result['mean_seconds'] and result['peak_kib'] >= 4
+
+def test_baseline_comparison_flags_only_regressions():
+    baseline = {'workload': {'seed': 1}, 'stages': {'align': {'seconds': 1.0}, 'translate': {'seconds': 1.0}}}
+    report = {'workload': {'seed': 1}, 'stages': {'align': {'seconds': 1.5}, 'translate': {'seconds': 1.1},
+                                                  'pack_inputs': {'seconds': 9.0}}}
+    assert run_benchmarks.compare_to_baseline(report, baseline, tolerance=0.25) == ["align"]
+
+@pytest.fixture
+def tiny_args(tmp_path) -> list:
+    return ["--reads", "3", "--read-length", "300", "--panel-size", "2", "--target-length", "30",
+            "--repeat", "1", "--only", "translate", "find_orfs"]
+
+def test_main_writes_a_report_and_fails_on_regression(tmp_path, tiny_args):
+    out, baseline = tmp_path / "bench.json", tmp_path / "baseline.json"
+    assert run_benchmarks.main([*tiny_args, "--out", str(out), "--save-baseline", str(baseline)]) == 0
+
+    report = json.loads(out.read_text())
+    assert set(report['stages']) == {"translate", "find_orfs"}
+    assert report['workload']['n_reads'] == 3 and report['workload']['orf_count'] >= 0
+    assert report['workload']['payload_bytes'] > 0 and json.loads(baseline.read_text()) == report
+
+    # A baseline no run can match makes main() report the regression through its exit code.
+    report['stages']['translate']['seconds'] = 1e-9
+    baseline.write_text(json.dumps(report))
+    assert run_benchmarks.main([*tiny_args, "--out", str(out), "--baseline", str(baseline)]) == 1
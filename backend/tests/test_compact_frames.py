@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+# test_compact_frames.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Compact frames, which keep ORFs as (start, end) offsets into aa_seq: they expand back to
+the legacy 'orf_set' layout exactly, are accepted anywhere frames are posted, align to the same results
+and are what cached and stored frames hold.
+
+"""
+
+from app.models.seq_input import FrameEntry
+from app.scripts.frame_retrieve import expand_frame_set, find_orfs, generate_frames
+from app.scripts.serialization import dumps_json
+from pydantic import ValidationError
+
+import pytest
+
+def test_spans_expand_to_the_legacy_orf_set(workload):
+    for seq in workload['reads'].values():
+        legacy, compact = generate_frames(seq, "BOTH"), generate_frames(seq, "BOTH", compact=True)
+        assert all('orf_set' not in frame for frame in compact.values())
+        assert expand_frame_set(compact) == legacy
+
+def test_open_ended_orfs_run_to_the_end_of_the_frame():
+    assert find_orfs("AMKV-QMLL", compact=True)['orf_spans'] == [[1, 4], [6, 9]]
+    assert find_orfs("AMKV-QMLL")['orf_set'] == ["MKV", "MLL"]
+
+def test_compact_frames_are_smaller(workload):
+    legacy = {name: generate_frames(seq, "BOTH") for name, seq in workload['reads'].items()}
+    compact = {name: generate_frames(seq, "BOTH", compact=True) for name, seq in workload['reads'].items()}
+    # Each ORF's residues are no longer sent twice; a span costs a handful of bytes instead.
+    orf_residues = sum(len(orf) for frames in legacy.values() for frame in frames.values() for orf in frame['orf_set'])
+    assert len(dumps_json(legacy)) - len(dumps_json(compact)) > 0.5 * orf_residues
+
+def test_frame_entries_accept_either_layout():
+    assert FrameEntry(aa_seq="AMKV-QMLL", orf_spans=[(1, 4), (6, 9)]).orfs() == ["MKV", "MLL"]
+    assert FrameEntry(aa_seq="AMKV", orf_set=["MKV"]).orfs() == ["MKV"]
+
+@pytest.mark.parametrize("fields", [{}, {'orf_spans': [(3, 2)]}, {'orf_spans': [(1, 99)]}])
+def test_frame_entries_reject_missing_or_out_of_range_orfs(fields):
+    with pytest.raises(ValidationError):
+        FrameEntry(aa_seq="AMKV-QMLL", **fields)
+
+def test_frames_endpoints_serve_both_layouts(client, workload):
+    name, seq = next(iter(workload['reads'].items()))
+    compact = client.post("/frames/single", json={"sequence": seq, "compact": True}).json()
+    legacy = client.post("/frames/single", json={"sequence": seq}).json()
+    assert compact == generate_frames(seq, "BOTH", compact=True) and expand_frame_set(compact) == legacy
+
+def test_compact_frames_align_like_legacy_ones(client, workload):
+    results = {}
+    for compact in (False, True):
+        frames = client.post("/frames/multi", json={"sequences": workload['reads'], "compact": compact}).json()
+        response = client.post("/align/multi", json={"query_frames": frames, "targets": workload['targets']})
+        assert response.status_code == 200
+        results[compact] = response.json()
+    assert results[True] == results[False]
+
+def test_cached_frames_are_compact_unless_expanded(client, fasta_files, workload):
+    job_id = client.post("/process/multi", files=fasta_files, data={"page_size": "5"}).json()['job_id']
+    name, seq = next(iter(workload['reads'].items()))
+    compact = client.get(f"/results/{job_id}/frames/{name}", params={'compact': True}).json()
+    assert compact == generate_frames(seq, "BOTH", compact=True)
+    assert client.get(f"/results/{job_id}/frames/{name}").json() == generate_frames(seq, "BOTH")
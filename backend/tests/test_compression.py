@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# test_compression.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Gzip and BGZF FASTA must parse to the same records as plain text, whether read whole,
+streamed through open_fasta_text, or sampled from a truncated prefix.
+
+"""
+
+from app.scripts.compression import *
+from app.scripts.utils import iter_fasta_records, parse_fasta
+from benchmarks.synthetic import to_fasta
+from io import BytesIO, StringIO
+
+import gzip
+import pytest
+
+def bgzf(text: str, block_bytes: int = 1000) -> bytes:
+    # BGZF is a series of independent gzip members; splitting mid-record is what real tools do too.
+    data = text.encode("utf-8")
+    return b"".join(gzip.compress(data[i:i + block_bytes]) for i in range(0, len(data), block_bytes))
+
+@pytest.fixture
+def fasta_text(workload):
+    return to_fasta(workload['reads'])
+
+@pytest.mark.parametrize("encode", [str.encode, gzip_fasta_text, bgzf], ids=["plain", "gzip", "bgzf"])
+def test_every_reader_sees_the_same_records(workload, fasta_text, encode):
+    data = encode(fasta_text)
+    assert is_gzipped(data) == (encode is not str.encode)
+    assert decode_fasta_bytes(data) == fasta_text
+    assert parse_fasta(StringIO(decode_fasta_bytes(data))) == workload['reads']
+    assert dict(iter_fasta_records(open_fasta_text(BytesIO(data)))) == workload['reads']
+
+@pytest.mark.parametrize("encode", [str.encode, gzip_fasta_text, bgzf], ids=["plain", "gzip", "bgzf"])
+def test_truncated_prefix_decodes_to_a_prefix(fasta_text, encode):
+    data = encode(fasta_text)
+    prefix = decompress_prefix(data[:len(data) // 2]).decode("utf-8")
+    assert prefix and fasta_text.startswith(prefix)
+
+def test_prefix_cut_inside_a_header_keeps_earlier_blocks(fasta_text):
+    data = bgzf(fasta_text)
+    second_block = len(gzip.compress(fasta_text.encode("utf-8")[:1000]))
+    assert decompress_prefix(data[:second_block + 5]).decode("utf-8") == fasta_text[:1000]
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# test_cost_model.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: The pre-alignment cost estimate: it scales with the input and the target panel, the
+prefix-based estimate for direct uploads tracks the full one, calibration recovers the coefficients it
+was fit against, and /jobs/run answers inline only up to INLINE_BUDGET_SECONDS.
+
+"""
+
+from app.scripts.cost_model import *
+from benchmarks.synthetic import generate_workload, to_fasta
+
+import json
+import pytest
+
+def estimate(n_reads: int = 20, panel_size: int = 5, target_length: int = 250, read_length: int = 900) -> dict:
+    workload = generate_workload(seed=3, n_reads=n_reads, read_length=read_length, panel_size=panel_size,
+                                 target_length=target_length)
+    return estimate_alignment_cost(workload['reads'], workload['targets'], "BOTH")
+
+def test_calibrated_coefficients_are_loaded():
+    with open(COEFFICIENTS_PATH) as f:
+        calibrated = json.load(f)
+    assert set(calibrated) == set(DEFAULT_COEFFICIENTS) and all(value > 0 for value in calibrated.values())
+    assert COEFFICIENTS == calibrated
+
+@pytest.mark.parametrize("grown", [{'n_reads': 80}, {'read_length': 3600}, {'panel_size': 20},
+                                   {'target_length': 1000}])
+def test_estimate_grows_with_input_and_panel(grown):
+    base, bigger = estimate(), estimate(**grown)
+    assert bigger['estimated_seconds'] > base['estimated_seconds']
+
+def test_more_reads_scale_the_estimate_linearly():
+    base, doubled = estimate(n_reads=20), estimate(n_reads=40)
+    assert doubled['total_bp'] == 2 * base['total_bp']
+    assert doubled['estimated_seconds'] == pytest.approx(2 * base['estimated_seconds'], rel=0.25)
+
+def test_prefix_estimate_tracks_the_full_estimate():
+    workload = generate_workload(seed=3, n_reads=60)
+    full = estimate_alignment_cost(workload['reads'], workload['targets'], "BOTH")
+    prefix_reads = dict(list(workload['reads'].items())[:15])
+    total_bytes = len(to_fasta(workload['reads']))
+    prefix = estimate_alignment_cost_from_prefix(prefix_reads, len(to_fasta(prefix_reads)), total_bytes,
+                                                 workload['targets'], "BOTH")
+    assert prefix['records'] == pytest.approx(full['records'], rel=0.05)
+    assert prefix['estimated_seconds'] == pytest.approx(full['estimated_seconds'], rel=0.25)
+
+def test_calibration_recovers_known_coefficients():
+    truth = {'per_pair': 3.0e-4, 'per_cell': 5.0e-8, 'per_lca_step': 2.0e-7}
+    reports = []
+    for orfs, panel, target_residues in [(100, 3, 450), (400, 3, 1500), (250, 10, 1500), (900, 10, 5000)]:
+        workload = {'orf_count': orfs, 'orf_residues': orfs * 25, 'orf_sq_residues': orfs * (1500 + panel * 40),
+                    'panel_size': panel, 'target_residues': target_residues}
+        terms = work_terms(orfs, workload['orf_residues'], workload['orf_sq_residues'], panel, target_residues)
+        reports.append({'workload': workload,
+                        'stages': {'align': {'seconds': sum(truth[name] * terms[name] for name in terms)}}})
+
+    fitted = calibrate_cost_model(reports)
+    assert fitted == pytest.approx(truth, rel=1e-6)
+    with pytest.raises(ValueError):
+        calibrate_cost_model(reports[:2])
+
+@pytest.mark.parametrize("budget, mode", [(1e9, "inline"), (0.0, "queued")])
+def test_run_switches_mode_at_the_inline_budget(aws, client, fasta_files, monkeypatch, budget, mode):
+    from app.routers import jobs # After the client fixture has imported the app (models import circularly).
+    monkeypatch.setattr(jobs, "INLINE_BUDGET_SECONDS", budget)
+    response = client.post("/jobs/run", files=fasta_files)
+    assert response.status_code == 200
+
+    body = response.json()
+    assert body['mode'] == mode and body['estimate']['estimated_seconds'] > 0
+    if mode == "inline":
+        assert body['alignment_results'] and not aws.sqs.messages
+    else:
+        [message] = aws.sqs.messages
+        assert message['body']['job_id'] == body['job_id']
+
+def test_estimate_at_the_budget_still_runs_inline(aws, client, fasta_files, monkeypatch):
+    from app.routers import jobs
+    # The budget is inclusive: a request estimated at exactly INLINE_BUDGET_SECONDS isn't queued.
+    seconds = client.post("/jobs/run", files=fasta_files).json()['estimate']['estimated_seconds']
+    aws.sqs.messages.clear()
+    monkeypatch.setattr(jobs, "INLINE_BUDGET_SECONDS", seconds)
+    assert client.post("/jobs/run", files=fasta_files).json()['mode'] == "inline"
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# test_deduplication.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Repeated reads are translated once (FrameInterner) and repeated ORFs aligned once per
+target (AlignmentCache), with every copy still getting its own result and top-hit entries. The
+baseline is the same pipeline with a zero-capacity cache, which aligns every copy.
+
+"""
+
+from app.scripts import build_alignment
+from app.scripts.build_alignment import *
+from app.scripts.frame_retrieve import FrameInterner, generate_frames
+from benchmarks.synthetic import to_fasta
+
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def repeated(workload) -> dict:
+    # Every read appears three times under different names, as in an amplicon panel.
+    reads = {f"{name}_copy{i}": seq for i in range(3) for name, seq in workload['reads'].items()}
+    return {'reads': reads, 'targets': workload['targets']}
+
+def run(workload: dict, alignment_cache: AlignmentCache) -> tuple:
+    # Returns the results, top hits and summary table, plus how many pairs were actually aligned.
+    calls = []
+    align_pair = build_alignment.align_pair
+    top_hits, interner = TopHits(20), FrameInterner()
+    results_df = pd.DataFrame(columns=["Name", "Target", "Identity-Score", "Direction", "Most-Likely-ORF", "Notes"])
+    results = {}
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(build_alignment, "align_pair", lambda *args: calls.append(args) or align_pair(*args))
+        for name, seq in workload['reads'].items():
+            orfs, refs = record_orf_refs(name, interner.generate(seq, "BOTH", compact=True), top_hits)
+            if orfs:
+                results_df, results[name] = batch_alignment_cycle("BOTH", name, orfs, workload['targets'], top_hits,
+                                                                  results_df, 0.98, refs, alignment_cache=alignment_cache)
+    return results, top_hits.to_json(), results_df, len(calls)
+
+def test_repeated_reads_share_one_translation(workload):
+    interner = FrameInterner()
+    seq = next(iter(workload['reads'].values()))
+    first = interner.generate(seq, "BOTH", compact=True)
+    assert interner.generate(''.join(list(seq)), "BOTH", compact=True) is first # Equal, not identical, string.
+    assert interner.generate(seq, "FWD", compact=True) is not first
+    assert first == generate_frames(seq, "BOTH", compact=True) and len(interner.frames) == 2
+
+def test_repeated_orfs_are_aligned_once_with_identical_output(repeated):
+    deduplicated = run(repeated, AlignmentCache())
+    every_copy = run(repeated, AlignmentCache(max_pairs=0))
+
+    assert deduplicated[:2] == every_copy[:2] # Results and top hits, copies included.
+    pd.testing.assert_frame_equal(deduplicated[2], every_copy[2])
+    assert deduplicated[3] <= every_copy[3] / 2 # Copies after the first are read back from the cache.
+
+def test_copies_fan_out_to_every_record(repeated, workload):
+    results, top_hits, _, _ = run(repeated, AlignmentCache())
+    for name in workload['reads']:
+        if name + "_copy0" in results:
+            assert results[name + "_copy0"] == results[name + "_copy1"] == results[name + "_copy2"]
+
+    # A copy of a hit ORF sits in the heap as its own entry, pointing at its own record.
+    hit_records = {orf['record'] for orf in top_hits['orfs'].values()}
+    assert any(record.endswith("_copy1") for record in hit_records)
+
+def test_cache_capacity_is_respected():
+    cache = AlignmentCache(max_pairs=2)
+    for target_id in ("t1", "t2", "t3"):
+        cache.put("orf", target_id, (100.0, [(0, "|||")], None))
+    assert cache.size == 2 and cache.get("orf", "t3") is None and cache.get("orf", "t1") is not None
+
+def test_cache_round_trips_through_json():
+    cache = AlignmentCache()
+    cache.put(orf_digest("MKV"), "t1", (66.7, [(0, "||.")], {'coordinates': [[0, 3], [0, 3]], 'cigar': "3M"}))
+    restored = AlignmentCache.from_json(cache.to_json())
+    assert restored.pairs == cache.pairs and restored.to_json() == cache.to_json()
+
+def test_repeated_inputs_align_once_through_the_api(client, workload, repeated):
+    def post(reads: dict) -> tuple:
+        before = ALIGNMENTS_TOTAL.values.get((), 0)
+        files = {"input_fasta": ("input.fasta", to_fasta(reads).encode()),
+                 "target_fasta": ("targets.fasta", to_fasta(workload['targets']).encode())}
+        response = client.post("/process/multi", files=files, data={"page_size": "1000"})
+        return response.json()['alignment_results'], ALIGNMENTS_TOTAL.values.get((), 0) - before
+
+    single, single_alignments = post(workload['reads'])
+    tripled, tripled_alignments = post(repeated['reads'])
+    assert all(tripled[f"{name}_copy2"] == result for name, result in single.items())
+    assert tripled_alignments <= single_alignments
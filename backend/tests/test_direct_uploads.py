@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# test_direct_uploads.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Direct-to-S3 submissions (/jobs/uploads, then /jobs/{job_id}/finalize) against in-memory
+AWS fakes. Finalize completes multipart uploads and queues the job; any failure along the way, including
+a failed SQS send, hands the upload back so the client can call finalize again.
+
+"""
+
+from app.scripts import aws_tools
+from benchmarks.synthetic import to_fasta
+from botocore.exceptions import ClientError
+
+import pytest
+
+def request_uploads(client, **sizes) -> dict:
+    response = client.post("/jobs/uploads", json={label: {'filename': f"{label}.fasta", 'size': size}
+                                                  for label, size in sizes.items()})
+    assert response.status_code == 200
+    return response.json()
+
+def put_upload(aws, upload: dict, body: bytes) -> list:
+    # Does what the browser does with the presigned URLs; returns the parts list finalize expects.
+    if upload['method'] == "PUT":
+        aws.s3.put_object(Bucket="bucket", Key=upload['key'], Body=body)
+        return []
+    chunks = [body[i:i + upload['part_size']] for i in range(0, len(body), upload['part_size'])]
+    assert len(chunks) == len(upload['part_urls'])
+    return [{'part_number': number, 'etag': aws.s3.upload_part(Bucket="bucket", Key=upload['key'],
+                                                               UploadId=upload['upload_id'], PartNumber=number,
+                                                               Body=chunk)['ETag']}
+            for number, chunk in enumerate(chunks, start=1)]
+
+@pytest.fixture
+def bodies(workload) -> dict:
+    return {'input': to_fasta(workload['reads']).encode(), 'target': to_fasta(workload['targets']).encode()}
+
+@pytest.fixture
+def staged(aws, client, bodies) -> dict:
+    started = request_uploads(client, input=len(bodies['input']), target=len(bodies['target']))
+    for label, upload in started['uploads'].items():
+        put_upload(aws, upload, bodies[label])
+    return started
+
+def test_finalize_queues_the_uploaded_job(aws, client, staged):
+    job_id = staged['job_id']
+    response = client.post(f"/jobs/{job_id}/finalize", json={'top_k': 3})
+    assert response.status_code == 200
+    assert response.json()['status'] == "PENDING" and response.json()['estimate']['records'] > 0
+
+    [message] = aws.sqs.messages
+    assert message['body']['input_key'] == staged['uploads']['input']['key']
+    assert message['body']['target_key'] == staged['uploads']['target']['key']
+    assert message['body']['top_k'] == 3 and message['body']['target_library_key']
+
+    # The row is updated in place: its upload keys stay (server-side) next to the scheduling fields.
+    row = aws.jobs.items[job_id]
+    assert row["status"] == "PENDING" and row["size_class"] == message['body']['size_class'] and row["upload_keys"]
+    assert client.post(f"/jobs/{job_id}/finalize", json={}).status_code == 409
+
+def test_failed_send_hands_the_upload_back(aws, client, staged):
+    job_id = staged['job_id']
+    aws.sqs.fail = True
+    with pytest.raises(ClientError):
+        client.post(f"/jobs/{job_id}/finalize", json={})
+    assert aws.jobs.items[job_id]["status"] == "AWAITING_UPLOAD" and aws.jobs.items[job_id]["upload_keys"]
+
+    aws.sqs.fail = False
+    assert client.post(f"/jobs/{job_id}/finalize", json={}).status_code == 200
+    assert aws.jobs.items[job_id]["status"] == "PENDING" and len(aws.sqs.messages) == 1
+
+def test_missing_upload_is_rejected_and_retryable(aws, client, bodies):
+    started = request_uploads(client, input=len(bodies['input']), target=len(bodies['target']))
+    put_upload(aws, started['uploads']['target'], bodies['target'])
+    job_id = started['job_id']
+
+    response = client.post(f"/jobs/{job_id}/finalize", json={})
+    assert response.status_code == 400 and "never uploaded" in response.json()['detail']
+    assert aws.jobs.items[job_id]["status"] == "AWAITING_UPLOAD" and not aws.sqs.messages
+
+    put_upload(aws, started['uploads']['input'], bodies['input'])
+    assert client.post(f"/jobs/{job_id}/finalize", json={}).status_code == 200
+
+def test_invalid_input_is_rejected(aws, client, bodies):
+    started = request_uploads(client, input=30, target=len(bodies['target']))
+    put_upload(aws, started['uploads']['input'], b">read_1\nACGTXACGT\n")
+    put_upload(aws, started['uploads']['target'], bodies['target'])
+
+    response = client.post(f"/jobs/{started['job_id']}/finalize", json={})
+    assert response.status_code == 400 and "read_1" in response.json()['detail']
+    assert aws.jobs.items[started['job_id']]["status"] == "AWAITING_UPLOAD"
+
+def test_multipart_upload_is_completed_on_finalize(aws, client, bodies, monkeypatch):
+    monkeypatch.setattr(aws_tools, "MULTIPART_THRESHOLD_BYTES", 1024)
+    monkeypatch.setattr(aws_tools, "UPLOAD_PART_BYTES", 1024)
+    started = request_uploads(client, input=len(bodies['input']), target=len(bodies['target']))
+    upload = started['uploads']['input']
+    assert upload['method'] == "MULTIPART" and len(upload['part_urls']) == -(-len(bodies['input']) // 1024)
+
+    parts = put_upload(aws, upload, bodies['input'])
+    put_upload(aws, started['uploads']['target'], bodies['target'])
+    job_id = started['job_id']
+    response = client.post(f"/jobs/{job_id}/finalize", json={})
+    assert response.status_code == 400 and "list its parts" in response.json()['detail']
+
+    assert client.post(f"/jobs/{job_id}/finalize", json={'parts': {'input': parts}}).status_code == 200
+    assert aws.s3.objects[upload['key']] == bodies['input']
+
+def test_failed_send_fails_a_fresh_job(aws, client, fasta_files):
+    aws.sqs.fail = True
+    with pytest.raises(ClientError):
+        client.post("/jobs/submit", files=fasta_files)
+    [row] = aws.jobs.items.values()
+    assert row["status"] == "FAILED"
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# test_metrics.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: The metrics registry's Prometheus text rendering, and what the middleware and /metrics
+report for real requests: latency by route template (never by raw path), body sizes in both
+directions, requests in flight and results cache lookups.
+
+"""
+
+from app.scripts import metrics
+from app.scripts.metrics import Counter, Gauge, Histogram
+
+import re
+import uuid
+import pytest
+
+def sample(text: str, name: str, **labels) -> float:
+    # Value of the one sample of 'name' whose labels include 'labels' (0 if there is none yet).
+    for line in text.splitlines():
+        match = re.fullmatch(rf"{re.escape(name)}(?:\{{(.*)\}})? (\S+)", line)
+        if match and all(f'{key}="{value}"' in (match.group(1) or "").split(",") for key, value in labels.items()):
+            return float(match.group(2))
+    return 0.0
+
+@pytest.fixture
+def registry(monkeypatch):
+    # Metrics built in a test register into a throwaway registry, not the app's.
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    return metrics.REGISTRY
+
+def test_counters_and_gauges_render_per_label_set(registry):
+    counter = Counter("esa_test_total", "Test counter.", ("outcome",))
+    counter.inc(outcome="hit")
+    counter.inc(2, outcome="hit")
+    counter.inc(outcome="miss")
+    gauge = Gauge("esa_test_live", "Test gauge.")
+    gauge.inc(3)
+    gauge.dec()
+
+    text = metrics.render_metrics()
+    assert "# TYPE esa_test_total counter" in text and "# TYPE esa_test_live gauge" in text
+    assert sample(text, "esa_test_total", outcome="hit") == 3 and sample(text, "esa_test_total", outcome="miss") == 1
+    assert sample(text, "esa_test_live") == 2
+
+def test_callback_gauges_are_sampled_at_scrape_time(registry):
+    entries = []
+    Gauge("esa_test_entries", "Test callback gauge.", callback=lambda: len(entries))
+    entries.extend(range(4))
+    assert sample(metrics.render_metrics(), "esa_test_entries") == 4
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = Histogram("esa_test_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, route="/x")
+
+    text = metrics.render_metrics()
+    assert sample(text, "esa_test_seconds_bucket", route="/x", le="0.1") == 2 # Bounds are inclusive.
+    assert sample(text, "esa_test_seconds_bucket", route="/x", le="1.0") == 3
+    assert sample(text, "esa_test_seconds_bucket", route="/x", le="+Inf") == 4
+    assert sample(text, "esa_test_seconds_count", route="/x") == 4
+    assert sample(text, "esa_test_seconds_sum", route="/x") == pytest.approx(3.65)
+
+def test_requests_are_labelled_by_route_template(client):
+    before = client.get("/metrics").text
+    job_ids = [str(uuid.uuid4()) for _ in range(2)]
+    for job_id in job_ids:
+        assert client.get(f"/results/{job_id}/frames/read_1").status_code == 404
+
+    after = client.get("/metrics").text
+    labels = {'method': "GET", 'route': "/results/{job_id}/frames/{input_name}", 'status': "404"}
+    assert sample(after, "esa_http_request_duration_seconds_count", **labels) - \
+        sample(before, "esa_http_request_duration_seconds_count", **labels) == 2
+    assert not any(job_id in after for job_id in job_ids)
+    assert sample(after, "esa_results_cache_requests_total", cache="results", result="miss") > \
+        sample(before, "esa_results_cache_requests_total", cache="results", result="miss")
+
+def test_body_sizes_and_in_flight_requests(client):
+    before = client.get("/metrics").text
+    response = client.post("/frames/single", json={"sequence": "ATGAAATTTGGGTAA" * 20, "direction": "FWD"})
+    assert response.status_code == 200
+
+    after = client.get("/metrics").text
+    labels = {'method': "POST", 'route': "/frames/single"}
+    assert sample(after, "esa_http_request_size_bytes_sum", **labels) - \
+        sample(before, "esa_http_request_size_bytes_sum", **labels) == len(response.request.content)
+    assert sample(after, "esa_http_response_size_bytes_sum", **labels) - \
+        sample(before, "esa_http_response_size_bytes_sum", **labels) == len(response.content)
+    assert sample(after, "esa_http_requests_in_flight") == 1 # Only the scrape itself.
+    assert client.get("/metrics").headers["content-type"].startswith("text/plain")
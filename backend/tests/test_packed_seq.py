@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# test_packed_seq.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: PackedRecords must give back exactly the sequences it was given -- whole, sliced or indexed,
+with N runs, IUPAC codes and lowercase kept as exception runs -- and frames generated from a packed
+record must match the ones generated from the plain string.
+
+"""
+
+from app.scripts.frame_retrieve import FrameInterner, generate_frames
+from app.scripts.packed_seq import *
+
+import random
+import pytest
+
+@pytest.fixture(scope="module")
+def records():
+    rng = random.Random(5)
+    records = {f"read_{i}": "".join(rng.choice("ACGT") for _ in range(rng.randint(0, 40))) for i in range(30)}
+    records.update({"n_run": "ACGT" + "N" * 9 + "TTGA", "mixed": "acgtRYNNnACGTK", "single": "G",
+                    "edges": "NACGTACGTN", "empty": ""})
+    return records
+
+def test_records_round_trip(records):
+    packed = PackedRecords.from_records(records.items())
+    assert list(packed) == list(records) and len(packed) == len(records)
+    assert {record_id: str(seq) for record_id, seq in packed.items()} == records
+    assert packed.total_bp == sum(len(seq) for seq in records.values())
+
+def test_slices_and_indexes_match_str(records):
+    packed = PackedRecords.from_records(records.items())
+    rng = random.Random(9)
+    for record_id, seq in records.items():
+        view = packed[record_id]
+        assert len(view) == len(seq)
+        for _ in range(20):
+            start, stop = rng.randint(-5, len(seq) + 5), rng.randint(-5, len(seq) + 5)
+            assert view[start:stop] == seq[start:stop]
+            assert view[start:stop:2] == seq[start:stop:2]
+        if seq:
+            assert view[0] == seq[0] and view[-1] == seq[-1]
+        with pytest.raises(IndexError):
+            view[len(seq)]
+
+def test_storage_is_two_bits_per_base():
+    packed = PackedRecords.from_records([("a", "ACGT" * 250), ("b", "ACGTN")])
+    assert len(packed._data) == 250 + 2 # Each record starts on a byte boundary.
+    assert len(packed._exc_starts) == 1
+
+def test_alphabet_normalizes_while_packing():
+    packed = PackedRecords.from_records([("r", "acgun")], alphabet="rna")
+    assert str(packed["r"]) == "ACGTN"
+    with pytest.raises(ValueError, match="Duplicate record ID 'r'"):
+        PackedRecords.from_records([("r", "ACGT"), ("r", "ACGT")])
+
+def test_digests_identify_equal_sequences(records):
+    packed = PackedRecords.from_records([*records.items(), ("n_run_copy", records["n_run"])])
+    assert packed["n_run"].digest() == packed["n_run_copy"].digest()
+    assert len({packed[record_id].digest() for record_id in records}) == len(set(records.values()))
+
+@pytest.mark.parametrize("windowed", [False, True])
+def test_frames_from_packed_records_match_plain(workload, windowed):
+    packed = PackedRecords.from_records(workload['reads'].items())
+    interner = FrameInterner()
+    for record_id, seq in workload['reads'].items():
+        expected = generate_frames(seq, "BOTH", compact=True, windowed=windowed)
+        assert generate_frames(packed[record_id], "BOTH", compact=True, windowed=windowed) == expected
+        assert interner.generate(packed[record_id], "BOTH", compact=True) == \
+               generate_frames(seq, "BOTH", compact=True)
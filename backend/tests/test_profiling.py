@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# test_profiling.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Stage timing spans: how spans aggregate under a bound StageTimer (and do nothing without
+one), that they follow work onto worker threads, and that a worker job stores its breakdown (and a
+sampled cProfile dump) with the job, even when the job fails.
+
+"""
+
+from app.scripts import profiling
+from app.scripts.profiling import *
+
+import asyncio
+import json
+import pstats
+import pytest
+
+def test_spans_without_a_timer_are_no_ops():
+    assert current_timer.get() is None
+    with span("anything"):
+        pass
+    assert current_timer.get() is None
+
+def test_spans_aggregate_calls_and_time_per_stage():
+    with stage_timer() as timer:
+        for _ in range(3):
+            with span("align"):
+                with span("lca"):
+                    time.sleep(0.001)
+    assert current_timer.get() is None # The timer is unbound again on exit.
+
+    summary = timer.summary()
+    assert summary['stages']['align']['calls'] == 3 and summary['stages']['lca']['calls'] == 3
+    assert summary['stages']['align']['seconds'] >= summary['stages']['lca']['seconds'] >= 0.003
+    assert list(summary['stages']) == ["align", "lca"] # Slowest first.
+    assert summary['total_seconds'] >= summary['stages']['align']['seconds']
+
+def test_spans_follow_work_onto_threads():
+    def offloaded():
+        with span("threaded"):
+            pass
+
+    async def job():
+        with stage_timer() as timer:
+            await asyncio.gather(*(asyncio.to_thread(offloaded) for _ in range(4)))
+        return timer
+
+    assert asyncio.run(job()).summary()['stages']['threaded']['calls'] == 4
+
+def test_profiler_sampling(tmp_path):
+    assert maybe_start_profiler(0.0) is None
+    profiler = maybe_start_profiler(1.0)
+    assert profiler is not None
+    sum(range(1000))
+    dumped = dump_profile(profiler, str(tmp_path / "job.prof"))
+    assert dumped and pstats.Stats(str(tmp_path / "job.prof")).total_calls > 0
+
+@pytest.fixture
+def submitted(aws, client, fasta_files) -> dict:
+    assert client.post("/jobs/submit", files=fasta_files).status_code == 200
+    return aws.sqs.messages[0]
+
+def test_worker_job_stores_its_stage_breakdown(aws, submitted, run_worker, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    assert run_worker(submitted)['status'] == "COMPLETED"
+
+    row = aws.jobs.items[submitted['body']['job_id']]
+    timings = json.loads(row['stage_timings'])
+    assert {"s3_download", "generate_frames", "align", "lca", "json_serialize", "artifact_upload"} <= set(timings['stages'])
+    assert timings['queue_wait_seconds'] >= 0
+    assert json.loads(aws.s3.objects[row['timings_key']]) == timings
+    assert aws.s3.objects[row['profile_key']] # Sampled at rate 1.0.
+
+def test_failed_jobs_keep_their_timings(aws, submitted, run_worker):
+    del aws.s3.objects[submitted['body']['input_key']]
+    assert run_worker(submitted)['status'] == "RETRYING"
+
+    row = aws.jobs.items[submitted['body']['job_id']]
+    assert row['status'] == "RETRYING" and "s3_download" in json.loads(row['stage_timings'])['stages']
+    assert json.loads(aws.s3.objects[row['timings_key']]) == json.loads(row['stage_timings'])
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# test_result_formats.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Result tables written as Parquet must keep the CSV's rows while typing them: numeric
+scores and LCAs (with 'N/A' as null) and dictionary-encoded text columns. Saved artifacts land under
+the user's prefix in every requested format, and each gets a download link.
+
+"""
+
+from app.scripts.aws_tools import generate_artifact_links
+from app.scripts.utils import *
+from benchmarks.synthetic import to_fasta
+from io import StringIO
+from worker_handler import align_fasta_stream
+
+import pandas as pd
+import pytest
+
+@pytest.fixture(scope="module")
+def tables(workload):
+    _, top_hits, _, results_df, _ = align_fasta_stream(StringIO(to_fasta(workload['reads'])), workload['targets'],
+                                                       "BOTH", 0.98)
+    return results_df, top_hits
+
+def read_parquet(body: bytes) -> pd.DataFrame:
+    return pd.read_parquet(BytesIO(body), engine="fastparquet")
+
+def test_parquet_keeps_rows_and_types_columns(tables):
+    results_df, top_hits = tables
+    results_df = data_export(results_df, "extra", "BOTH", "N/A", "N/A", "N/A", "No ORFs!")
+    typed = read_parquet(serialize_table(results_df, "parquet"))
+
+    assert list(typed["Name"]) == list(results_df["Name"])
+    assert typed["Identity-Score"].dtype == "float64" and typed["Identity-Score"].isna().iloc[-1]
+    assert list(typed["Identity-Score"].iloc[:-1]) == [float(score) for score in results_df["Identity-Score"].iloc[:-1]]
+    assert all(typed[column].dtype == "category" for column in ("Target", "Direction", "Notes"))
+
+    hits = read_parquet(serialize_table(build_target_map(top_hits), "parquet"))
+    assert str(hits["LCA"].dtype) == "Int32" and len(hits) == sum(len(h) for _, h in top_hits.expanded_items())
+
+def test_csv_is_unchanged(tables):
+    results_df, _ = tables
+    assert serialize_table(results_df, "csv") == results_df.to_csv(index=False).encode("utf-8")
+    with pytest.raises(ValueError, match="Output format must be one of"):
+        artifact_formats("xlsx")
+
+@pytest.mark.parametrize("output_format, formats", [("csv", ["csv"]), ("parquet", ["parquet"]),
+                                                    ("both", ["csv", "parquet"])])
+def test_saved_artifacts_cover_each_format(aws, tables, output_format, formats):
+    results_df, top_hits = tables
+    keys = save_alignment_artifacts(results_df, top_hits, 12, aws.s3, "bucket", db=None, output_format=output_format)
+
+    assert set(keys) == {"orf_mappings", "top_hits"} and all(list(by_format) == formats for by_format in keys.values())
+    assert set(aws.s3.objects) == {key for by_format in keys.values() for key in by_format.values()}
+    assert all(key.startswith("users/12/results/") for key in aws.s3.objects)
+    if "parquet" in formats:
+        assert len(read_parquet(aws.s3.objects[keys["orf_mappings"]["parquet"]])) == len(results_df)
+
+    links = generate_artifact_links(keys)
+    assert links["orf_mappings"] == links[f"orf_mappings_{formats[0]}"]
+    assert set(links) == {"orf_mappings", "top_hits"} | {f"{table}_{fmt}" for table in keys for fmt in formats}
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# test_result_pages.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Cursor pagination and re-thresholding of inline results, from both entry points that
+cache them: /process/multi and a paged /align/multi.
+
+"""
+
+import pytest
+
+def _all_pages(client, job_id: str, table: str, cursor: str = None, **params) -> list:
+    items = []
+    while True:
+        query = {**params, **({'cursor': cursor} if cursor else {})}
+        page = client.get(f"/results/{job_id}/{table}", params=query).json()
+        items.extend(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return items
+
+@pytest.fixture
+def processed(client, fasta_files):
+    response = client.post("/process/multi", files=fasta_files, data={"page_size": "5"})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.fixture
+def aligned_paged(client, workload):
+    frames = client.post("/frames/multi", json={"sequences": workload['reads'], "direction": "BOTH"}).json()
+    response = client.post("/align/multi", json={"query_frames": frames, "targets": workload['targets'],
+                                                 "threshold": 0.98, "page_size": 5})
+    assert response.status_code == 200
+    return response.json()
+
+@pytest.mark.parametrize("entry", ["processed", "aligned_paged"])
+def test_record_pages_cover_every_record_once(request, client, workload, entry):
+    job = request.getfixturevalue(entry)
+    assert len(job['alignment_results']) == 5 and job['total_records'] == len(workload['reads'])
+
+    # The inline response is the first page; its cursor continues the same query.
+    rest = _all_pages(client, job['job_id'], "records", cursor=job['next_cursor'], limit=5)
+    assert list(job['alignment_results']) + [item['record'] for item in rest] == list(workload['reads'])
+
+@pytest.mark.parametrize("entry", ["processed", "aligned_paged"])
+def test_hit_pages_are_sorted_and_filtered(request, client, entry):
+    job_id = request.getfixturevalue(entry)['job_id']
+    hits = _all_pages(client, job_id, "hits", limit=3)
+    assert hits
+    identities = [hit['identity_pct'] for hit in hits]
+    assert identities == sorted(identities, reverse=True)
+
+    floor = identities[len(identities) // 2]
+    filtered = _all_pages(client, job_id, "hits", limit=3, min_identity=floor)
+    assert filtered == [hit for hit in hits if hit['identity_pct'] >= floor]
+
+def test_cursor_is_bound_to_its_query(client, processed):
+    response = client.get(f"/results/{processed['job_id']}/records",
+                          params={'cursor': processed['next_cursor'], 'sort': "identity"})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("entry", ["processed", "aligned_paged"])
+def test_rethreshold_matches_a_fresh_run(request, client, workload, fasta_files, entry):
+    job_id = request.getfixturevalue(entry)['job_id']
+    response = client.post(f"/results/{job_id}/rethreshold", json={"threshold": 0.9})
+    assert response.status_code == 200
+
+    fresh = client.post("/process/multi", files=fasta_files, data={"align_threshold": "0.9"}).json()
+    assert response.json()['alignment_results'] == fresh['alignment_results']
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# test_rethreshold_jobs.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Re-thresholding a queued job: the API only queues it, the worker re-runs the picks from
+the source job's stored match vectors (targets through the warm cache), and the new job's results are
+paged like any other queued job's.
+
+"""
+
+import pytest
+import worker_handler
+
+def all_records(client, job_id: str) -> dict:
+    records, cursor = {}, None
+    while True:
+        page = client.get(f"/results/{job_id}/records", params={'limit': 4, **({'cursor': cursor} if cursor else {})})
+        assert page.status_code == 200
+        records.update({item['record']: item['result'] for item in page.json()['items']})
+        cursor = page.json()['next_cursor']
+        if cursor is None:
+            return records
+
+@pytest.fixture
+def finished_job(aws, client, fasta_files, run_worker) -> str:
+    response = client.post("/jobs/submit", files=fasta_files, data={"align_threshold": "0.98"})
+    assert response.status_code == 200
+    [message] = aws.sqs.messages
+    aws.sqs.messages.clear()
+    assert run_worker(message)['status'] == "COMPLETED"
+    return message['body']['job_id']
+
+def test_queued_rethreshold_runs_on_the_worker(aws, client, fasta_files, finished_job, run_worker, monkeypatch):
+    response = client.post(f"/results/{finished_job}/rethreshold", json={"threshold": 0.9})
+    assert response.status_code == 202
+    queued = response.json()
+    assert queued['status'] == "PENDING" and queued['rethreshold_of'] == finished_job
+
+    [message] = aws.sqs.messages
+    assert message['body']['rethreshold_of'] == finished_job and message['body']['input_key'] is None
+
+    # The worker maps the panel through the warm cache instead of re-parsing the target FASTA.
+    fetched = []
+    fetch_targets = worker_handler.fetch_targets
+    monkeypatch.setattr(worker_handler, "fetch_targets", lambda *args: fetched.append(args) or fetch_targets(*args))
+    assert run_worker(message)['status'] == "COMPLETED"
+    row = aws.jobs.items[queued['job_id']]
+    assert fetched and row['rethreshold_of'] == finished_job
+    assert row['frames_key'] == aws.jobs.items[finished_job]['frames_key']
+
+    status = client.get(f"/jobs/status/{queued['job_id']}").json()
+    assert status['status'] == "COMPLETED" and status['rethreshold_of'] == finished_job
+
+    fresh = client.post("/process/multi", files=fasta_files, data={"align_threshold": "0.9"}).json()
+    assert all_records(client, queued['job_id']) == fresh['alignment_results']
+
+def test_rethreshold_of_an_unfinished_job_is_refused(aws, client, fasta_files):
+    client.post("/jobs/submit", files=fasta_files)
+    job_id = aws.sqs.messages[0]['body']['job_id']
+    assert client.post(f"/results/{job_id}/rethreshold", json={"threshold": 0.9}).status_code == 404
+    assert len(aws.sqs.messages) == 1
+
+def test_inline_rethreshold_is_cached_and_paged(client, fasta_files):
+    job_id = client.post("/process/multi", files=fasta_files, data={"page_size": "5"}).json()['job_id']
+    response = client.post(f"/results/{job_id}/rethreshold", json={"threshold": 0.9, "page_size": 4})
+    assert response.status_code == 200
+    page = response.json()
+    assert len(page['alignment_results']) == 4 and page['next_cursor'] and page['rethreshold_of'] == job_id
+
+    fresh = client.post("/process/multi", files=fasta_files, data={"align_threshold": "0.9"}).json()
+    assert all_records(client, page['job_id']) == fresh['alignment_results']
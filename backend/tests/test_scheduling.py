@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# test_scheduling.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Size-class lanes and per-user fair share, against in-memory DynamoDB/SQS fakes. Jobs are
+routed by estimated cost, an account past its share is demoted a lane and delayed, expired or released
+leases stop counting, and only a job's first start moves its lane's queue. Scheduling state lives in
+its own table, and /jobs/status only ever serves whitelisted fields of real job rows.
+
+"""
+
+from app.scripts import scheduling
+from app.scripts.scheduling import *
+from botocore.exceptions import ClientError
+from types import SimpleNamespace
+
+import uuid
+import pytest
+
+def queue(estimated_seconds: float = 60.0, user_id=None) -> tuple:
+    job_id = str(uuid.uuid4())
+    return job_id, schedule_job(job_id, f"tmp/{job_id}/input.fasta", f"tmp/{job_id}/target.fasta", "BOTH", user_id,
+                                estimate={'estimated_seconds': estimated_seconds})
+
+def leases(aws, user_id) -> dict:
+    return aws.scheduling.items.get(f"user#{user_id}", {}).get("active_leases", {})
+
+@pytest.mark.parametrize("seconds, size_class", [(0.5, "interactive"), (20, "interactive"), (21, "standard"),
+                                                 (240, "standard"), (10000, "bulk")])
+def test_jobs_are_classified_by_estimate(seconds, size_class):
+    assert classify_job(seconds) == size_class
+    assert demote("interactive") == "standard" and demote("bulk") == "bulk"
+
+def test_scheduled_job_is_pending_and_queued_in_its_lane(aws):
+    job_id, placement = queue(5.0)
+    assert placement == {'size_class': "interactive", 'queue_ticket': 1, 'delay_seconds': 0}
+
+    row = aws.jobs.items[job_id]
+    assert row["status"] == "PENDING" and row["size_class"] == "interactive" and row["queue_ticket"] == 1
+    [message] = aws.sqs.messages
+    assert message["body"]["job_id"] == job_id and message["body"]["size_class"] == "interactive"
+    assert message["queue_url"] == LANE_QUEUE_URLS["interactive"]
+    assert set(aws.scheduling.items) == {"lane#interactive"} and set(aws.jobs.items) == {job_id}
+
+def test_fair_share_demotes_and_delays_extra_jobs(aws):
+    placements = [queue(60.0, user_id=1)[1] for _ in range(FAIR_SHARE_ACTIVE_JOBS + 2)]
+    assert [p['size_class'] for p in placements] == ["standard"] * FAIR_SHARE_ACTIVE_JOBS + ["bulk"] * 2
+    assert [p['delay_seconds'] for p in placements[FAIR_SHARE_ACTIVE_JOBS:]] == [FAIR_SHARE_DELAY_SECONDS,
+                                                                                2 * FAIR_SHARE_DELAY_SECONDS]
+    assert len(leases(aws, 1)) == FAIR_SHARE_ACTIVE_JOBS + 2
+
+    # Other accounts keep their own share.
+    assert queue(60.0, user_id=2)[1]['size_class'] == "standard"
+
+def test_released_and_expired_leases_stop_counting(aws, monkeypatch):
+    jobs = [queue(60.0, user_id=1)[0] for _ in range(FAIR_SHARE_ACTIVE_JOBS)]
+    release_user_slot(1, jobs[0])
+    assert set(leases(aws, 1)) == set(jobs[1:])
+    assert queue(60.0, user_id=1)[1]['size_class'] == "standard"
+
+    # A lease nobody renewed (e.g. a job redriven to the DLQ) lapses after FAIR_SHARE_LEASE_SECONDS.
+    later = scheduling.time.time() + FAIR_SHARE_LEASE_SECONDS + 1
+    monkeypatch.setattr(scheduling, "time", SimpleNamespace(time=lambda: later))
+    job_id, placement = queue(60.0, user_id=1)
+    assert placement == {'size_class': "standard", 'queue_ticket': FAIR_SHARE_ACTIVE_JOBS + 2, 'delay_seconds': 0}
+    assert set(leases(aws, 1)) == {job_id}
+
+def test_failed_enqueue_releases_the_slot(aws):
+    aws.sqs.fail = True
+    with pytest.raises(ClientError):
+        queue(60.0, user_id=1)
+    assert leases(aws, 1) == {}
+
+def test_only_the_first_start_moves_the_queue(aws):
+    first, _ = queue(60.0)
+    second, _ = queue(60.0)
+    assert get_queue_position(aws.jobs.items[second]) == 1
+
+    mark_job_started(first, "standard")
+    assert aws.jobs.items[first]["status"] == "RUNNING"
+    assert get_queue_position(aws.jobs.items[first]) is None and get_queue_position(aws.jobs.items[second]) == 0
+
+    # Redeliveries (a lost RUNNING, or a RETRYING job) run again without counting as a new start.
+    mark_job_started(first, "standard")
+    aws.jobs.items[first]["status"] = "RETRYING"
+    mark_job_started(first, "standard")
+    assert aws.jobs.items[first]["status"] == "RUNNING"
+    assert aws.scheduling.items["lane#standard"]["started"] == 1
+
+def test_start_renews_a_held_lease_only(aws, monkeypatch):
+    job_id, _ = queue(60.0, user_id=1)
+    issued = leases(aws, 1)[job_id]
+    later = scheduling.time.time() + 600
+    monkeypatch.setattr(scheduling, "time", SimpleNamespace(time=lambda: later))
+
+    mark_job_started(job_id, "standard", user_id=1)
+    assert leases(aws, 1)[job_id] > issued
+
+    release_user_slot(1, job_id)
+    aws.jobs.items[job_id]["status"] = "PENDING"
+    mark_job_started(job_id, "standard", user_id=1)
+    assert job_id not in leases(aws, 1)
+
+def test_status_never_serves_scheduling_state(aws, client):
+    job_id, _ = queue(60.0, user_id=12)
+    for key in ("user#12", "lane#standard"):
+        assert client.get(f"/jobs/status/{key.replace('#', '%23')}").json() == {'job_id': key, 'status': "UNKNOWN"}
+        assert client.get(f"/results/{key.replace('#', '%23')}/records").status_code == 404
+
+    status = client.get(f"/jobs/status/{job_id}").json()
+    assert status == {'job_id': job_id, 'status': "PENDING", 'size_class': "standard", 'estimated_seconds': 60.0,
+                      'queue_position': 0}
+
+def test_status_hides_upload_fields(aws, client):
+    upload = client.post("/jobs/uploads", json={'input': {'filename': "reads.fasta", 'size': 100}}).json()
+    assert aws.jobs.items[upload['job_id']]["upload_keys"]
+    assert client.get(f"/jobs/status/{upload['job_id']}").json() == {'job_id': upload['job_id'],
+                                                                      'status': "AWAITING_UPLOAD"}
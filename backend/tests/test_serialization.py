@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+# test_serialization.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: orjson payloads must decode to what the json module would produce (DynamoDB Decimals and
+numpy scalars included), and large JSON responses must be compressed only for clients that accept it.
+
+"""
+
+from app.scripts.serialization import *
+from decimal import Decimal
+
+import json
+import numpy as np
+
+def test_dumps_json_matches_stdlib_json():
+    payload = {'threshold': Decimal("0.98"), 'top_k': Decimal("5"), 'lca': np.int64(42),
+               'score': np.float64(97.5), 'hits': {1: [95.0, 12]}, 'targets': {"t1"}}
+    assert loads_json(dumps_json(payload)) == {'threshold': 0.98, 'top_k': 5, 'lca': 42, 'score': 97.5,
+                                               'hits': {"1": [95.0, 12]}, 'targets': ["t1"]}
+    assert loads_json(dumps_json({'a': [1, "b"]})) == json.loads(json.dumps({'a': [1, "b"]}))
+
+def test_negotiate_encoding_honours_q_values():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*") in ("br", "gzip")
+    assert negotiate_encoding("br;q=0.1, gzip;q=0.9") == "gzip"
+
+def test_large_responses_are_compressed_when_accepted(client, workload):
+    request = {"sequences": workload['reads'], "direction": "BOTH"}
+    plain = client.post("/frames/multi", json=request, headers={"Accept-Encoding": "identity"})
+    compressed = client.post("/frames/multi", json=request, headers={"Accept-Encoding": "gzip"})
+
+    assert len(plain.content) >= COMPRESSION_MIN_BYTES and "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.json() == plain.json()
+
+def test_small_responses_are_left_alone(client):
+    response = client.post("/frames/single", json={"sequence": "ATGAAATAA", "direction": "FWD"},
+                           headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200 and "content-encoding" not in response.headers
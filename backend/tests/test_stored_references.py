@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+# test_stored_references.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: /jobs/submit against a user's stored FastaFiles: the worker is handed the files' existing
+S3 keys (nothing is copied under tmp/), the reference panel is read through the warm cache, and ids
+are only honoured for their logged-in owner.
+
+"""
+
+from app import models
+from app.database import SessionLocal
+from app.routers.auth import get_optional_user
+from benchmarks.synthetic import to_fasta
+
+import uuid
+import pytest
+
+def stored_file(aws, owner_id: int, file_type: str, body: str = None) -> int:
+    # A FastaFile row as /files/upload leaves it, with its object in S3 unless 'body' is None.
+    s3_key = f"users/{owner_id}/{file_type}/{uuid.uuid4()}_{file_type}.fasta"
+    if body is not None:
+        aws.s3.put_object(Bucket="bucket", Key=s3_key, Body=body)
+    with SessionLocal() as db:
+        db_file = models.FastaFile(filename=f"{file_type}.fasta", s3_key=s3_key, owner_id=owner_id, type=file_type)
+        db.add(db_file)
+        db.commit()
+        return db_file.id
+
+@pytest.fixture
+def users() -> list:
+    with SessionLocal() as db:
+        accounts = [models.User(username=f"user_{uuid.uuid4().hex}", hashed_password="x") for _ in range(2)]
+        db.add_all(accounts)
+        db.commit()
+        return [account.id for account in accounts]
+
+@pytest.fixture
+def login(client):
+    # Logs a user in for the requests that follow, as a valid bearer token would.
+    def log_in(user_id: int):
+        client.app.dependency_overrides[get_optional_user] = lambda: SessionLocal().get(models.User, user_id)
+
+    yield log_in
+    client.app.dependency_overrides.pop(get_optional_user, None)
+
+@pytest.fixture
+def stored(aws, users, workload) -> dict:
+    return {'input_file_id': stored_file(aws, users[0], "input", to_fasta(workload['reads'])),
+            'target_file_id': stored_file(aws, users[0], "reference", to_fasta(workload['targets']))}
+
+def file_key(file_id: int) -> str:
+    with SessionLocal() as db:
+        return db.get(models.FastaFile, file_id).s3_key
+
+def test_stored_files_are_queued_by_their_existing_keys(aws, client, login, users, stored, run_worker):
+    login(users[0])
+    objects_before = set(aws.s3.objects)
+    response = client.post("/jobs/submit", data=stored)
+    assert response.status_code == 200
+
+    [message] = aws.sqs.messages
+    job_id = message['body']['job_id']
+    assert message['body']['input_key'] == file_key(stored['input_file_id'])
+    assert message['body']['target_key'] == file_key(stored['target_file_id'])
+    assert message['body']['user_id'] == users[0]
+    assert not any(key.startswith(f"tmp/{job_id}/") for key in set(aws.s3.objects) - objects_before)
+
+    assert run_worker(message)['status'] == "COMPLETED"
+    assert aws.jobs.items[job_id]['alignment_key'] in aws.s3.objects
+
+def test_stored_files_align_like_uploads(aws, client, login, users, stored, fasta_files, run_worker):
+    login(users[0])
+    client.post("/jobs/submit", data=stored)
+    client.post("/jobs/submit", files=fasta_files)
+    results = []
+    for message in aws.sqs.messages:
+        assert run_worker(message)['status'] == "COMPLETED"
+        results.append(aws.s3.objects[aws.jobs.items[message['body']['job_id']]['alignment_key']])
+    assert results[0] == results[1]
+
+def test_reference_panel_is_read_once_across_submissions(aws, client, login, users, stored, monkeypatch):
+    login(users[0])
+    target_key, reads = file_key(stored['target_file_id']), []
+    get_object = aws.s3.get_object
+
+    def counted(Bucket, Key, Range=None):
+        reads.append(Key)
+        return get_object(Bucket, Key, Range)
+
+    monkeypatch.setattr(aws.s3, "get_object", counted)
+    for _ in range(2):
+        assert client.post("/jobs/submit", data=stored).status_code == 200
+    assert reads.count(target_key) == 1 # The second submission is served from the warm cache.
+
+def test_mixed_sides_only_copy_the_upload(aws, client, login, users, stored, fasta_files):
+    login(users[0])
+    response = client.post("/jobs/submit", data={'target_file_id': stored['target_file_id']},
+                           files={'input_fasta': fasta_files['input_fasta']})
+    job_id = response.json()['job_id']
+    [message] = aws.sqs.messages
+    assert message['body']['input_key'] == f"tmp/{job_id}/input.fasta"
+    assert message['body']['target_key'] == file_key(stored['target_file_id'])
+
+def test_file_ids_need_a_login(aws, client, stored):
+    response = client.post("/jobs/submit", data=stored)
+    assert response.status_code == 401 and not aws.sqs.messages
+
+def test_other_users_files_are_refused(aws, client, login, users, stored):
+    login(users[1])
+    assert client.post("/jobs/submit", data=stored).status_code == 403
+    assert client.post("/jobs/submit", data={**stored, 'input_file_id': 10 ** 9}).status_code == 404
+    assert not aws.sqs.messages
+
+@pytest.mark.parametrize("both", [False, True])
+def test_each_side_needs_exactly_one_source(aws, client, login, users, stored, fasta_files, both):
+    # The input side is given neither as an upload nor an id, or as both.
+    login(users[0])
+    data, files = {'target_file_id': stored['target_file_id']}, None
+    if both:
+        data['input_file_id'], files = stored['input_file_id'], {'input_fasta': fasta_files['input_fasta']}
+    response = client.post("/jobs/submit", data=data, files=files)
+    assert response.status_code == 400 and "input_fasta" in response.json()['detail']
+
+def test_missing_objects_are_reported(aws, client, login, users, stored):
+    login(users[0])
+    missing = stored_file(aws, users[0], "reference")
+    response = client.post("/jobs/submit", data={**stored, 'target_file_id': missing})
+    assert response.status_code == 404 and not aws.sqs.messages
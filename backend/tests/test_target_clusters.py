@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# test_target_clusters.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Collapsing byte-identical targets must leave alignment results unchanged, copies included,
+and near-identical variants must join the longest representative they resemble.
+
+"""
+
+from app.scripts.build_alignment import *
+from app.scripts.frame_retrieve import generate_frames
+from app.scripts.target_clusters import cluster_targets
+
+import random
+import pandas as pd
+import pytest
+
+def run_alignment(reads: dict, targets: dict, target_clusters=None) -> tuple:
+    top_hits = TopHits(3)
+    results_df = pd.DataFrame(columns=["Name", "Target", "Identity-Score", "Direction", "Most-Likely-ORF", "Notes"])
+    results = {}
+    for name, seq in reads.items():
+        orfs, refs = record_orf_refs(name, generate_frames(seq, "BOTH", compact=True), top_hits)
+        if orfs:
+            results_df, results[name] = batch_alignment_cycle("BOTH", name, orfs, targets, top_hits, results_df,
+                                                              0.98, refs, exact_top_hits=True,
+                                                              target_clusters=target_clusters)
+    return results, top_hits.to_json()
+
+@pytest.fixture(scope="module")
+def padded_panel(workload):
+    # Every target followed by a byte-identical copy under its own id.
+    panel = {}
+    for target_id, seq in workload['targets'].items():
+        panel[target_id], panel[f"{target_id}_copy"] = seq, seq
+    return panel
+
+def test_exact_copies_collapse_without_changing_results(workload, padded_panel):
+    clusters = cluster_targets(padded_panel, identity=1.0)
+    assert clusters.summary()['exact_duplicates'] == len(workload['targets'])
+    assert clusters.summary()['targets'] == len(padded_panel)
+    assert all(target_id in workload['targets'] for target_id in clusters.representatives)
+    assert run_alignment(workload['reads'], padded_panel, clusters) == run_alignment(workload['reads'], padded_panel)
+
+def test_near_identical_variants_join_longest_representative():
+    rng = random.Random(3)
+    base = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(400))
+    variant = base[:200] + ("A" if base[200] != "A" else "C") + base[201:]
+    unrelated = "".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(300))
+    clusters = cluster_targets({"variant": variant, "unrelated": unrelated, "base": base + "MK",
+                                "variant_copy": variant})
+    assert clusters.representatives == ["unrelated", "base"]
+    assert clusters.near == {"unrelated": [], "base": ["variant"]}
+    assert clusters.copies == {"variant": ["variant_copy"]}
+    assert clusters.summary()['near_duplicates'] == 1 and clusters.summary()['targets'] == 4
+    assert clusters.should_expand(95, 100) and not clusters.should_expand(80, 100)
+    assert not clusters.should_expand(0, 0)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# test_target_library.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Compiled target libraries round-trip the panel they were built from, and their k-mer
+index agrees with a brute-force count (soft-masked residues included). Panels the index can't encode
+are rejected before they reach it.
+
+"""
+
+from app.scripts.target_library import *
+from app.scripts.target_library import _kmer_codes
+from app.scripts.validation import validate_target_panel
+
+import pytest
+
+def brute_force_shared(targets: dict, query: str, k: int) -> dict:
+    def kmers(seq: str) -> set:
+        seq = seq.upper()
+        return {seq[i:i + k] for i in range(len(seq) - k + 1) if all(residue in ALPHABET for residue in seq[i:i + k])}
+
+    query_kmers = kmers(query)
+    shared = {target_id: len(kmers(seq) & query_kmers) for target_id, seq in targets.items()}
+    return {target_id: count for target_id, count in shared.items() if count}
+
+@pytest.fixture
+def library(workload, tmp_path):
+    targets = {**workload['targets'], "masked": workload['targets']['target_1'][:30].lower() + "XXBZ*"}
+    opened = TargetLibrary(write_target_library(targets, str(tmp_path / "panel.esalib")))
+    yield targets, opened
+    opened.close()
+
+def test_library_round_trips_the_panel(library):
+    targets, opened = library
+    assert list(opened) == list(targets)
+    assert {target_id: opened[target_id] for target_id in opened} == targets
+    assert opened.content_hash == content_hash(targets)
+    assert opened.residue_count() == sum(len(seq) for seq in targets.values())
+
+def test_shared_kmers_match_brute_force(library):
+    targets, opened = library
+    for query in (targets['target_2'][5:40], targets['target_1'][:20], "MKV*LLA"):
+        assert opened.shared_kmers(query) == brute_force_shared(targets, query, opened.k)
+    assert opened.shared_kmers(targets['target_1'][:20])['masked'] > 0 # Lowercase residues are indexed.
+
+def test_distinct_kmers_match_per_target_codes(workload):
+    seqs = list(workload['targets'].values()) + ["mkvla", "AB"]
+    owners, codes = distinct_kmers(seqs, 3)
+    for i, seq in enumerate(seqs):
+        expected = _kmer_codes(np.frombuffer(seq.encode("ascii"), dtype=np.uint8), 3)
+        assert codes[owners == i].tolist() == expected.tolist()
+
+def test_non_ascii_panels_are_rejected():
+    with pytest.raises(ValueError, match="Target 'bad': invalid residue 'é' at position 3"):
+        validate_target_panel({"ok": "MKV", "bad": "MKéV"})
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# test_top_hits.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: TopHits keeps the K best ORFs per target as references into registered frames: K is
+clamped and honoured, ties go to the earlier ORF whatever the push order, and the artifact emits each
+ORF once for every target that points at it.
+
+"""
+
+from app.scripts.build_alignment import *
+from app.scripts.frame_retrieve import generate_frames
+
+import itertools
+import pytest
+
+@pytest.fixture
+def hits() -> TopHits:
+    top_hits = TopHits(k=2)
+    top_hits.register_frame("read_1", "Frame #1 (FWD)", "AMKVLL-MQQ")
+    top_hits.register_frame("read_2", "Frame #1 (FWD)", "MRRS")
+    return top_hits
+
+def test_k_is_clamped():
+    assert TopHits(0).k == 1 and TopHits(10 ** 6).k == MAX_TOP_K and TopHits().k == DEFAULT_TOP_K
+
+def test_only_the_k_best_are_kept(hits):
+    orf = ("read_1", "Frame #1 (FWD)", 1, 6)
+    for rank, identity in enumerate([70.0, 95.0, 80.0, 60.0]):
+        hits.push("target_1", identity, 10, orf, rank=rank)
+    assert [identity for identity, _, _ in hits.sorted_hits("target_1")] == [95.0, 80.0]
+    assert hits.sorted_hits("missing") is None
+
+@pytest.mark.parametrize("order", list(itertools.permutations(range(3))))
+def test_identity_ties_go_to_the_earlier_orf(order):
+    top_hits = TopHits(k=2)
+    top_hits.register_frame("read_1", "f", "MAAMBBMCC")
+    refs = [("read_1", "f", 0, 3), ("read_1", "f", 3, 6), ("read_1", "f", 6, 9)]
+    for rank in order:
+        top_hits.push("target_1", 90.0, 5, refs[rank], rank=rank)
+    assert [ref for _, _, ref in top_hits.sorted_hits("target_1")] == refs[:2]
+
+def test_could_enter_uses_the_same_ordering(hits):
+    orf = ("read_1", "Frame #1 (FWD)", 1, 6)
+    assert hits.could_enter("target_1", 50.0, rank=9) # Empty heap.
+    hits.push("target_1", 90.0, 10, orf, rank=0)
+    hits.push("target_1", 80.0, 10, orf, rank=1)
+    assert not hits.could_enter("target_1", 80.0, rank=2) # A tie with an earlier ORF stays out.
+    assert hits.could_enter("target_1", 80.0, rank=0) and hits.could_enter("target_1", 85.0, rank=5)
+
+def test_artifact_emits_each_orf_once(hits):
+    shared, other = ("read_1", "Frame #1 (FWD)", 1, 6), ("read_2", "Frame #1 (FWD)", 0, 4)
+    hits.push("target_1", 90.0, 10, shared, rank=0)
+    hits.push("target_2", 99.0, 12, shared, rank=0)
+    hits.push("target_2", 70.0, 3, other, rank=1)
+
+    artifact = hits.to_json()
+    assert artifact['k'] == 2 and len(artifact['orfs']) == 2
+    [(_, _, shared_id)] = artifact['hits']['target_1']
+    assert artifact['orfs'][shared_id] == {'record': "read_1", 'frame': "Frame #1 (FWD)", 'start': 1, 'end': 6,
+                                           'sequence': "MKVLL"}
+    assert [row[0] for row in artifact['hits']['target_2']] == [99.0, 70.0]
+    assert hits.expanded_hits("target_2") == [[99.0, 12, "MKVLL", "read_1"], [70.0, 3, "MRRS", "read_2"]]
+
+def test_legacy_frames_resolve_to_the_same_refs(workload):
+    for name, seq in workload['reads'].items():
+        compact_orfs, compact_refs = record_orf_refs(name, generate_frames(seq, "BOTH", compact=True), TopHits())
+        legacy_orfs, legacy_refs = record_orf_refs(name, generate_frames(seq, "BOTH"), TopHits())
+        assert (legacy_orfs, legacy_refs) == (compact_orfs, compact_refs)
+
+def test_hand_edited_orfs_are_registered_standalone():
+    top_hits = TopHits()
+    frame = {'aa_seq': "MAAA-MCCC", 'orf_set': ["MAAA", "MWWW", "MCCC"]}
+    orfs, refs = record_orf_refs("read_1", {"f": frame}, top_hits)
+    assert orfs == ["MAAA", "MWWW", "MCCC"] # Input order, which is what ranks follow.
+    assert refs[0] == ("read_1", "f", 0, 4) and refs[2] == ("read_1", "f", 5, 9)
+    assert [top_hits.orf_sequence(ref) for ref in refs] == orfs
+
+def test_requests_choose_k(client, workload):
+    frames = client.post("/frames/multi", json={"sequences": workload['reads'], "compact": True}).json()
+    narrow, wide = (client.post("/align/multi", json={"query_frames": frames, "targets": workload['targets'],
+                                                      "top_k": top_k}).json()['top_hits'] for top_k in (1, 5))
+    assert narrow['k'] == 1 and all(len(rows) == 1 for rows in narrow['hits'].values())
+    for target, rows in narrow['hits'].items():
+        best = wide['hits'][target][0]
+        assert rows[0][:2] == best[:2]
+        assert narrow['orfs'][str(rows[0][2])]['sequence'] == wide['orfs'][str(best[2])]['sequence']
+
+@pytest.mark.parametrize("top_k", [0, MAX_TOP_K + 1])
+def test_out_of_range_k_is_rejected(client, workload, top_k):
+    response = client.post("/align/multi", json={"query_frames": {}, "targets": workload['targets'], "top_k": top_k})
+    assert response.status_code == 422
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# test_validation.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Nucleotide validation must agree with a plain per-symbol check for every alphabet, report
+the first offending position, and normalize accepted input (uppercase, U written as T).
+
+"""
+
+from app.scripts.validation import *
+
+import random
+import pytest
+
+def reference_first_invalid(sequence: str, alphabet: str) -> int:
+    allowed = set(ALPHABETS[alphabet]) | set(ALPHABETS[alphabet].lower())
+    return next((i for i, symbol in enumerate(sequence) if symbol not in allowed), -1)
+
+@pytest.mark.parametrize("alphabet", list(ALPHABETS))
+def test_first_invalid_position_matches_reference(alphabet):
+    rng = random.Random(11)
+    symbols = "ACGTUNRYacgtunry-*X é"
+    for _ in range(500):
+        sequence = "".join(rng.choice(symbols) for _ in range(rng.randint(0, 12)))
+        assert first_invalid_position(sequence, alphabet) == reference_first_invalid(sequence, alphabet)
+
+def test_normalize_uppercases_and_maps_u():
+    assert normalize_nucleotides("acgtn") == "ACGTN"
+    assert normalize_nucleotides("acgun", "rna") == "ACGTN"
+    assert normalize_nucleotides("ACGTURYN", "iupac") == "ACGTTRYN"
+
+def test_invalid_symbols_are_reported_with_their_record():
+    with pytest.raises(InvalidSequenceError) as error:
+        validate_records({"ok": "ACGT", "bad": "ACGUT"}, "strict")
+    assert (error.value.record_id, error.value.position, error.value.symbol) == ("bad", 3, "U")
+    assert "position 4" in str(error.value)
+
+    with pytest.raises(ValueError, match="Unknown alphabet"):
+        normalize_nucleotides("ACGT", "protein")
+
+def test_endpoints_reject_invalid_input_with_400(client):
+    response = client.post("/process/multi", data={"alphabet": "strict"},
+                           files={"input_fasta": ("input.fasta", b">r1\nATGXXTAA\n"),
+                                  "target_fasta": ("targets.fasta", b">t1\nMKV\n")})
+    assert response.status_code == 400
+    assert response.json()['detail'] == ("Record 'r1': invalid nucleotide 'X' at position 4 "
+                                         "(strict alphabet allows ACGTN).")
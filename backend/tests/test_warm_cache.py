@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# test_warm_cache.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: The warm-container target cache: panels are revalidated by ETag, the byte budget evicts
+least-recently-used entries (closing memory-mapped libraries as they go), and fetch_targets prefers
+a compiled library, building one from the FASTA the first time a panel is seen.
+
+"""
+
+from app.scripts.target_library import content_hash, library_key
+from app.scripts.warm_cache import *
+from benchmarks.synthetic import to_fasta
+
+import pytest
+
+class Closable:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+def test_least_recently_used_entries_are_evicted_and_closed():
+    cache = WarmCache(max_bytes=100)
+    first, second, third = Closable(), Closable(), Closable()
+    cache.put("a", None, first, 40)
+    cache.put("b", None, second, 40)
+    assert cache.get("a", None) is first # 'b' is now the least recently used.
+
+    cache.put("c", None, third, 40)
+    assert list(cache.entries) == ["a", "c"] and cache.total_bytes == 80
+    assert second.closed and not first.closed and not third.closed
+
+def test_replaced_entries_are_closed():
+    cache = WarmCache(max_bytes=100)
+    stale, fresh = Closable(), Closable()
+    cache.put("a", '"v1"', stale, 10)
+    cache.put("a", '"v2"', fresh, 10)
+    assert stale.closed and not fresh.closed
+    assert cache.get("a", '"v1"') is None and cache.get("a", '"v2"') is fresh
+
+    cache.put("a", '"v2"', fresh, 10) # Re-putting the same object must not close it.
+    assert not fresh.closed and cache.total_bytes == 10
+
+def test_oversized_entries_are_not_cached():
+    cache = WarmCache(max_bytes=100)
+    kept = Closable()
+    cache.put("a", None, kept, 60)
+    cache.put("huge", None, Closable(), 101)
+    assert list(cache.entries) == ["a"] and not kept.closed
+
+def test_target_sets_are_revalidated_by_etag(aws, workload):
+    aws.s3.put_object(Bucket="bucket", Key="panel.fasta", Body=to_fasta(workload['targets']))
+    first = cached_target_set("panel.fasta", aws.s3, "bucket")
+    assert dict(first) == workload['targets']
+    assert cached_target_set("panel.fasta", aws.s3, "bucket") is first
+
+    aws.s3.put_object(Bucket="bucket", Key="panel.fasta", Body=to_fasta({"only": "MKV"}))
+    assert cached_target_set("panel.fasta", aws.s3, "bucket") == {"only": "MKV"}
+
+def test_fetch_targets_compiles_then_maps_the_library(aws, workload, tmp_path, monkeypatch):
+    monkeypatch.setattr("app.scripts.target_library.LOCAL_LIBRARY_DIR", str(tmp_path))
+    aws.s3.put_object(Bucket="bucket", Key="panel.fasta", Body=to_fasta(workload['targets']))
+    key = library_key(content_hash(workload['targets']))
+
+    # First sight of the panel: the library doesn't exist yet, so the FASTA is parsed and compiled.
+    parsed = fetch_targets("panel.fasta", aws.s3, "bucket", key)
+    assert not isinstance(parsed, TargetLibrary) and key in aws.s3.objects
+
+    WARM_CACHE.clear()
+    library = fetch_targets("panel.fasta", aws.s3, "bucket", key)
+    assert isinstance(library, TargetLibrary) and dict(library) == workload['targets']
+    assert fetch_targets("panel.fasta", aws.s3, "bucket", key) is library
+
+    WARM_CACHE.clear() # Clearing the cache unmaps the library it held.
+    assert library.buffer.closed
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# test_windowed_frames.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: Windowed translation must find exactly the ORFs whole-sequence translation does at every
+window size, including sizes that aren't a whole number of codons and ones small enough to split an ORF
+across many windows. Each ORF's nucleotide coordinates must translate back to its residues.
+
+"""
+
+from app.scripts.frame_retrieve import *
+
+import random
+import pytest
+
+FRAME_SETUPS = [(offset, reverse) for reverse in (False, True) for offset in range(3)]
+
+@pytest.fixture(scope="module")
+def long_read(workload):
+    rng = random.Random(3)
+    return "".join(workload['reads'].values()) + "".join(rng.choice("ACGT") for _ in range(1001))
+
+def whole_frame_orfs(seq: str, offset: int, reverse: bool) -> list:
+    aa_seq = get_translate_output(seq, "REV" if reverse else "FWD")[offset]
+    return [(start, end, aa_seq[start:end]) for start, end in find_orfs(aa_seq, compact=True)['orf_spans']]
+
+@pytest.mark.parametrize("window_bp", [3, 4, 30, 301, 10 ** 6])
+@pytest.mark.parametrize("offset, reverse", FRAME_SETUPS)
+def test_scan_orfs_matches_whole_translation(long_read, window_bp, offset, reverse):
+    chunks = list(frame_chunks(long_read, offset, reverse, window_bp))
+    assert "".join(chunks) == get_translate_output(long_read, "REV" if reverse else "FWD")[offset]
+    assert list(scan_orfs(chunks)) == whole_frame_orfs(long_read, offset, reverse)
+
+@pytest.mark.parametrize("offset, reverse", FRAME_SETUPS)
+def test_windowed_coordinates_translate_back(long_read, offset, reverse):
+    frame = windowed_frame(long_read, offset, reverse, compact=True, window_bp=99)
+    assert frame['aa_length'] == (len(long_read) - offset) // 3
+    for (start, end), (nt_start, nt_end) in zip(frame['orf_spans'], frame['orf_coords']):
+        span = long_read[nt_start:nt_end]
+        assert translate(reverse_complement(span) if reverse else span) == frame['aa_seq'][start:end]
+
+def test_generate_frames_windowed_keeps_the_same_orfs(long_read):
+    whole = expand_frame_set(generate_frames(long_read, "BOTH", compact=True, windowed=False))
+    windowed = expand_frame_set(generate_frames(long_read, "BOTH", compact=True, windowed=True))
+    assert list(windowed) == list(whole)
+    for label in whole:
+        assert windowed[label]['orf_set'] == whole[label]['orf_set']
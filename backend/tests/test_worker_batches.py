@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+# test_worker_batches.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: SQS batches on the worker: each message runs in its own forked child, and only the
+messages whose jobs didn't complete come back as batchItemFailures. A child that dies, or a job that
+fails before its last attempt, keeps its fair-share lease for the redelivery; only a final failure
+gives it up.
+
+"""
+
+from app.scripts.scheduling import reserve_user_slot
+
+import json
+import os
+import uuid
+import pytest
+import worker_handler
+
+def sqs_record(message_id: str, job_id: str, user_id=None, receive_count: int = 1) -> dict:
+    body = {"job_id": job_id, "input_key": f"tmp/{job_id}/input.fasta", "target_key": f"tmp/{job_id}/target.fasta",
+            "direction": "BOTH", "user_id": user_id, "size_class": "standard"}
+    return {"messageId": message_id, "body": json.dumps(body),
+            "attributes": {"ApproximateReceiveCount": str(receive_count)}}
+
+def fake_run_record(record: dict) -> dict:
+    if record["messageId"].startswith("crash"):
+        os._exit(1) # Dies the way an OOM-killed child does: no outcome, no cleanup.
+    return {'message_id': record["messageId"], 'ok': not record["messageId"].startswith("fail"), 'status': "DONE"}
+
+@pytest.fixture
+def forked(monkeypatch):
+    monkeypatch.setattr(worker_handler, "run_record", fake_run_record)
+    monkeypatch.setattr(worker_handler, "max_parallel_jobs", lambda: 2)
+
+def test_children_report_only_failed_messages(aws, forked):
+    records = [sqs_record(message_id, str(uuid.uuid4())) for message_id in ("ok-1", "fail-2", "ok-3", "fail-4")]
+    response = worker_handler.handler({"Records": records}, None)
+    assert sorted(failure['itemIdentifier'] for failure in response['batchItemFailures']) == ["fail-2", "fail-4"]
+
+def test_crashed_child_is_retried_and_keeps_its_lease(aws, forked):
+    crashed, finished = str(uuid.uuid4()), str(uuid.uuid4())
+    reserve_user_slot(7, crashed)
+    response = worker_handler.handler({"Records": [sqs_record("crash-1", crashed, user_id=7),
+                                                   sqs_record("ok-2", finished, user_id=7)]}, None)
+
+    assert response == {'batchItemFailures': [{'itemIdentifier': "crash-1"}]}
+    assert crashed in aws.scheduling.items["user#7"]["active_leases"]
+
+@pytest.mark.parametrize("receive_count, status, keeps_lease", [(1, "RETRYING", True),
+                                                                (worker_handler.MAX_RECEIVE_COUNT, "FAILED", False)])
+def test_failed_job_keeps_its_lease_until_the_last_attempt(aws, receive_count, status, keeps_lease):
+    # Nothing was uploaded for this job, so fetching its FASTAs fails.
+    job_id = str(uuid.uuid4())
+    reserve_user_slot(7, job_id)
+    aws.jobs.items[job_id] = {"job_id": job_id, "status": "PENDING"}
+
+    outcome = worker_handler.run_record(sqs_record("m-1", job_id, user_id=7, receive_count=receive_count))
+    assert outcome['ok'] is False and outcome['status'] == status
+    assert aws.jobs.items[job_id]["status"] == status
+    assert (job_id in aws.scheduling.items["user#7"]["active_leases"]) is keeps_lease
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# test_worker_jobs.py
+
+"""
+Author: Rohak Jain
+Last Date Modified: 2026-10-19
+Description: A worker job end to end against the AWS fakes: both FASTAs are fetched at once, the input
+is aligned as it streams (gzipped or not), and every artifact the job row points at (JSON, result
+tables, download links) is actually in S3, with the same results an inline run gives.
+
+"""
+
+from benchmarks.synthetic import to_fasta
+
+import gzip
+import json
+import threading
+import uuid
+import pytest
+
+@pytest.fixture
+def job(aws, workload):
+    # A queued job as /jobs/submit leaves it: FASTAs in S3, a PENDING row and the SQS message body.
+    job_id = str(uuid.uuid4())
+    aws.s3.put_object(Bucket="bucket", Key=f"tmp/{job_id}/input.fasta", Body=to_fasta(workload['reads']))
+    aws.s3.put_object(Bucket="bucket", Key=f"tmp/{job_id}/target.fasta", Body=to_fasta(workload['targets']))
+    aws.jobs.items[job_id] = {"job_id": job_id, "status": "PENDING"}
+    return {'body': {"job_id": job_id, "input_key": f"tmp/{job_id}/input.fasta",
+                     "target_key": f"tmp/{job_id}/target.fasta", "direction": "BOTH", "user_id": None,
+                     "align_threshold": 0.98, "top_k": 5, "output_format": "csv"}}
+
+@pytest.fixture
+def inline_results(client, fasta_files) -> dict:
+    return client.post("/process/multi", files=fasta_files).json()['alignment_results']
+
+def test_job_uploads_every_artifact_it_records(aws, job, run_worker, inline_results):
+    job['body'].update(user_id=7, output_format="both")
+    assert run_worker(job)['status'] == "COMPLETED"
+
+    row = aws.jobs.items[job['body']['job_id']]
+    assert row['status'] == "COMPLETED" and row['top_k'] == 5 and row['direction'] == "BOTH"
+    for field in ("alignment_key", "top_hits_key", "frames_key", "match_vectors_key", "result_index_key", "timings_key"):
+        assert row[field] in aws.s3.objects
+    assert json.loads(aws.s3.objects[row['alignment_key']]) == inline_results
+
+    links = json.loads(row['download_links'])
+    assert {"orf_mappings", "orf_mappings_csv", "orf_mappings_parquet", "top_hits", "top_hits_csv",
+            "top_hits_parquet"} <= set(links)
+    for url in links.values():
+        assert url.removeprefix("https://s3.test/").split("?")[0] in aws.s3.objects
+
+def test_anonymous_jobs_skip_the_result_tables(aws, job, run_worker):
+    assert run_worker(job)['status'] == "COMPLETED"
+    assert "download_links" not in aws.jobs.items[job['body']['job_id']]
+    assert not any(key.startswith("users/") for key in aws.s3.objects)
+
+def test_both_fastas_are_fetched_at_once(aws, job, run_worker, monkeypatch):
+    # Each FASTA's download waits for the other's to start; fetching them one after the other would
+    # break the barrier and fail the job.
+    barrier = threading.Barrier(2, timeout=5)
+    get_object = aws.s3.get_object
+
+    def rendezvous(Bucket, Key, Range=None):
+        if Key in (job['body']['input_key'], job['body']['target_key']):
+            barrier.wait()
+        return get_object(Bucket, Key, Range)
+
+    monkeypatch.setattr(aws.s3, "get_object", rendezvous)
+    assert run_worker(job)['status'] == "COMPLETED"
+
+def test_gzipped_input_streams_to_the_same_results(aws, job, run_worker, inline_results):
+    plain_key = job['body']['input_key']
+    job['body']['input_key'] = plain_key + ".gz"
+    aws.s3.put_object(Bucket="bucket", Key=job['body']['input_key'], Body=gzip.compress(aws.s3.objects[plain_key]))
+    del aws.s3.objects[plain_key]
+
+    assert run_worker(job)['status'] == "COMPLETED"
+    row = aws.jobs.items[job['body']['job_id']]
+    assert json.loads(aws.s3.objects[row['alignment_key']]) == inline_results
@@ -2,133 +2,401 @@ from app.scripts.utils import *
 from app.scripts.aws_tools import *
 from app.scripts.build_alignment import *
 from app.scripts.frame_retrieve import *
+from app.scripts.profiling import *
+from app.scripts.scheduling import mark_job_started, release_user_slot
+from app.scripts.warm_cache import fetch_targets
+from app.scripts.result_index import build_result_index
+from app.scripts.serialization import dumps_json, loads_json
+from app.scripts.target_clusters import TargetClusters, cluster_targets
+from app.scripts.validation import DEFAULT_ALPHABET, InvalidSequenceError, normalize_nucleotides
+
+from collections.abc import Mapping
+
+from decimal import Decimal
 
 import json
 import traceback
 import asyncio
+import multiprocessing
+import multiprocessing.connection
+import time
 
 """
-SQS → Lambda handler → process_alignment_job
-    → run_pipeline (frames, hits, results, summary)
+SQS → Lambda handler → process_records (one child process per message, bounded by cores/memory)
+    → process_alignment_job
+    → run_pipeline (frames, hits, results, summary, match vectors)
     → Save JSON artifacts to S3
-    → Redis: status, S3 keys, available targets
+    → Redis: status, S3 keys, available targets, per-stage timings
     → (Optional) Save permanent artifacts + presigned URLs if logged in.
+    → batchItemFailures back to SQS so only failed messages are retried.
 """
 
+# Rough peak footprint of one job; together with the core count this caps parallel jobs per invocation.
+WORKER_JOB_MEMORY_MB = int(os.environ.get("WORKER_JOB_MEMORY_MB", "512"))
+# Must match the queues' redrive policy; the last attempt marks the job FAILED instead of RETRYING.
+MAX_RECEIVE_COUNT = int(os.environ.get("MAX_RECEIVE_COUNT", "3"))
+
 def handler(event: dict, context):
-    print("Received JSON event!")
-    for record in event.get("Records"):
-        try:
-            message = json.loads(record.get("body"))
-            asyncio.run(process_alignment_job(message))
-        except Exception:
-            print("CRITICAL ERROR processing a record. See traceback below.")
-            traceback.print_exc()
+    records = event.get("Records") or []
+    print(f"Received JSON event with {len(records)} record(s)!")
+
+    outcomes = process_records(records, max_parallel_jobs())
+    failures = [{'itemIdentifier': outcome['message_id']} for outcome in outcomes if not outcome['ok']]
     
     # Debugging stdout:
     # print(f"Lambda {context.function_name} invoked with request ID: {context.aws_request_id}.")
     # print(f"Time left: {context.get_remaining_time_in_millis()} ms.")
 
-    return {'status': 200}
+    return {'batchItemFailures': failures}
+
+def max_parallel_jobs() -> int:
+    memory_mb = int(os.environ.get("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "1024"))
+    return max(1, min(os.cpu_count() or 1, memory_mb // WORKER_JOB_MEMORY_MB))
+
+def run_record(record: dict) -> dict:
+    message_id = record.get("messageId")
+    attributes = record.get("attributes", {})
+    receive_count = int(attributes.get("ApproximateReceiveCount", 1))
+    sent_at_ms = int(attributes.get("SentTimestamp", time.time() * 1000))
+    queue_wait = max(0.0, time.time() - sent_at_ms / 1000)
+
+    start = time.perf_counter()
+    try:
+        message = json.loads(record.get("body"))
+        job_status = asyncio.run(process_alignment_job(message, queue_wait_seconds=queue_wait,
+                                                       final_attempt=receive_count >= MAX_RECEIVE_COUNT))
+    except Exception:
+        print("CRITICAL ERROR processing a record. See traceback below.")
+        traceback.print_exc()
+        job_status = "FAILED"
+
+    outcome = {'message_id': message_id, 'ok': job_status == "COMPLETED", 'status': job_status,
+               'attempt': receive_count, 'queue_wait_seconds': round(queue_wait, 3),
+               'seconds': round(time.perf_counter() - start, 3)}
+    print(f"Message timing: {json.dumps(outcome)}")
+    return outcome
+
+def _run_record_in_child(conn, record: dict):
+    try:
+        reset_aws_clients()
+        conn.send(run_record(record))
+    finally:
+        conn.close()
+
+def warm_shared_targets(records: list):
+    """
+    Children fill only their own copy of the warm cache, which dies with them; loading the batch's panels
+    here first means every forked child inherits them (copy-on-write) and later batches still find them.
+    """
+    sources = set()
+    for record in records:
+        try:
+            message = json.loads(record.get("body"))
+            sources.add((message["target_key"], message.get("target_library_key")))
+        except Exception:
+            continue # run_record reports malformed messages.
+
+    async def warm_all():
+        await asyncio.gather(*(asyncio.to_thread(fetch_targets, target_key, s3_client, fasta_bucket_name,
+                                                 library_key) for target_key, library_key in sources),
+                             return_exceptions=True)
+
+    asyncio.run(warm_all())
+
+def process_records(records: list, parallel: int) -> list:
+    """
+    Runs each SQS record's job in its own forked process so CPU-bound alignment actually uses every core.
+    Lambda has no /dev/shm, which rules out multiprocessing.Pool/ProcessPoolExecutor; bare Process + Pipe
+    objects work fine there. A child that dies without reporting counts as a failed message, which SQS
+    redelivers; its fair-share lease is kept for the retry, and lapses on its own if the message is
+    eventually redriven to the DLQ. Each child opens its own AWS clients (see reset_aws_clients).
+    """
+    if parallel <= 1 or len(records) <= 1:
+        return [run_record(record) for record in records]
+
+    warm_shared_targets(records)
+
+    pending, running, outcomes = list(records), {}, []
+    while pending or running:
+        while pending and len(running) < parallel:
+            record = pending.pop(0)
+            recv_conn, send_conn = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_run_record_in_child, args=(send_conn, record))
+            process.start()
+            send_conn.close()
+            running[recv_conn] = (process, record)
+
+        for conn in multiprocessing.connection.wait(list(running.keys())):
+            process, record = running.pop(conn)
+            try:
+                outcomes.append(conn.recv())
+            except EOFError:
+                print(f"Worker process for message {record.get('messageId')} exited without a result.")
+                outcomes.append({'message_id': record.get("messageId"), 'ok': False, 'status': "CRASHED"})
+            finally:
+                conn.close()
+                process.join()
 
-async def process_alignment_job(message: dict):
+    return outcomes
+
+async def process_alignment_job(message: dict, queue_wait_seconds: float = None,
+                                final_attempt: bool = True) -> str:
     job_id = message.get("job_id")
     input_key = message.get("input_key")
     target_key = message.get("target_key")
     direction = message.get("direction")
     user_id = message.get("user_id")
+    align_threshold = message.get("align_threshold", 0.98)
+    top_k = int(message.get("top_k", DEFAULT_TOP_K))
+    target_library_key = message.get("target_library_key")
+    output_format = message.get("output_format") or "csv"
+    alphabet = message.get("alphabet") or DEFAULT_ALPHABET
+    collapse_targets = bool(message.get("collapse_targets"))
+    rethreshold_of = message.get("rethreshold_of") # Set when this job re-thresholds a finished one.
+    mark_job_started(job_id, message.get("size_class"), user_id)
 
-    try:
-        print("Downloading from S3...")
-        input_fasta = download_from_s3(input_key)
-        target_fasta = download_from_s3(target_key)
-        print("S3 FASTAs downloaded!")
-        
-        print("Starting alignment pipeline...")
-        frames, top_hits, alignment_results, summary_df = await run_pipeline(input_fasta, target_fasta, direction)
-        available_targets = list(top_hits.keys())
-        for hits in top_hits.values():
-            hits.sort(key=lambda x: x[0], reverse=True)
-        
-        print("Finished alignment pipeline.")
-        
-        alignment_key = f"tmp/{job_id}/alignment_res.json"
-        top_hits_key = f"tmp/{job_id}/top_hits.json"
-        frames_key = f"tmp/{job_id}/frames.json"
-
-        print("Uploading JSON artifacts to S3.")
-        await upload_to_s3(json.dumps(alignment_results), alignment_key)
-        await upload_to_s3(json.dumps(top_hits), top_hits_key)
-        await upload_to_s3(json.dumps(frames), frames_key)
-
-        job_payload = {
-            "status": "COMPLETED",
-            "alignment_key": alignment_key,
-            "top_hits_key": top_hits_key,
-            "frames_key": frames_key,
-            "available_targets": json.dumps(available_targets)
-        }
-        
-        if user_id:
-            results_key, top_hits_key = save_alignment_artifacts(results_df=summary_df, top_hits=top_hits,
-                                                                current_user=user_id, s3_client=s3_client,
-                                                                bucket_name=fasta_bucket_name, db=None)
+    with stage_timer() as timer:
+        profiler = maybe_start_profiler()
+        job_payload = {}
 
-            presigned_result_url = generate_presigned_url(results_key, filename="orf_mappings.csv")
-            presigned_hits_url = generate_presigned_url(top_hits_key, filename="top_hits.csv")
+        try:
+            frames_key = f"tmp/{job_id}/frames.json"
+            if rethreshold_of:
+                print(f"Re-thresholding job {rethreshold_of}...")
+                frames, top_hits, alignment_results, summary_df, alignment_cache, frames_key = await run_rethreshold(
+                    rethreshold_of, target_key, target_library_key, direction, align_threshold, top_k,
+                    collapse_targets)
+            else:
+                # Both objects are requested at once; the target panel is read in full (every record needs it)
+                # while the input stays a live stream that run_pipeline parses record by record.
+                print("Fetching FASTAs from S3...")
+                with span("s3_download"):
+                    input_fasta, target_fasta = await asyncio.gather(
+                        asyncio.to_thread(open_s3_stream, input_key),
+                        asyncio.to_thread(fetch_targets, target_key, s3_client, fasta_bucket_name, target_library_key))
+                
+                print("Starting alignment pipeline...")
+                frames, top_hits, alignment_results, summary_df, alignment_cache = await run_pipeline(
+                    input_fasta, target_fasta, direction, align_threshold, top_k, alphabet, collapse_targets)
+            available_targets = top_hits.keys()
             
-            job_payload["download_links"] = json.dumps({
-                "orf_mappings": presigned_result_url,
-                "top_hits": presigned_hits_url
-            })
-        
+            print("Finished alignment pipeline.")
+            
+            alignment_key = f"tmp/{job_id}/alignment_res.json"
+            top_hits_key = f"tmp/{job_id}/top_hits.json"
+            match_vectors_key = f"tmp/{job_id}/match_vectors.json" # Lets /results/{job_id}/rethreshold skip re-alignment.
+            result_index_key = f"tmp/{job_id}/result_index.json" # Backs the paginated /results/{job_id} getters.
+
+            with span("json_serialize"):
+                top_hits_json = top_hits.to_json()
+                artifacts = {alignment_key: dumps_json(alignment_results), top_hits_key: dumps_json(top_hits_json),
+                             match_vectors_key: dumps_json(alignment_cache.to_json()),
+                             result_index_key: dumps_json(build_result_index(alignment_results, top_hits_json))}
+                if not rethreshold_of: # A re-threshold points at its source job's (identical) frames.
+                    artifacts[frames_key] = dumps_json(frames)
+
+            # JSON uploads go out on the thread pool while the CSV/Parquet tables are built (and uploaded) alongside.
+            print("Uploading JSON artifacts to S3.")
+            with span("artifact_upload"):
+                json_uploads = asyncio.gather(*(upload_to_s3(body, key) for key, body in artifacts.items()))
+                if user_id:
+                    _, artifact_keys = await asyncio.gather(
+                        json_uploads, asyncio.to_thread(save_alignment_artifacts, results_df=summary_df,
+                                                        top_hits=top_hits, current_user=user_id,
+                                                        s3_client=s3_client, bucket_name=fasta_bucket_name,
+                                                        db=None, output_format=output_format))
+                else:
+                    await json_uploads
+
+            job_payload = {
+                "status": "COMPLETED",
+                "alignment_key": alignment_key,
+                "top_hits_key": top_hits_key,
+                "frames_key": frames_key,
+                "target_key": target_key,
+                "match_vectors_key": match_vectors_key,
+                "result_index_key": result_index_key,
+                "direction": direction,
+                "align_threshold": Decimal(str(align_threshold)),
+                "top_k": top_k,
+                "collapse_targets": collapse_targets, # Re-thresholding clusters the targets the same way.
+                "available_targets": json.dumps(available_targets)
+            }
+            if target_library_key:
+                job_payload["target_library_key"] = target_library_key # Re-thresholds map the same library.
+            
+            if user_id:
+                job_payload["download_links"] = json.dumps(generate_artifact_links(artifact_keys))
+        except Exception as e:
+            print(f"Job {job_id} failed! Exception: {e}.")
+            traceback.print_exc()
+            # SQS will redeliver the message; RETRYING keeps clients polling until the final attempt.
+            job_payload = {"status": "FAILED" if final_attempt else "RETRYING"}
+
+        if rethreshold_of:
+            job_payload["rethreshold_of"] = rethreshold_of
+
+        if profiler is not None:
+            profiler.disable()
+
+        # The stage breakdown is kept even for failed jobs, since that's usually when it matters most.
+        timings = timer.summary()
+        if queue_wait_seconds is not None:
+            timings['queue_wait_seconds'] = round(queue_wait_seconds, 3)
+        print(f"Job {job_id} stage timings: {json.dumps(timings)}")
+        job_payload["stage_timings"] = json.dumps(timings)
+
+        try:
+            timings_key = f"tmp/{job_id}/timings.json"
+            await upload_to_s3(json.dumps(timings), timings_key)
+            job_payload["timings_key"] = timings_key
+
+            if profiler is not None:
+                profile_key = f"tmp/{job_id}/profile.prof"
+                await upload_to_s3(dump_profile(profiler, f"/tmp/{job_id}.prof"), profile_key)
+                job_payload["profile_key"] = profile_key
+        except Exception as e:
+            print(f"Couldn't upload timing artifacts for job {job_id}: {e}.")
+
         jobs_table.put_item(Item={"job_id": job_id, **job_payload})
-        print(f"Job {job_id} completed! Results, hits, and frames saved to S3.")
-    except Exception as e:
-        print(f"Job {job_id} failed! Exception: {e}.")
-        traceback.print_exc()
-        jobs_table.put_item(Item={"job_id": job_id, "status": "FAILED"})
+        if job_payload["status"] != "RETRYING":
+            release_user_slot(user_id, job_id)
+        if job_payload["status"] == "COMPLETED":
+            print(f"Job {job_id} completed! Results, hits, and frames saved to S3.")
 
-async def run_pipeline(input_fasta: StringIO, target_fasta: StringIO, direction: str, 
-                       align_threshold: float = 0.98) -> tuple:
-    input_sequences = await process_fasta_upload(input_fasta)
-    target_sequences = await process_fasta_upload(target_fasta)
+        return job_payload["status"]
 
-    all_frames_data = {}
-    for name, seq in input_sequences.items():
-        all_frames_data[name] = generate_frames(seq, direction)
-    
-    alignment_results, top_hits, summary_df = extract_alignment_results(query_frames=all_frames_data,
-                                                targets=target_sequences, direction=direction,
-                                                align_threshold=align_threshold)
-    
-    return all_frames_data, top_hits, alignment_results, summary_df
+async def run_pipeline(input_fasta, target_fasta, direction: str, 
+                       align_threshold: float = 0.98, top_k: int = DEFAULT_TOP_K,
+                       alphabet: str = DEFAULT_ALPHABET, collapse_targets: bool = False) -> tuple:
+    """
+    'input_fasta' can be an in-memory StringIO or a streaming text handle straight off S3. Records are
+    translated and aligned as soon as they're parsed, on a worker thread so the event loop stays free
+    for concurrent I/O. 'target_fasta' is either a FASTA handle or already-parsed targets (a dict from the
+    warm cache or a memory-mapped TargetLibrary). With 'collapse_targets', redundant targets are aligned
+    through cluster representatives (see target_clusters).
+    """
+    if isinstance(target_fasta, Mapping):
+        target_sequences = target_fasta
+    else:
+        with span("parse_fasta"):
+            target_sequences = await process_fasta_upload(target_fasta)
+
+    return await asyncio.to_thread(align_fasta_stream, input_fasta, target_sequences, direction, align_threshold,
+                                   top_k, alphabet, collapse_targets)
+
+def align_fasta_stream(input_fasta, targets: Dict[str, str], direction: str, align_threshold: float,
+                       top_k: int = DEFAULT_TOP_K, alphabet: str = DEFAULT_ALPHABET,
+                       collapse_targets: bool = False) -> tuple:
+    top_hits = TopHits(top_k)
+    results_df = pd.DataFrame(columns = ["Name", "Target", "Identity-Score", "Direction", 
+                                         "Most-Likely-ORF", "Notes"])
+    alignment_results, all_frames_data = {}, {}
+    # Repeated reads and ORFs are translated/aligned once and fanned back out to every record.
+    frame_interner, alignment_cache = FrameInterner(), AlignmentCache()
+    target_clusters = None
+    if collapse_targets:
+        with span("cluster_targets"):
+            target_clusters = cluster_targets(targets)
+        print(f"Collapsed targets: {json.dumps(target_clusters.summary())}")
+
+    records = iter_fasta_records(input_fasta)
+    while True:
+        with span("stream_input"):
+            record = next(records, None)
+        if record is None:
+            break
+
+        seq_name, seq = record
+        if seq_name in all_frames_data:
+            raise ValueError(f"Duplicate record ID '{seq_name}' in input FASTA.")
+
+        # Direct uploads are only validated on a sampled prefix, so later records are checked here.
+        try:
+            seq = normalize_nucleotides(seq, alphabet, seq_name)
+        except InvalidSequenceError as e:
+            all_frames_data[seq_name] = {}
+            alignment_results[seq_name] = {'detail': str(e)}
+            results_df = data_export(results_df, seq_name, direction, "N/A", 0.0, "N/A", notes="Invalid sequence!")
+            continue
+
+        with span("generate_frames"):
+            all_frames_data[seq_name] = frame_interner.generate(seq, direction, compact=True)
+
+        with span("extract_results"):
+            results_df = align_record(seq_name, all_frames_data[seq_name], targets, direction, align_threshold,
+                                      top_hits, results_df, alignment_results, alignment_cache, target_clusters)
+
+    return all_frames_data, top_hits, alignment_results, results_df, alignment_cache
+
+async def run_rethreshold(source_job_id: str, target_key: str, target_library_key: Optional[str], direction: str,
+                          align_threshold: float, top_k: int = DEFAULT_TOP_K, collapse_targets: bool = False) -> tuple:
+    """
+    Re-runs a finished job's picks at a new threshold from its stored frames and match vectors, so only
+    pairs the original run pruned (or couldn't cache) are aligned. Targets come through the warm cache and
+    the compiled library, like any other job's. Returns run_pipeline's tuple plus the source's frames key.
+    """
+    source = get_job_status(source_job_id)
+    if source.get("status") != "COMPLETED" or not source.get("match_vectors_key"):
+        raise ValueError(f"Job {source_job_id} isn't completed or has no stored match vectors.")
+
+    with span("s3_download"):
+        frames_file, match_vectors_file, targets = await asyncio.gather(
+            asyncio.to_thread(download_from_s3, source["frames_key"]),
+            asyncio.to_thread(download_from_s3, source["match_vectors_key"]),
+            asyncio.to_thread(fetch_targets, target_key, s3_client, fasta_bucket_name, target_library_key))
+        frames = loads_json(frames_file.getvalue())
+        alignment_cache = AlignmentCache.from_json(loads_json(match_vectors_file.getvalue()))
+
+    def rethreshold():
+        target_clusters = cluster_targets(targets) if collapse_targets else None
+        with span("extract_results"):
+            return extract_alignment_results(frames, targets, direction, align_threshold, top_k, alignment_cache,
+                                             target_clusters)
+
+    alignment_results, top_hits, results_df = await asyncio.to_thread(rethreshold)
+    return frames, top_hits, alignment_results, results_df, alignment_cache, source["frames_key"]
 
 def extract_alignment_results(query_frames: Dict, targets: Dict[str, str], direction: str,
-                                  align_threshold: float) -> tuple:
+                                  align_threshold: float, top_k: int = DEFAULT_TOP_K,
+                                  alignment_cache: Optional[AlignmentCache] = None,
+                                  target_clusters: Optional[TargetClusters] = None) -> tuple:
     """
     This is the core logic extracted from your original /align/multi endpoint.
-    It can now be reused by both the old and new endpoints.
+    It can now be reused by both the old and new endpoints. A populated 'alignment_cache' (e.g. a finished
+    job's match vectors) is reused instead of re-aligning.
     """
-    top_hits = defaultdict(list)
+    top_hits = TopHits(top_k)
     results_df = pd.DataFrame(columns = ["Name", "Target", "Identity-Score", "Direction", 
                                          "Most-Likely-ORF", "Notes"])
     alignment_results = {}
+    if alignment_cache is None:
+        alignment_cache = AlignmentCache()
     
     for seq_name, frame_data in query_frames.items():
-        print(f"Processing {seq_name}...")
-        all_orfs = [orf for frame in frame_data.values() for orf in frame.get('orf_set', [])]
+        results_df = align_record(seq_name, frame_data, targets, direction, align_threshold,
+                                  top_hits, results_df, alignment_results, alignment_cache, target_clusters)
+        
+    return alignment_results, top_hits, results_df
 
-        if not all_orfs:
-            results_df = data_export(results_df, seq_name, direction, "N/A", 0.0, "N/A", notes="No ORFs!")
-            alignment_results[seq_name] = {'detail': 'No valid ORFs found.'}
-            continue
+def align_record(seq_name: str, frame_data: Dict, targets: Dict[str, str], direction: str,
+                 align_threshold: float, top_hits: TopHits, results_df: pd.DataFrame,
+                 alignment_results: Dict, alignment_cache: Optional[AlignmentCache] = None,
+                 target_clusters: Optional[TargetClusters] = None) -> pd.DataFrame:
+    print(f"Processing {seq_name}...")
+    all_orfs, orf_refs = record_orf_refs(seq_name, frame_data, top_hits)
 
-        results_df, final_align_res = batch_alignment_cycle(direction=direction, record_id=seq_name, 
-                                                            orf_set=all_orfs, target_set=targets, 
-                                                            top_hits=top_hits, curr_results_data=results_df, 
-                                                            align_threshold=align_threshold)
+    if not all_orfs:
+        results_df = data_export(results_df, seq_name, direction, "N/A", 0.0, "N/A", notes="No ORFs!")
+        alignment_results[seq_name] = {'detail': 'No valid ORFs found.'}
+        return results_df
 
-        alignment_results[seq_name] = final_align_res or {'detail': 'No final alignment determined.'}
-        
-    return alignment_results, top_hits, results_df
+    results_df, final_align_res = batch_alignment_cycle(direction=direction, record_id=seq_name, 
+                                                        orf_set=all_orfs, target_set=targets, 
+                                                        top_hits=top_hits, curr_results_data=results_df, 
+                                                        align_threshold=align_threshold, orf_refs=orf_refs,
+                                                        alignment_cache=alignment_cache,
+                                                        target_clusters=target_clusters)
+
+    alignment_results[seq_name] = final_align_res or {'detail': 'No final alignment determined.'}
+    return results_df
@@ -9,7 +9,8 @@ interface AlignmentResult {
   end: number | null;
   length: number;
   target: string | null;
-  alignment: string | null;
+  // Compact encoding; the readout is rendered by the API on demand (older responses carried the text).
+  alignment: { coordinates: number[][]; cigar: string } | string | null;
   identity_pct: number;
   top_orf: string;
 }
@@ -27,14 +28,42 @@ interface AlignResultProps {
   };
   // You must pass the user's auth status from the parent
   isAuthenticated: boolean;
+  // The target the alignment was run against, needed to render the readout.
+  targetSequence: string;
 }
 
 /**
  * A card-based component to display pairwise alignment metrics, a collapsible
  * alignment readout, and context-aware download/login actions.
  */
-export const AlignResultDisplay: React.FC<AlignResultProps> = ({ data, isAuthenticated }) => {
+export const AlignResultDisplay: React.FC<AlignResultProps> = ({ data, isAuthenticated, targetSequence }) => {
   const [isAlignmentVisible, setIsAlignmentVisible] = React.useState(false);
+  const [readout, setReadout] = React.useState<string | null>(null);
+
+  // Reset the rendered readout whenever a new alignment comes in.
+  React.useEffect(() => { setReadout(null); }, [data]);
+
+  const toggleAlignment = async () => {
+    setIsAlignmentVisible(!isAlignmentVisible);
+    const alignment = data.alignment_result?.alignment;
+    if (readout !== null || !alignment) return;
+    if (typeof alignment === 'string') {
+      setReadout(alignment);
+      return;
+    }
+    try {
+      const res = await fetch(`${import.meta.env.VITE_API_BASE_URL}/align/render`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ target: targetSequence, query: data.alignment_result?.top_orf, alignment })
+      });
+      const rendered = await res.json();
+      setReadout(rendered.alignment ?? 'Alignment readout unavailable.');
+    } catch (err) {
+      console.error("Failed to render alignment:", err);
+      setReadout('Alignment readout unavailable.');
+    }
+  };
 
   // --- Early return for server-side detail messages (e.g., no ORFs) ---
   if (data.detail || !data.alignment_result) {
@@ -88,7 +117,7 @@ export const AlignResultDisplay: React.FC<AlignResultProps> = ({ data, isAuthent
         {alignment && (
             <div className="border-t border-gray-200 px-6 py-3 bg-gray-50 hover:bg-gray-100 transition-colors">
                 <button
-                onClick={() => setIsAlignmentVisible(!isAlignmentVisible)}
+                onClick={toggleAlignment}
                 className="flex items-center justify-between w-full text-left font-semibold text-gray-700 "
                 >
                 <span>{isAlignmentVisible ? 'Hide' : 'Show'} Alignment Readout</span>
@@ -100,7 +129,7 @@ export const AlignResultDisplay: React.FC<AlignResultProps> = ({ data, isAuthent
         {/* --- ALIGNMENT READOUT SECTION (Conditional) --- */}
         {isAlignmentVisible && alignment && (
           <div className="p-6 border-t border-gray-200 bg-gray-800 text-white font-mono text-sm overflow-x-auto">
-            <pre><code>{alignment}</code></pre>
+            <pre><code>{readout ?? 'Rendering alignment...'}</code></pre>
           </div>
         )}
       </div>
@@ -118,7 +118,7 @@ export const UploadModal: React.FC<UploadModalProps> = ({ isOpen, onClose, onUpl
               multiple
               onChange={handleFileSelect}
               className="absolute inset-0 w-full h-full opacity-0 cursor-pointer"
-              accept=".fasta,.fa,.fna,.faa"
+              accept=".fasta,.fa,.fna,.faa,.gz"
             />
             <div className="flex flex-col items-center text-gray-500">
               <UploadCloud size={40} className="mb-2" />
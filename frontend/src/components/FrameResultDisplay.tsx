@@ -5,7 +5,8 @@ import { Dna, Download, Copy, Check, MicroscopeIcon } from 'lucide-react';
 // --- TYPE DEFINITIONS ---
 interface FrameData {
   aa_seq: string;
-  orf_set: Array<string>;
+  orf_set?: Array<string>;
+  orf_spans?: Array<[number, number]>; // Compact layout: (start, end) offsets into aa_seq.
 }
 interface FrameResponse {
   [frameName: string]: FrameData;
@@ -154,8 +155,12 @@ export const FrameResultDisplay: React.FC<ResultProps> = ({ data }) => {
       {/* --- RESULTS GRID --- */}
       <div className="bg-white border border-gray-200 rounded-lg shadow-sm divide-y divide-gray-200">
         {frameNames.map((frameName) => {
-          const frameData = data[frameName];
-          if (!frameData) return null;
+          const rawFrame = data[frameName];
+          if (!rawFrame) return null;
+          const frameData = {
+            aa_seq: rawFrame.aa_seq,
+            orf_set: rawFrame.orf_set ?? (rawFrame.orf_spans ?? []).map(([start, end]) => rawFrame.aa_seq.slice(start, end))
+          };
 
           // 3. PARSE THE FRAME NAME AND DIRECTION
           const match = frameName.match(/(Frame #\d+).*\((.*)\)/);
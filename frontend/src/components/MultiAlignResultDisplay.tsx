@@ -9,7 +9,8 @@ interface AlignmentResult {
   identity_pct: number;
   target: string | null;
   top_orf: string;
-  alignment: string | null;
+  // Compact encoding; the readout is rendered by the API on demand (older jobs stored the text itself).
+  alignment: { coordinates: number[][]; cigar: string } | string | null;
   detail?: string;
 }
 
@@ -34,10 +35,24 @@ interface MultiAlignResultDisplayProps {
 }
 
 // --- CHILD COMPONENT: AlignmentMetricsCard (No changes) ---
-const AlignmentMetricsCard: React.FC<{ result: AlignmentResult }> = ({ result }) => {
+const AlignmentMetricsCard: React.FC<{ result: AlignmentResult; jobId: string; inputName: string }> = ({ result, jobId, inputName }) => {
   const [isAlignmentVisible, setIsAlignmentVisible] = useState(false);
+  const [readout, setReadout] = useState<string | null>(typeof result.alignment === 'string' ? result.alignment : null);
   const { alignment } = result;
 
+  const toggleAlignment = async () => {
+    setIsAlignmentVisible(!isAlignmentVisible);
+    if (readout !== null) return;
+    try {
+      const res = await fetch(`${import.meta.env.VITE_API_BASE_URL}/jobs/${jobId}/alignment/${encodeURIComponent(inputName)}`);
+      const data = await res.json();
+      setReadout(data.alignment ?? 'Alignment readout unavailable.');
+    } catch (err) {
+      console.error("Failed to render alignment:", err);
+      setReadout('Alignment readout unavailable.');
+    }
+  };
+
   return (
     <div className="bg-white rounded-2xl shadow-[0_0_30px_rgba(0,0,0,0.08)] overflow-hidden">
       <div className="p-6">
@@ -54,7 +69,7 @@ const AlignmentMetricsCard: React.FC<{ result: AlignmentResult }> = ({ result })
       {alignment && (
         <div className="border-t border-gray-200 px-6 py-3 bg-gray-50 hover:bg-gray-100 transition-colors">
             <button
-            onClick={() => setIsAlignmentVisible(!isAlignmentVisible)}
+            onClick={toggleAlignment}
             className="flex items-center justify-between w-full text-left font-semibold text-gray-700"
             >
             <span>{isAlignmentVisible ? 'Hide' : 'Show'} Alignment Readout</span>
@@ -64,7 +79,7 @@ const AlignmentMetricsCard: React.FC<{ result: AlignmentResult }> = ({ result })
       )}
       {isAlignmentVisible && alignment && (
         <div className="p-6 border-t border-gray-200 bg-gray-800 text-white font-mono text-sm overflow-x-auto">
-          <pre><code>{alignment}</code></pre>
+          {readout === null ? <Loader2 className="h-5 w-5 animate-spin" /> : <pre><code>{readout}</code></pre>}
         </div>
       )}
     </div>
@@ -192,6 +207,20 @@ interface JobResultDisplayProps {
     jobData: CompletedJobData;
     isAuthenticated: boolean;
 }
+// top_hits.json stores each ORF once ({ k, orfs, hits }) and hits reference it by id; expand back to
+// the [identity, lca, orf, originSeq] rows the explorer renders. Older artifacts are already expanded.
+const expandTopHits = (raw: any): Record<string, any[]> => {
+    if (!raw || !raw.hits || !raw.orfs) return raw;
+    const expanded: Record<string, any[]> = {};
+    for (const [target, hits] of Object.entries<any[]>(raw.hits)) {
+        expanded[target] = hits.map(([identity, lca, orfId]) => {
+            const orf = raw.orfs[orfId];
+            return [identity, lca, orf.sequence, orf.record];
+        });
+    }
+    return expanded;
+};
+
 // --- NEW: Inner component to render the actual results UI ---
 const JobResultDisplay: React.FC<JobResultDisplayProps> = ({ jobData, isAuthenticated }) => {
     const [selectedInput, setSelectedInput] = useState<string>('');
@@ -225,7 +254,7 @@ const JobResultDisplay: React.FC<JobResultDisplayProps> = ({ jobData, isAuthenti
                 
                 setAlignmentResults(alignRes);
                 setAllFramesData(framesRes);
-                setAllTopHitsData(hitsRes);
+                setAllTopHitsData(expandTopHits(hitsRes));
 
                 // Set the default selected input sequence
                 if (alignRes && Object.keys(alignRes).length > 0) {
@@ -279,7 +308,7 @@ const JobResultDisplay: React.FC<JobResultDisplayProps> = ({ jobData, isAuthenti
           <div className="bg-white p-6 rounded-lg shadow-md flex items-center gap-4"><AlertCircle className="w-8 h-8 text-yellow-500" /><div><h3 className="font-bold text-gray-800">No Alignment Found</h3><p className="text-gray-600">{currentAlignmentResult.detail}</p></div></div>
         ) : (
           <>
-            <AlignmentMetricsCard result={currentAlignmentResult} />
+            <AlignmentMetricsCard key={selectedInput} result={currentAlignmentResult} jobId={jobData.job_id} inputName={selectedInput} />
             {currentFrameData && <FrameResultDisplay data={currentFrameData} />}
             {allTopHitsData && (
               <TopHitsExplorer 
@@ -5,6 +5,39 @@ import { Send, AlignVerticalDistributeCenter, Loader2 } from 'lucide-react';
 import { FileUploader, type ServerFile } from './ViewerUploadModal';
 import { MultiAlignResultDisplay } from './MultiAlignResultDisplay';
 
+// Submissions whose local files add up to more than this go straight to S3 through presigned URLs
+// (/jobs/uploads + /jobs/{id}/finalize) instead of through the API's request body.
+const DIRECT_UPLOAD_THRESHOLD_BYTES = 5 * 1024 * 1024;
+
+type FileSide = 'input' | 'target';
+
+interface PresignedUpload {
+    key: string;
+    method: 'PUT' | 'MULTIPART';
+    url?: string;
+    part_size?: number;
+    part_urls?: string[];
+}
+
+// Uploads one file to its presigned target, returning the part list finalize needs for multipart uploads.
+const uploadToPresigned = async (file: File, upload: PresignedUpload) => {
+    if (upload.method === 'PUT') {
+        const response = await fetch(upload.url!, { method: 'PUT', body: file });
+        if (!response.ok) throw new Error(`Failed to upload ${file.name}.`);
+        return null;
+    }
+
+    const parts = [];
+    for (const [index, url] of upload.part_urls!.entries()) {
+        const chunk = file.slice(index * upload.part_size!, (index + 1) * upload.part_size!);
+        const response = await fetch(url, { method: 'PUT', body: chunk });
+        const etag = response.headers.get('ETag');
+        if (!response.ok || !etag) throw new Error(`Failed to upload part ${index + 1} of ${file.name}.`);
+        parts.push({ part_number: index + 1, etag });
+    }
+    return parts;
+};
+
 export const MultiSeqForm: React.FC = () => {
     const [inputFile, setInputFile] = useState<File | ServerFile | null>(null);
     const [targetFile, setTargetFile] = useState<File | ServerFile | null>(null);
@@ -29,45 +62,59 @@ export const MultiSeqForm: React.FC = () => {
         setJobID(null); // Store Job ID instead of alignment response.
 
         try {
-            const getFileObject = async (file: File | ServerFile): Promise<File> => {
-                // If it's already a File object (from a direct upload), we're good.
-                if ('name' in file) {
-                    return file;
+            const fetcher = isAuthenticated ? fetchWithAuth : fetch;
+            const sides: [FileSide, File | ServerFile][] = [['input', inputFile], ['target', targetFile]];
+            const localBytes = sides.reduce((total, [, file]) => total + ('name' in file ? file.size : 0), 0);
+
+            let response: Response;
+            if (localBytes > DIRECT_UPLOAD_THRESHOLD_BYTES) {
+                const specs = Object.fromEntries(sides.filter(([, file]) => 'name' in file)
+                    .map(([side, file]) => [side, { filename: (file as File).name, size: (file as File).size }]));
+                const initResponse = await fetcher(`${import.meta.env.VITE_API_BASE_URL}/jobs/uploads`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(specs),
+                });
+                if (!initResponse.ok) {
+                    const errorData = await initResponse.json();
+                    throw new Error(errorData.detail || 'Failed to start the upload.');
                 }
-
-                console.log(`Fetching content for ${file.filename}...`);
-
-                // *** Corrected Endpoint: We now use the /read endpoint ***
-                const response = await fetchWithAuth(`${import.meta.env.VITE_API_BASE_URL}/files/${file.id}/read`);
-                if (!response.ok) {
-                    throw new Error(`Failed to read existing file: ${file.filename}`);
+                const { job_id, uploads } = await initResponse.json();
+
+                const finalizeBody: Record<string, any> = { direction, parts: {} };
+                for (const [side, file] of sides) {
+                    if ('name' in file) {
+                        const parts = await uploadToPresigned(file, uploads[side]);
+                        if (parts) finalizeBody.parts[side] = parts;
+                    } else {
+                        finalizeBody[`${side}_file_id`] = Number(file.id);
+                    }
                 }
 
-                // *** The response is JSON, so we call .json() ***
-                const data = await response.json();
-                
-                // *** Extract the actual file content from the 'content' property ***
-                const fileContent = data.content;
+                response = await fetcher(`${import.meta.env.VITE_API_BASE_URL}/jobs/${job_id}/finalize`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(finalizeBody),
+                });
+            } else {
+                // Stored files are referenced by id so the backend can hand their existing S3 keys straight to
+                // the worker; only fresh local files are uploaded with the request.
+                const formData = new FormData();
+                for (const [side, file] of sides) {
+                    if ('name' in file) {
+                        formData.append(`${side}_fasta`, file);
+                    } else {
+                        formData.append(`${side}_file_id`, String(file.id));
+                    }
+                }
+                formData.append('direction', direction);
 
-                // *** Create the new File object from the string content ***
-                return new File([fileContent], file.filename, { type: 'text/plain' });
+                response = await fetcher(`${import.meta.env.VITE_API_BASE_URL}/jobs/submit`, {
+                    method: 'POST',
+                    body: formData,
+                });
             }
 
-            const importedInputFile = await getFileObject(inputFile)
-            const importedTargetFile = await getFileObject(targetFile)
-
-            const formData = new FormData();
-            formData.append('input_fasta', importedInputFile as File);
-            formData.append('target_fasta', importedTargetFile as File);
-            formData.append('direction', direction);
-
-            const fetcher = isAuthenticated ? fetchWithAuth : fetch;
-
-            const response = await fetcher(`${import.meta.env.VITE_API_BASE_URL}/jobs/submit`, {
-                method: 'POST',
-                body: formData,
-            });
-
             if (!response.ok) {
                 const errorData = await response.json();
                 throw new Error(errorData.detail || 'Failed to submit alignment job.');
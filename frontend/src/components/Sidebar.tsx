@@ -285,7 +285,7 @@ export const Sidebar: React.FC = () => {
                 ref={fileUploadRef}
                 onChange={handleFileSelected}
                 className="hidden"
-                accept=".fasta,.fa,.fna,.faa" // Optional: only allow FASTA files
+                accept=".fasta,.fa,.fna,.faa,.gz" // Optional: only allow FASTA files
             />
     
             <hr className="my-3" />
@@ -48,6 +48,7 @@ export const SingleSeqForm: React.FC = () => {
   const [errors, setErrors] = React.useState<Record<string, string[] | undefined>>({});
   const [frameResponse, setFrameResponse] = React.useState<FrameResponse | null>(null);
   const [alignResponse, setAlignResponse] = React.useState<AlignResponse | null>(null);
+  const [alignedTarget, setAlignedTarget] = React.useState('');
   const [apiError, setApiError] = React.useState<string | null>(null);
   const [loading, setLoading] = React.useState(false);
 
@@ -125,6 +126,7 @@ export const SingleSeqForm: React.FC = () => {
 
         const alignData = await alignRes.json();
         setAlignResponse(alignData)
+        setAlignedTarget(cleanedTargetSequence)
       }
 
     } catch (err: any) {
@@ -263,7 +265,7 @@ export const SingleSeqForm: React.FC = () => {
       )}
 
       {alignResponse && (
-        <AlignResultDisplay data={alignResponse} isAuthenticated={isAuthenticated}/>
+        <AlignResultDisplay data={alignResponse} isAuthenticated={isAuthenticated} targetSequence={alignedTarget}/>
       )}
     </>
   );
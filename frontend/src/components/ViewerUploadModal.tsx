@@ -91,7 +91,7 @@ export const FileUploader: React.FC<FileUploaderProps> = ({ fileType, selectedFi
                 {' or drag & drop'}
               </p>
               <p className="text-xs text-gray-500">FASTA format (.fa, .fasta)</p>
-              <input type="file" onChange={handleFileSelect} className="absolute inset-0 opacity-0 w-full h-full cursor-pointer" accept=".fasta,.fa,.fna" />
+              <input type="file" onChange={handleFileSelect} className="absolute inset-0 opacity-0 w-full h-full cursor-pointer" accept=".fasta,.fa,.fna,.gz" />
             </label>
           )}
         </div>
@@ -192,7 +192,7 @@ const FileSelectionModal: React.FC<FileSelectionModalProps> = ({ isOpen, onClose
                      <label className="relative flex flex-col items-center justify-center w-full p-6 text-center bg-gray-50 border-2 border-dashed border-gray-300 rounded-lg cursor-pointer hover:bg-gray-100">
                         <UploadCloud size={24} className="text-gray-400 mb-1"/>
                         <span className="font-semibold text-indigo-600">Upload a new file</span>
-                        <input type="file" onChange={handleLocalFileChange} className="absolute inset-0 opacity-0 w-full h-full cursor-pointer" accept=".fasta,.fa,.fna" />
+                        <input type="file" onChange={handleLocalFileChange} className="absolute inset-0 opacity-0 w-full h-full cursor-pointer" accept=".fasta,.fa,.fna,.gz" />
                     </label>
                 </div>
             </div>
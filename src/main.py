@@ -28,11 +28,12 @@ print("NOTE: All of the options specified here will be enforced over the ENTIRE
       " program, so choose wisely!\n")
 
 # (1) FASTA File Extraction (Input + Target)
-infile = get_input("Enter the filepath/filename of your input FASTA: ", ".fasta", "ending")
-tgtfile = get_input("Enter the filepath/filename of your target FASTA: ", ".fasta", "ending")
+infile = get_input("Enter the filepath/filename of your input FASTA: ", (".fasta", ".fasta.gz"), "ending")
+tgtfile = get_input("Enter the filepath/filename of your target FASTA (or compiled .esalib library): ",
+                    (".fasta", ".fasta.gz", ".esalib"), "ending")
 
 in_records = process_fasta(infile)
-tgt_records = process_fasta(tgtfile)
+tgt_records = process_target_library(tgtfile) if tgtfile.endswith(".esalib") else process_fasta(tgtfile)
 print("FASTA files successfully imported!\n")
 
 # (2) Parameter Selection
@@ -40,6 +41,8 @@ strand_direction = get_input("What should be the direction of translation? (opti
                                  "'REV', or 'BOTH'): ", ["FWD", "REV", "BOTH"]).upper()
 verbose_flag = get_input("Occasionally, output from the analysis may be shown on terminal. Activate "
                          "this verbose mode? (options: 'Y' or 'N'): ", ["Y", "N"]).upper() == "Y"
+output_format = get_input("Which format should the results be saved in? (options: 'CSV', 'PARQUET', "
+                          "or 'BOTH'): ", ["CSV", "PARQUET", "BOTH"]).lower()
 
 print(f"\nIdentified {len(in_records)} sequence entries...")
 print(f"Screening across {len(tgt_records)} target sequences...")
@@ -129,8 +132,9 @@ os.mkdir(results_dir)
 
 # Export the ORF-target association dataframe and the top-scoring ORFs per target to the
 # newly-created results directory.
-results_df.to_csv(f"{results_dir}/orf-target-mappings.csv", index=False)
+written_formats = table_export(results_df, f"{results_dir}/orf-target-mappings", output_format)
 target_map_df = build_target_map(top_hits)
-target_map_df.to_csv(f"{results_dir}/top-orfs-by-target.csv", index=False)
+table_export(target_map_df, f"{results_dir}/top-orfs-by-target", output_format)
 
-print("\n***\n\nProcess complete! Your results should be available for viewing in a CSV file.\n")
+print(f"\n***\n\nProcess complete! Your results should be available for viewing in "
+      f"{' and '.join(fmt.upper() for fmt in written_formats)} format.\n")
@@ -12,16 +12,38 @@ generated to an external dataframe. Functions as a helper script for main.
 
 from Bio import SeqIO
 import pandas as pd
+import gzip
+import json
+import mmap
+import struct
 
 def process_fasta(filename: str):
     try:
-        raw_seq_library = SeqIO.to_dict(SeqIO.parse(filename, "fasta"))
+        # Compressed FASTA (.gz, including BGZF) is inflated as it's parsed rather than up front.
+        opener = gzip.open if filename.endswith(".gz") else open
+        with opener(filename, "rt") as handle:
+            raw_seq_library = SeqIO.to_dict(SeqIO.parse(handle, "fasta"))
         simplified_fasta_seqs = {target_id: str(record.seq) for target_id, record in raw_seq_library.items()}
         return simplified_fasta_seqs
     except FileNotFoundError: # Re-initiating the FASTA input if no file was found.
         print("File not found; please check your path/spelling and try again!")
         get_input("Enter the filepath/filename of your FASTA: ", ".fasta", "ending")
 
+def process_target_library(filename: str):
+    # Reads a compiled target library (backend/app/scripts/target_library.py) without re-parsing FASTA text.
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        if buffer[:8] != b"ESALIB01":
+            raise ValueError(f"{filename} is not an ESA target library.")
+        header_len = struct.unpack("<I", buffer[8:12])[0]
+        header = json.loads(bytes(buffer[12:12 + header_len]))
+
+        ids = [target['id'] for target in header['targets']]
+        offsets_start = header['sections']['offsets'][0]
+        residues_start = header['sections']['residues'][0]
+        offsets = struct.unpack(f"<{len(ids) + 1}Q", buffer[offsets_start:offsets_start + 8 * (len(ids) + 1)])
+        return {target_id: buffer[residues_start + offsets[i]:residues_start + offsets[i + 1]].decode("ascii")
+                for i, target_id in enumerate(ids)}
+
 def get_input(prompt: str, valid_set: list, mode: str = "options"):
     while True:
         value = input(prompt).strip() # Removing extraneous whitespace from the input string.
@@ -52,6 +74,30 @@ def data_export(df: pd.DataFrame, seq_name: str, direction: str, likely_orf: str
     df = pd.concat([df, pd.DataFrame([new_row])], ignore_index = True) # Appending new row.
     return df
 
+def table_export(df: pd.DataFrame, path_stem: str, output_format: str = "csv") -> list:
+    # Writes 'df' as CSV and/or typed, zstd-compressed Parquet; returns the formats actually written.
+    formats = ["csv", "parquet"] if output_format == "both" else [output_format]
+    written = []
+    for fmt in formats:
+        if fmt == "csv":
+            df.to_csv(f"{path_stem}.csv", index=False)
+            written.append(fmt)
+            continue
+
+        typed = df.copy()
+        for column in ("Identity-Score", "LCA"):
+            if column in typed:
+                typed[column] = pd.to_numeric(typed[column], errors="coerce") # "N/A" becomes null.
+        try:
+            typed.to_parquet(f"{path_stem}.parquet", index=False, compression="zstd")
+            written.append(fmt)
+        except ImportError:
+            print("Parquet export needs pyarrow (pip install pyarrow); writing CSV instead.")
+            if "csv" not in formats:
+                df.to_csv(f"{path_stem}.csv", index=False)
+                written.append("csv")
+    return written
+
 def build_target_map(target_orf_hits: dict):
     rows = []
     for target, hits in target_orf_hits.items():